@@ -1,8 +1,19 @@
 """
 Script to add new accounts directly to the database.
 Run this to manually add accounts without modifying config file.
+
+Usage:
+    python add_account.py
+    python add_account.py --file accounts.csv
+    python add_account.py --file accounts.json --update-existing --report import_report.json
+    python add_account.py --file accounts.csv --backend supabase
 """
 
+import argparse
+import json
+import time
+
+from src.account_import import import_accounts, load_records, summarize
 from src.database import PasswordResetDB
 
 def add_account():
@@ -56,5 +67,65 @@ def add_account():
     except Exception as e:
         print(f"\n❌ Error adding account: {e}")
 
+def import_file(args):
+    """Bulk import accounts from a CSV or JSON file."""
+    if args.backend == 'supabase':
+        from src.supabase_db import SupabaseDB
+        db = SupabaseDB()
+    else:
+        db = PasswordResetDB(args.db_path)
+    
+    print("\n" + "="*60)
+    print(f"IMPORT ACCOUNTS - {args.file}")
+    print("="*60)
+    
+    try:
+        records = load_records(args.file, args.format)
+    except (OSError, ValueError) as e:
+        print(f"\n❌ Error reading {args.file}: {e}")
+        return
+    
+    started = time.perf_counter()
+    report = import_accounts(db, records, chunk_size=args.chunk_size, update_existing=args.update_existing)
+    elapsed = time.perf_counter() - started
+    
+    for entry in report:
+        if entry['status'] in ('invalid', 'duplicate', 'error'):
+            print(f"  ❌ Row {entry['row']:>5}: {entry['website'] or '?'}/{entry['username'] or '?'} - "
+                  f"{entry['status']}: {entry['error']}")
+    
+    summary = summarize(report)
+    print(f"\n✓ {len(report)} rows processed in {elapsed:.2f}s")
+    for status in ('created', 'updated', 'exists', 'duplicate', 'invalid', 'error'):
+        if summary.get(status):
+            print(f"  {status:<10} {summary[status]:>6}")
+    
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'summary': summary, 'results': report}, f, indent=2)
+        print(f"\n📝 Per-row report written to {args.report}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Add accounts interactively or import them from a file')
+    parser.add_argument('--file', help='CSV or JSON file of accounts (website, username, password, email)')
+    parser.add_argument('--format', choices=['csv', 'json'], help='File format (default: from the extension)')
+    parser.add_argument('--update-existing', action='store_true',
+                        help='Overwrite password/email of accounts that already exist')
+    parser.add_argument('--chunk-size', type=int, default=500, help='Accounts per batch (default: 500)')
+    parser.add_argument('--report', help='Write the per-row results to this JSON file')
+    parser.add_argument('--backend', choices=['sqlite', 'supabase'], default='sqlite',
+                        help='Database to import into (default: sqlite)')
+    parser.add_argument('--db-path', default='database/rental_system.db', help='SQLite database file')
+    args = parser.parse_args()
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    
+    if args.file:
+        import_file(args)
+    else:
+        add_account()
+
+
 if __name__ == "__main__":
-    add_account()
+    main()
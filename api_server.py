@@ -3,24 +3,127 @@ Flask REST API for Tool Rental System
 Provides endpoints for account rental management
 """
 
-from flask import Flask, request, jsonify
+import hmac
+import logging
+import os
+import time
+import uuid
+
+from flask import Flask, Response, request, jsonify, g, stream_with_context
 from functools import wraps
 from src.database import PasswordResetDB
 from src.supabase_db import SupabaseDB
 from src.api_manager import APIManager
+from src.logger import setup_logging, bind_log_context, reset_log_context
+from src import account_import
+from src import analytics as analytics_reports
+from src import export
+from src import metrics
+from src import wal_checkpoint
+from src import write_actor
 from datetime import datetime
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
+
+db = None
+api_manager = None
+checkpoint_manager = None
+sqlite_writer = None
+analytics = None
+
+
+def init_database(backend: str = 'auto', db_path: str = "database/rental_system.db"):
+    """
+    Select the database used by the endpoints.
+    
+    Args:
+        backend: 'auto' (Supabase, falling back to SQLite), 'supabase' or 'sqlite'
+        db_path: SQLite database file (also holds the API key tables)
+    """
+    global db, api_manager, checkpoint_manager, sqlite_writer, analytics
+    
+    # One writer thread for all SQLite mutations when SQLITE_WRITE_ACTOR is on
+    if sqlite_writer is not None:
+        sqlite_writer.close()
+    sqlite_writer = write_actor.from_env(db_path)
+    
+    # Website lookups are cached until a website is added or edited (WEBSITE_CACHE)
+    cache_websites = os.getenv('WEBSITE_CACHE', '1').lower() in ('1', 'true', 'yes', 'on')
+    
+    # Use Supabase as primary database, SQLite as fallback
+    if backend in ('auto', 'supabase'):
+        try:
+            db = SupabaseDB()
+            print("✓ Using Supabase cloud database")
+        except Exception as e:
+            if backend == 'supabase':
+                raise
+            print(f"⚠ Supabase not available, falling back to SQLite: {e}")
+            db = PasswordResetDB(db_path, write_actor=sqlite_writer, cache_websites=cache_websites)
+    else:
+        db = PasswordResetDB(db_path, write_actor=sqlite_writer, cache_websites=cache_websites)
+    
+    # API key lookups are cached until a key is created, revoked or edited
+    api_manager = APIManager(db_path, write_actor=sqlite_writer,
+                             cache_keys=os.getenv('API_KEY_CACHE', '1').lower() in ('1', 'true', 'yes', 'on'))
+    
+    # Per-backend timings of every database call made by the endpoints
+    metrics.instrument_methods(db, backend='supabase' if isinstance(db, SupabaseDB) else 'sqlite')
+    metrics.instrument_methods(api_manager, backend='sqlite')
+    
+    # Keep the SQLite WAL from growing behind long readers
+    if checkpoint_manager is not None:
+        checkpoint_manager.stop()
+    checkpoint_manager = wal_checkpoint.from_env(db_path)
+    if checkpoint_manager is not None:
+        checkpoint_manager.start()
+    
+    # Usage reports from a snapshot / read-only connections (ANALYTICS_MODE)
+    if analytics is not None:
+        analytics.stop()
+    analytics = analytics_reports.from_env(db_path)
+    if analytics is not None:
+        analytics.start()
+
+
+init_database(
+    backend=os.getenv('RENTAL_DB_BACKEND', 'auto'),
+    db_path=os.getenv('RENTAL_DB_PATH', "database/rental_system.db")
+)
+
+# Metrics written by other processes (e.g. the reset scheduler)
+METRICS_TEXTFILE_DIR = os.getenv('METRICS_TEXTFILE_DIR', os.path.join('logs', 'metrics'))
+
+
+# ===================== REQUEST CONTEXT =====================
+
+@app.before_request
+def bind_request_id():
+    """Tag every log record of this request with a request ID."""
+    g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+    g.log_token = bind_log_context(request_id=g.request_id)
+    g.request_started = time.perf_counter()
+
 
-# Use Supabase as primary database, SQLite as fallback
-try:
-    db = SupabaseDB()
-    print("✓ Using Supabase cloud database")
-except Exception as e:
-    print(f"⚠ Supabase not available, falling back to SQLite: {e}")
-    db = PasswordResetDB()
+@app.after_request
+def add_request_id_header(response):
+    """Echo the request ID so clients can quote it, and record request metrics."""
+    if 'request_id' in g:
+        response.headers['X-Request-ID'] = g.request_id
+    if 'request_started' in g:
+        # Label by route template, not path, to keep label cardinality bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - g.request_started,
+                                     method=request.method, route=route)
+    return response
 
-api_manager = APIManager()
+
+@app.teardown_request
+def unbind_request_id(exc):
+    if 'log_token' in g:
+        reset_log_context(g.log_token)
 
 
 # ===================== AUTHENTICATION =====================
@@ -56,6 +159,29 @@ def require_api_key(f):
     return decorated_function
 
 
+def require_admin_key(f):
+    """Decorator for admin endpoints: X-Admin-Key must match ADMIN_API_KEY (unset = disabled)."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        admin_key = os.getenv('ADMIN_API_KEY')
+        
+        if not admin_key:
+            return jsonify({
+                'error': 'Admin endpoints disabled',
+                'message': 'Set ADMIN_API_KEY to enable admin endpoints'
+            }), 403
+        
+        if not hmac.compare_digest(request.headers.get('X-Admin-Key', ''), admin_key):
+            return jsonify({
+                'error': 'Invalid admin key',
+                'message': 'Please provide a valid X-Admin-Key header'
+            }), 403
+        
+        return f(*args, **kwargs)
+    
+    return decorated_function
+
+
 # ===================== PUBLIC ENDPOINTS =====================
 
 @app.route('/api/health', methods=['GET'])
@@ -68,6 +194,13 @@ def health_check():
     })
 
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition of API, database and scheduler metrics."""
+    body = metrics.REGISTRY.render() + metrics.read_textfiles(METRICS_TEXTFILE_DIR)
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+
 # ===================== ACCOUNT RENTAL ENDPOINTS =====================
 
 @app.route('/api/accounts/available', methods=['GET'])
@@ -170,6 +303,9 @@ def rent_account():
         else:
             rental = db.rent_account(account['id'], customer_info)
         
+        logger.info(f"Rented account {account['id']} ({website}) to {request.api_key_info['name']}",
+                    extra={'rental_id': rental.get('id'), 'account_id': account['id']})
+        
         # Log the API request
         api_manager.log_api_request(
             api_key_id=request.api_key_info['id'],
@@ -199,6 +335,8 @@ def rent_account():
         })
     
     except Exception as e:
+        logger.error(f"Rent request for {website} failed: {e}")
+        
         # Log failed request
         api_manager.log_api_request(
             api_key_id=request.api_key_info['id'],
@@ -325,26 +463,118 @@ def my_stats():
     days = request.args.get('days', 30, type=int)
     
     try:
-        stats = api_manager.get_usage_stats(
+        # Reports stay off the rent/return path when analytics is configured
+        reports = analytics or api_manager
+        stats = reports.get_usage_stats(
             api_key_id=request.api_key_info['id'],
             days=days
         )
         
-        recent_activity = api_manager.get_recent_activity(
+        recent_activity = reports.get_recent_activity(
             api_key_id=request.api_key_info['id'],
             limit=10
         )
         
+        # The validated key may come from the cache; read the counters fresh
+        key_info = api_manager.get_api_key(request.api_key_info['id']) or request.api_key_info
+        
         return jsonify({
             'success': True,
             'api_key': {
-                'name': request.api_key_info['name'],
-                'total_requests': request.api_key_info['total_requests'],
-                'rate_limit': request.api_key_info['rate_limit'],
-                'created_at': request.api_key_info['created_at']
+                'name': key_info['name'],
+                'total_requests': key_info['total_requests'],
+                'rate_limit': key_info['rate_limit'],
+                'created_at': key_info['created_at']
             },
             'stats': stats,
             'recent_activity': recent_activity,
+            # Age of the data behind stats/recent_activity (None = live)
+            'staleness': analytics.staleness() if analytics else None,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+# ===================== ADMIN ENDPOINTS =====================
+
+@app.route('/api/admin/export/<table>', methods=['GET'])
+@require_admin_key
+def export_table(table):
+    """
+    Stream rentals, password_history or api_usage as CSV or NDJSON.
+    
+    Query params: format (ndjson|csv), start, end (ISO date/time, UTC),
+    after_id (resume after the id of the last row received).
+    """
+    fmt = request.args.get('format', 'ndjson')
+    
+    try:
+        start = export.parse_time(request.args.get('start'))
+        end = export.parse_time(request.args.get('end'))
+        after_id = request.args.get('after_id', 0, type=int)
+        # Rentals and password history come from Supabase when it is the primary database
+        exporter = export.exporter_for(
+            table,
+            db_path=api_manager.db_path,
+            supabase_client=db.client if isinstance(db, SupabaseDB) else None
+        )
+        # Validate before the response starts; errors after that would cut the stream
+        chunks = exporter.stream(table, fmt=fmt, start=start, end=end, after_id=after_id)
+        first = next(chunks, '')
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    def generate():
+        yield first
+        yield from chunks
+    
+    filename = f"{table}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    return Response(stream_with_context(generate()), mimetype=export.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+
+@app.route('/api/admin/accounts/import', methods=['POST'])
+@require_admin_key
+def import_accounts():
+    """
+    Bulk add accounts from a JSON body ({"accounts": [...]} or a list) or
+    CSV (Content-Type: text/csv).
+    
+    Query params: update_existing (overwrite password/email of existing
+    accounts), chunk_size. Returns a result per row.
+    """
+    update_existing = request.args.get('update_existing', 'false').lower() in ('1', 'true', 'yes')
+    chunk_size = request.args.get('chunk_size', 500, type=int)
+    if chunk_size < 1:
+        return jsonify({
+            'success': False,
+            'error': 'chunk_size must be at least 1'
+        }), 400
+    
+    try:
+        fmt = 'csv' if request.mimetype == 'text/csv' else 'json'
+        records = account_import.parse_records(request.get_data(as_text=True), fmt)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': f'Invalid import body: {e}'
+        }), 400
+    
+    try:
+        report = account_import.import_accounts(db, records, chunk_size=chunk_size,
+                                                update_existing=update_existing)
+        return jsonify({
+            'success': True,
+            'summary': account_import.summarize(report),
+            'results': report,
             'timestamp': datetime.now().isoformat()
         })
     
@@ -376,6 +606,8 @@ def internal_error(error):
 # ===================== MAIN =====================
 
 if __name__ == '__main__':
+    setup_logging(os.getenv('LOG_LEVEL', 'INFO'))
+    
     print("\n" + "="*60)
     print("Tool Rental API Server")
     print("="*60)
@@ -386,11 +618,14 @@ if __name__ == '__main__':
     print("Starting server on http://localhost:5000")
     print("\nAvailable endpoints:")
     print("  GET  /api/health - Health check")
+    print("  GET  /metrics - Prometheus metrics")
     print("  GET  /api/accounts/available - List available accounts")
     print("  POST /api/accounts/rent - Rent an account")
     print("  POST /api/accounts/return/<id> - Return an account")
     print("  GET  /api/accounts/status/<id> - Check account status")
     print("  GET  /api/stats/me - Your usage statistics")
+    print("  GET  /api/admin/export/<table> - Stream rentals/password_history/api_usage (admin)")
+    print("  POST /api/admin/accounts/import - Bulk add accounts from CSV/JSON (admin)")
     print("\n" + "="*60 + "\n")
     
     # Run without debug mode for stability in production
@@ -0,0 +1,100 @@
+"""
+Archive Old Data
+Moves history rows past their retention (password_history, error_logs,
+api_usage, closed rentals, reset_timings) into an archive database or
+compressed NDJSON files in small batches, then compacts the SQLite file
+with incremental vacuum. See src/retention.py for the default policies.
+
+Usage:
+    python archive_old_data.py --dry-run
+    python archive_old_data.py --archive-db database/archive.db
+    python archive_old_data.py --archive-dir archive --days rentals=90 --days error_logs=30
+    python archive_old_data.py --backend supabase
+    python archive_old_data.py --enable-incremental-vacuum
+"""
+
+import argparse
+import logging
+import time
+
+from src.retention import RETENTION_POLICIES, SQLiteArchiver, SupabaseArchiver, resolve_days
+
+
+def parse_days(values):
+    overrides = {}
+    for value in values or []:
+        table, _, days = value.partition('=')
+        if not days.isdigit():
+            raise argparse.ArgumentTypeError(f"Expected TABLE=DAYS, got '{value}'")
+        overrides[table] = int(days)
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive history rows past their retention')
+    parser.add_argument('--backend', choices=['sqlite', 'supabase'], default='sqlite',
+                        help='Database to clean up (default: sqlite)')
+    parser.add_argument('--db-path', default='database/rental_system.db', help='SQLite database file')
+    parser.add_argument('--archive-db', default='database/archive.db',
+                        help='Archive database (default: database/archive.db)')
+    parser.add_argument('--archive-dir', help='Write gzip NDJSON files here instead of an archive database')
+    parser.add_argument('--days', action='append', metavar='TABLE=DAYS',
+                        help='Retention override, repeatable (0 = keep forever)')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Rows per transaction (default: 5000)')
+    parser.add_argument('--pause', type=float, default=0.05, help='Seconds between batches (default: 0.05)')
+    parser.add_argument('--no-vacuum', action='store_true', help='Skip the incremental vacuum')
+    parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help='One-time switch of an existing database to incremental auto-vacuum (full VACUUM)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    try:
+        days = resolve_days(parse_days(args.days))
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+
+    print("\n" + "=" * 60)
+    print(f"ARCHIVE OLD DATA - {args.db_path if args.backend == 'sqlite' else 'Supabase'}")
+    print("=" * 60)
+
+    if args.backend == 'supabase':
+        from src.supabase_db import SupabaseDB
+        archiver = SupabaseArchiver(SupabaseDB().client, batch_size=args.batch_size)
+        if args.dry_run:
+            parser.error("--dry-run is only supported for sqlite")
+        results = archiver.run(days)
+    else:
+        archiver = SQLiteArchiver(args.db_path, archive_db=None if args.archive_dir else args.archive_db,
+                                  archive_dir=args.archive_dir, batch_size=args.batch_size, pause=args.pause)
+
+        if args.enable_incremental_vacuum:
+            confirm = input("\n⚠️  This rewrites the whole database and blocks writers meanwhile. "
+                            "Continue? (yes/no): ").strip().lower()
+            if confirm == 'yes':
+                started = time.perf_counter()
+                archiver.enable_incremental_vacuum()
+                print(f"✓ Incremental vacuum enabled ({time.perf_counter() - started:.1f}s)")
+            return
+
+        if args.dry_run:
+            for table, table_days in days.items():
+                if table_days:
+                    count = archiver.count_expired(table, table_days)
+                    print(f"  {table:<18} older than {table_days:>4} days: {count:>10,} rows")
+            return
+
+        started = time.perf_counter()
+        results = archiver.run(days, vacuum=not args.no_vacuum)
+        print(f"\nDone in {time.perf_counter() - started:.1f}s")
+
+    for table in RETENTION_POLICIES:
+        if table in results:
+            print(f"  ✓ {table:<18} {results[table]:>10,} rows archived")
+    if 'vacuum_pages' in results:
+        print(f"  ✓ {'vacuum':<18} {results['vacuum_pages']:>10,} pages released")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Backup Database
+Online backups of the SQLite database while the API and scheduler keep
+running: page-stepped snapshots, continuous WAL shipping to a local
+directory, and restore (optionally to a point in time). See src/backup.py.
+
+Usage:
+    python backup_database.py snapshot
+    python backup_database.py ship --interval 1
+    python backup_database.py list
+    python backup_database.py restore --target restored.db
+    python backup_database.py restore --target restored.db --until 2026-01-31T12:00:00
+    python backup_database.py restore --target restored.db --snapshot database/backups/snapshots/x.db
+"""
+
+import argparse
+import logging
+import os
+import time
+from datetime import datetime
+
+from src.backup import WALShipper, list_generations, list_snapshots, restore, snapshot_to_dir
+
+
+def print_run(label, result):
+    print(f"  ✓ {label}: {result['bytes'] / 1024 / 1024:.1f} MB in {result['seconds']:.2f}s "
+          f"({result['mb_per_s']:.1f} MB/s)")
+
+
+def cmd_snapshot(args):
+    result = snapshot_to_dir(args.db_path, args.backup_dir, pages_per_step=args.pages_per_step,
+                             pause=args.pause)
+    print_run("Snapshot", result)
+    print(f"    {result['path']}")
+    print(f"    {result['pages']:,} pages, {result['steps']} steps, {result['restarts']} restart(s)")
+
+
+def cmd_ship(args):
+    shipper = WALShipper(args.db_path, args.backup_dir, interval=args.interval,
+                         restart_bytes=args.restart_bytes, pages_per_step=args.pages_per_step, pause=args.pause)
+    base = shipper.start_generation()
+    print_run(f"Generation {shipper.generation} base snapshot", base)
+    print("\nShipping WAL frames (Ctrl+C to stop)...\n")
+
+    started = time.perf_counter()
+    try:
+        while True:
+            result = shipper.ship_once()
+            if result:
+                print(f"  {datetime.now().strftime('%H:%M:%S')}  segment {result['index']:>6}: "
+                      f"{result['frames']:>6} frames, {result['bytes'] / 1024:>9.1f} KB in "
+                      f"{result['seconds'] * 1000:>7.1f} ms ({result['mb_per_s']:.1f} MB/s)")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        shipper.stop()
+
+    totals = shipper.totals
+    elapsed = time.perf_counter() - started
+    print(f"\n  ✓ {totals['segments']} segment(s), {totals['frames']:,} frames, "
+          f"{totals['bytes'] / 1024 / 1024:.1f} MB shipped in {elapsed:.0f}s "
+          f"({totals['seconds']:.1f}s spent shipping)")
+
+
+def cmd_list(args):
+    snapshots = list_snapshots(args.backup_dir)
+    print(f"\nSnapshots ({len(snapshots)}):")
+    for s in snapshots:
+        print(f"  {s['created_at'][:19]}  {s['bytes'] / 1024 / 1024:>8.1f} MB  {os.path.basename(s['path'])}")
+
+    generations = list_generations(args.backup_dir)
+    print(f"\nWAL shipping generations ({len(generations)}):")
+    for g in generations:
+        print(f"  {g['generation']}  {g['segments']:>6} segment(s)  last shipped {g['last_shipped_at'] or '-'}")
+
+
+def cmd_restore(args):
+    until = datetime.fromisoformat(args.until) if args.until else None
+    result = restore(args.backup_dir, args.target, generation=args.generation, until=until,
+                     snapshot_path=args.snapshot, overwrite=args.force)
+    print_run("Restored", result)
+    print(f"    {result['path']}")
+    if result['generation']:
+        print(f"    generation {result['generation']}: {result['segments']} segment(s), "
+              f"{result['frames']:,} frames replayed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Online backup, WAL shipping and restore for SQLite')
+    parser.add_argument('--db-path', default='database/rental_system.db', help='SQLite database file')
+    parser.add_argument('--backup-dir', default=os.path.join('database', 'backups'),
+                        help='Backup directory (default: database/backups)')
+    parser.add_argument('--pages-per-step', type=int, default=256,
+                        help='Pages copied per backup step (default: 256)')
+    parser.add_argument('--pause', type=float, default=0.005,
+                        help='Seconds between backup steps (default: 0.005)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('snapshot', help='Take an online snapshot')
+
+    ship = subparsers.add_parser('ship', help='Ship WAL frames continuously')
+    ship.add_argument('--interval', type=float, default=1.0, help='Seconds between passes (default: 1)')
+    ship.add_argument('--restart-bytes', type=int, default=8 * 1024 * 1024,
+                      help='WAL size at which to let the WAL restart (default: 8 MB)')
+
+    subparsers.add_parser('list', help='List snapshots and WAL generations')
+
+    restore_parser = subparsers.add_parser('restore', help='Restore a database')
+    restore_parser.add_argument('--target', required=True, help='Database file to create')
+    restore_parser.add_argument('--generation', help='WAL generation (default: newest)')
+    restore_parser.add_argument('--until', help='Only replay segments shipped up to this ISO time')
+    restore_parser.add_argument('--snapshot', help='Restore this snapshot file only')
+    restore_parser.add_argument('--force', action='store_true', help='Overwrite --target if it exists')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    print("\n" + "=" * 60)
+    print(f"BACKUP DATABASE - {args.command} ({args.db_path})")
+    print("=" * 60)
+
+    {'snapshot': cmd_snapshot, 'ship': cmd_ship, 'list': cmd_list, 'restore': cmd_restore}[args.command](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Analytics Isolation Benchmark
+Measures rent/return latency while the API usage reports (usage stats and
+recent activity) run in the background, with the reports on the live database, on read-only
+connections and on an analytics snapshot (src/analytics.py). A run without
+reports gives the baseline the others should stay close to. Reports run in
+separate processes so the GIL does not mask database contention.
+
+Usage:
+    python benchmark_analytics_isolation.py
+    python benchmark_analytics_isolation.py --accounts 200000 --report-workers 4
+    python benchmark_analytics_isolation.py --modes none live snapshot --output isolation.json
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime
+
+from benchmark_data_layer import BENCH_WEBSITE, available_account_ids, git_commit, run_operation, seed_sqlite
+from src.analytics import AnalyticsReports
+from src.api_manager import APIManager
+from src.database import PasswordResetDB
+
+
+MODES = ('none', 'live', 'readonly', 'snapshot')
+
+
+def report_calls(reports):
+    """The report queries, cycled by each report thread."""
+    return [
+        lambda: reports.get_usage_stats(days=30),
+        lambda: reports.get_recent_activity(limit=50),
+    ]
+
+
+def run_reports(db_path, mode, snapshot_path, stop, counter):
+    """Report worker process: cycle the report queries until stop is set."""
+    if mode == 'live':
+        calls = report_calls(APIManager(db_path))
+    else:
+        # The parent owns the snapshot refreshes; workers only read it
+        calls = report_calls(AnalyticsReports(db_path, mode=mode, snapshot_path=snapshot_path))
+    for call in itertools.cycle(calls):
+        if stop.is_set():
+            return
+        call()
+        with counter.get_lock():
+            counter.value += 1
+
+
+def run_mode(db_path, args, mode, pool):
+    """Rent then return every account of pool while reports run in `mode`."""
+    db = PasswordResetDB(db_path)
+    snapshot_path = f"{db_path}.analytics"
+
+    analytics = None
+    if mode in ('readonly', 'snapshot'):
+        analytics = AnalyticsReports(db_path, mode=mode, snapshot_path=snapshot_path,
+                                     refresh_interval=args.refresh_interval)
+        analytics.start()
+
+    stop = multiprocessing.Event()
+    counter = multiprocessing.Value('i', 0)
+    workers = []
+    if mode != 'none':
+        workers = [multiprocessing.Process(target=run_reports, args=(db_path, mode, snapshot_path, stop, counter),
+                                           daemon=True)
+                   for _ in range(args.report_workers)]
+        for worker in workers:
+            worker.start()
+        time.sleep(1.0)
+
+    try:
+        rent = run_operation(lambda i: db.rent_account(pool[i], customer_name='benchmark'), len(pool),
+                             args.concurrency)
+        returned = run_operation(lambda i: db.return_account(pool[i]), len(pool), args.concurrency)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join()
+        if analytics is not None:
+            analytics.stop()
+
+    staleness = analytics.staleness() if analytics else None
+    return [
+        dict(rent, operation='rent_account', mode=mode, reports=counter.value, staleness=staleness),
+        dict(returned, operation='return_account', mode=mode, reports=counter.value, staleness=staleness),
+    ]
+
+
+def print_results(results):
+    print("\n" + "=" * 92)
+    print("ANALYTICS ISOLATION BENCHMARK - rent/return latency while reports run")
+    print("=" * 92)
+    print(f"{'Mode':<10} {'Operation':<16} {'Ops':>6} {'Err':>5} {'ops/s':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'Reports':>8}")
+    print("-" * 92)
+    for r in results:
+        print(f"{r['mode']:<10} {r['operation']:<16} {r['ops']:>6} {r['errors']:>5} {r['throughput']:>9.1f} "
+              f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['reports']:>8}")
+    print("=" * 92)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rent/return latency while reports run')
+    parser.add_argument('--accounts', type=int, default=100000, help='Accounts in the database (default: 100000)')
+    parser.add_argument('--ops', type=int, default=500, help='Rents (and returns) per mode (default: 500)')
+    parser.add_argument('--concurrency', type=int, default=4, help='Rent/return threads (default: 4)')
+    parser.add_argument('--report-workers', type=int, default=2, help='Processes running reports (default: 2)')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES),
+                        help='Where reports run (default: all; none = no reports)')
+    parser.add_argument('--refresh-interval', type=float, default=5.0,
+                        help='Snapshot refresh interval in seconds (default: 5)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the dataset')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='analytics_bench_') as workdir:
+        db_path = os.path.join(workdir, 'bench.db')
+        print(f"Seeding {args.accounts} accounts...")
+        seed_sqlite(db_path, args.accounts, args.seed)
+        pool = available_account_ids(db_path, BENCH_WEBSITE, args.ops)
+        for mode in args.modes:
+            print(f"  reports: {mode}...")
+            results.extend(run_mode(db_path, args, mode, pool))
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.now().isoformat(),
+                    'git_commit': git_commit(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'settings': {k: v for k, v in vars(args).items() if k != 'output'},
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Browser Profile Benchmark
+Compares page-load time, transferred bytes and browser RSS with the lean
+browsing profile on and off.
+
+Usage:
+    python benchmark_browser_profile.py --runs 5 --headless
+    python benchmark_browser_profile.py --url http://127.0.0.1:8080/post-in/ --output bench.json
+"""
+
+import argparse
+import json
+import logging
+
+from src.browser_watchdog import BrowserWatchdog
+from src.password_reset_bot import PasswordResetBot
+from src.utils import StatsHelper
+
+
+def measure_run(url, lean_profile, headless):
+    """Load a page once and return its timing, transfer size and memory."""
+    bot = PasswordResetBot('benchmark', 'benchmark', headless=headless, lean_profile=lean_profile)
+    try:
+        if not bot.open_website(url):
+            raise RuntimeError(f"Could not open {url}")
+
+        transferred = bot.driver.execute_script(
+            "return performance.getEntriesByType('navigation')"
+            ".concat(performance.getEntriesByType('resource'))"
+            ".reduce(function (total, e) { return total + (e.transferSize || 0); }, 0);"
+        )
+        resources = bot.driver.execute_script("return performance.getEntriesByType('resource').length;")
+        rss = sum(BrowserWatchdog.tree_rss(pid) for pid in bot.get_process_ids())
+
+        return {
+            'launch_ms': bot.step_timings.get('_init_driver', 0.0) * 1000,
+            'page_load_ms': bot.step_timings.get('open_website', 0.0) * 1000,
+            'transferred_kb': transferred / 1024,
+            'resources': resources,
+            'rss_mb': rss / 1024 / 1024,
+        }
+    finally:
+        bot.close()
+
+
+def summarize(runs):
+    """Reduce a list of run measurements to p50/p95 per metric."""
+    summary = {}
+    for metric in runs[0]:
+        values = [run[metric] for run in runs]
+        summary[metric] = {
+            'p50': StatsHelper.percentile(values, 50),
+            'p95': StatsHelper.percentile(values, 95),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the lean browsing profile')
+    parser.add_argument('--url', default='https://unlocktool.net/post-in/', help='Page to load')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per profile (default: 5)')
+    parser.add_argument('--headless', action='store_true', help='Run Chrome headless')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = {'url': args.url, 'runs': args.runs, 'profiles': {}}
+
+    for label, lean in [('default', False), ('lean', True)]:
+        print(f"Running {args.runs} load(s) with the {label} profile...")
+        runs = [measure_run(args.url, lean, args.headless) for _ in range(args.runs)]
+        results['profiles'][label] = {'runs': runs, 'summary': summarize(runs)}
+
+    print("\n" + "=" * 72)
+    print(f"BROWSER PROFILE BENCHMARK - {args.url}")
+    print("=" * 72)
+    print(f"{'Metric':<18} {'default p50':>12} {'lean p50':>12} {'default p95':>12} {'lean p95':>12}")
+    print("-" * 72)
+    default = results['profiles']['default']['summary']
+    lean = results['profiles']['lean']['summary']
+    for metric in default:
+        print(f"{metric:<18} {default[metric]['p50']:>12.1f} {lean[metric]['p50']:>12.1f} "
+              f"{default[metric]['p95']:>12.1f} {lean[metric]['p95']:>12.1f}")
+    print("=" * 72)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,394 @@
+"""
+Data Layer Benchmark
+Measures the database methods behind the rental API (and optionally the
+HTTP endpoints themselves) at several dataset sizes and concurrency levels,
+writes the results as JSON and compares two runs to flag regressions.
+
+Usage:
+    python benchmark_data_layer.py --scales 1000 100000 --concurrency 1 8 --output before.json
+    python benchmark_data_layer.py --http --output after.json --compare before.json
+    python benchmark_data_layer.py --compare before.json after.json --threshold 15
+    python benchmark_data_layer.py --backend supabase-fake --latency-ms 40 --scales 1000
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from src.api_manager import APIManager
+from src.database import PasswordResetDB
+from src.fake_supabase import FakeSupabaseClient
+from src.utils import StatsHelper
+
+
+WEBSITES = [('unlocktool', 6), ('androidmultitool', 12), ('chimeratool', 24)]
+BENCH_WEBSITE = WEBSITES[0][0]
+
+
+# ===================== DATASET =====================
+
+def seed_sqlite(db_path, accounts, seed):
+    """
+    Create a benchmark database with the given number of accounts.
+
+    About 80% of accounts are available, 15% rented (with an active rental)
+    and 5% in exception, spread evenly over the benchmark websites.
+    """
+    db = PasswordResetDB(db_path)
+    website_ids = {
+        name: db.add_website(name, f"https://{name}.example", hours, 'Benchmark website')
+        for name, hours in WEBSITES
+    }
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    rows = []
+    for i in range(accounts):
+        name, hours = WEBSITES[i % len(WEBSITES)]
+        roll = rng.random()
+        available_at = None
+        if roll < 0.80:
+            status = 'available'
+        elif roll < 0.95:
+            status = 'rented'
+            available_at = (now + timedelta(minutes=rng.randint(1, hours * 60))).strftime('%Y-%m-%d %H:%M:%S')
+        else:
+            status = 'exception'
+        last_reset = (now - timedelta(minutes=rng.randint(0, 7 * 24 * 60))).strftime('%Y-%m-%d %H:%M:%S')
+        rows.append((website_ids[name], f"bench_{i:07d}", f"bench_{i:07d}@example.com",
+                     f"Bench-{i:07d}!", status, available_at, last_reset))
+
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    conn.executemany("""
+        INSERT INTO accounts (website_id, username, email, current_password, status, available_at, last_reset)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, rows)
+    conn.execute("""
+        INSERT INTO rentals (account_id, customer_name, expires_at)
+        SELECT id, 'seed', available_at FROM accounts WHERE status = 'rented'
+    """)
+    conn.commit()
+    conn.close()
+    return db
+
+
+def available_account_ids(db_path, website, limit):
+    """IDs of available accounts of one website, used for rent/return."""
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    rows = conn.execute("""
+        SELECT a.id FROM accounts a JOIN websites w ON a.website_id = w.id
+        WHERE w.name = ? AND a.status = 'available'
+        LIMIT ?
+    """, (website, limit)).fetchall()
+    conn.close()
+    return [row[0] for row in rows]
+
+
+# ===================== RUNNER =====================
+
+def run_operation(func, ops, concurrency):
+    """
+    Call func(i) for i in range(ops) from `concurrency` threads.
+
+    Returns:
+        Dictionary with throughput, latency percentiles (ms) and error count
+    """
+    counter = itertools.count()
+
+    def worker():
+        latencies, errors = [], 0
+        while True:
+            i = next(counter)
+            if i >= ops:
+                return latencies, errors
+            start = time.perf_counter()
+            try:
+                func(i)
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = [f.result() for f in [executor.submit(worker) for _ in range(concurrency)]]
+    elapsed = time.perf_counter() - start
+
+    latencies = [value for values, _ in outcomes for value in values]
+    errors = sum(errors for _, errors in outcomes)
+    return {
+        'ops': len(latencies),
+        'errors': errors,
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'mean_ms': sum(latencies) / len(latencies) if latencies else 0.0,
+        'p50_ms': StatsHelper.percentile(latencies, 50),
+        'p95_ms': StatsHelper.percentile(latencies, 95),
+        'p99_ms': StatsHelper.percentile(latencies, 99),
+    }
+
+
+def _require(result):
+    """Treat a None result (e.g. account no longer available) as an error."""
+    if result is None:
+        raise RuntimeError("operation returned no result")
+    return result
+
+
+def database_operations(db, api_manager, api_key, pool):
+    """(name, func(i)) pairs for the database methods, in execution order."""
+    return [
+        ('validate_api_key', lambda i: _require(api_manager.validate_api_key(api_key))),
+        ('get_available_accounts', lambda i: db.get_available_accounts(BENCH_WEBSITE)),
+        # rent then return the same accounts, so every level starts from the same state
+        ('rent_account', lambda i: _require(db.rent_account(pool[i], customer_name='benchmark'))),
+        ('return_account', lambda i: db.return_account(pool[i])),
+        ('get_dashboard_stats', lambda i: db.get_dashboard_stats()),
+    ]
+
+
+# ===================== HTTP =====================
+
+def start_api_server(db_path, port):
+    """Serve api_server's app on a background thread against db_path."""
+    from werkzeug.serving import make_server
+    import api_server
+
+    api_server.init_database('sqlite', db_path)
+    server = make_server('127.0.0.1', port, api_server.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def http_operations(base_url, api_key):
+    """(name, func(i)) pairs for the HTTP endpoints; rented IDs feed the return step."""
+    import requests
+
+    local = threading.local()
+    rented = []
+
+    def session():
+        if not hasattr(local, 'session'):
+            local.session = requests.Session()
+            local.session.headers['X-API-Key'] = api_key
+        return local.session
+
+    def call(method, path, **kwargs):
+        response = session().request(method, base_url + path, timeout=60, **kwargs)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {path} -> {response.status_code}")
+        return response.json()
+
+    def rent(i):
+        data = call('POST', '/api/accounts/rent', json={'website': BENCH_WEBSITE})
+        rented.append(data['account']['id'])
+
+    def give_back(i):
+        if i >= len(rented):
+            raise RuntimeError("no rented account to return")
+        call('POST', f"/api/accounts/return/{rented[i]}")
+
+    return [
+        ('http GET /api/health', lambda i: call('GET', '/api/health')),
+        ('http GET /api/accounts/available', lambda i: call('GET', '/api/accounts/available',
+                                                            params={'website': BENCH_WEBSITE})),
+        ('http POST /api/accounts/rent', rent),
+        ('http POST /api/accounts/return', give_back),
+        ('http GET /api/stats/me', lambda i: call('GET', '/api/stats/me')),
+    ]
+
+
+# ===================== COMPARISON =====================
+
+def compare_runs(baseline, current, threshold, min_delta_ms):
+    """
+    Print p95 and throughput changes between two result files.
+
+    A result is a regression when p95 latency grew, or throughput fell, by
+    more than threshold percent (latency changes under min_delta_ms are
+    treated as noise).
+
+    Returns:
+        Number of regressions
+    """
+    def index(run):
+        return {(r['operation'], r['scale'], r['concurrency']): r for r in run['results']}
+
+    base, cur = index(baseline), index(current)
+    regressions = 0
+
+    print("\n" + "=" * 104)
+    print(f"COMPARISON - baseline {baseline['meta'].get('git_commit', '?')} "
+          f"vs current {current['meta'].get('git_commit', '?')} (threshold {threshold:g}%)")
+    print("=" * 104)
+    print(f"{'Operation':<34} {'Scale':>8} {'Conc':>5} {'p95 before':>11} {'p95 after':>10} "
+          f"{'Δp95':>8} {'ops/s Δ':>8}  Verdict")
+    print("-" * 104)
+
+    for key in sorted(set(base) & set(cur), key=lambda k: (k[1], k[2], k[0])):
+        before, after = base[key], cur[key]
+        p95_change = (after['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+        tput_change = ((after['throughput'] - before['throughput']) / before['throughput'] * 100
+                       if before['throughput'] else 0.0)
+
+        slower = p95_change > threshold and after['p95_ms'] - before['p95_ms'] >= min_delta_ms
+        verdict = ''
+        if slower or tput_change < -threshold or after['errors'] > before['errors']:
+            verdict = '❌ REGRESSION'
+            regressions += 1
+        elif p95_change < -threshold:
+            verdict = '✓ faster'
+
+        print(f"{key[0]:<34} {key[1]:>8} {key[2]:>5} {before['p95_ms']:>11.2f} {after['p95_ms']:>10.2f} "
+              f"{p95_change:>+7.1f}% {tput_change:>+7.1f}%  {verdict}")
+
+    missing = set(base) ^ set(cur)
+    if missing:
+        print(f"\n({len(missing)} result(s) present in only one run were skipped)")
+    print("=" * 104)
+    print(f"{regressions} regression(s)")
+    return regressions
+
+
+# ===================== MAIN =====================
+
+def git_commit():
+    """Short hash of the checked-out commit, if available."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print("\n" + "=" * 104)
+    print("DATA LAYER BENCHMARK")
+    print("=" * 104)
+    print(f"{'Operation':<34} {'Scale':>8} {'Conc':>5} {'Ops':>6} {'Err':>5} {'ops/s':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'RT/op':>6}")
+    print("-" * 104)
+    for r in results:
+        round_trips = f"{r['round_trips_per_op']:.1f}" if 'round_trips_per_op' in r else '-'
+        print(f"{r['operation']:<34} {r['scale']:>8} {r['concurrency']:>5} {r['ops']:>6} {r['errors']:>5} "
+              f"{r['throughput']:>9.1f} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {round_trips:>6}")
+    print("=" * 104)
+
+
+def run_benchmark(args):
+    results = []
+    with tempfile.TemporaryDirectory(prefix='data_bench_') as workdir:
+        for scale in args.scales:
+            db_path = os.path.join(workdir, f"bench_{scale}.db")
+            print(f"Seeding {scale} accounts...")
+            started = time.perf_counter()
+            db = seed_sqlite(db_path, scale, args.seed)
+            print(f"  seeded in {time.perf_counter() - started:.1f}s")
+
+            api_manager = APIManager(db_path)
+            api_key = api_manager.generate_api_key('benchmark', rate_limit=10 ** 9)['api_key']
+            pool = available_account_ids(db_path, BENCH_WEBSITE, args.ops)
+
+            fake_client = None
+            if args.backend == 'supabase-fake':
+                # Imported here so the SQLite benchmark does not need supabase-py
+                from src.supabase_db import SupabaseDB
+                fake_client = FakeSupabaseClient(latency_ms=args.latency_ms)
+                fake_client.load_from_sqlite(db_path)
+                db = SupabaseDB(client=fake_client)
+
+            operations = database_operations(db, api_manager, api_key, pool)
+            server = None
+            if args.http:
+                server = start_api_server(db_path, args.port)
+                operations += http_operations(f"http://127.0.0.1:{args.port}", api_key)
+
+            try:
+                for concurrency in args.concurrency:
+                    for name, func in operations:
+                        ops = min(args.ops, len(pool)) if 'rent' in name or 'return' in name else args.ops
+                        print(f"  {name} x{ops} at concurrency {concurrency}...")
+                        if fake_client:
+                            fake_client.reset_round_trips()
+                        result = run_operation(func, ops, concurrency)
+                        result.update({'operation': name, 'scale': scale, 'concurrency': concurrency})
+                        if fake_client and not name.startswith('http'):
+                            result['round_trips_per_op'] = fake_client.reset_round_trips() / ops if ops else 0.0
+                        results.append(result)
+            finally:
+                if server:
+                    server.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the rental data layer')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1000, 100000],
+                        help='Account counts to test (default: 1000 100000)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16],
+                        help='Concurrency levels (default: 1 4 16)')
+    parser.add_argument('--ops', type=int, default=200, help='Calls per operation and level (default: 200)')
+    parser.add_argument('--backend', choices=['sqlite', 'supabase-fake'], default='sqlite',
+                        help='Database backend; supabase-fake runs SupabaseDB on the in-memory client')
+    parser.add_argument('--latency-ms', type=float, default=0,
+                        help='Simulated round-trip latency for supabase-fake (default: 0)')
+    parser.add_argument('--http', action='store_true', help='Also benchmark the HTTP endpoints')
+    parser.add_argument('--port', type=int, default=5099, help='Port for the HTTP benchmark server')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the dataset')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    parser.add_argument('--compare', nargs='+', metavar='RUN.json',
+                        help='Baseline to compare this run against, or BASELINE CURRENT to only compare')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Regression threshold in percent (default: 10)')
+    parser.add_argument('--min-delta-ms', type=float, default=0.5,
+                        help='Ignore p95 changes smaller than this (default: 0.5 ms)')
+    args = parser.parse_args()
+    if args.http and args.backend != 'sqlite':
+        parser.error("--http is only supported with the sqlite backend")
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        sys.exit(1 if compare_runs(baseline, current, args.threshold, args.min_delta_ms) else 0)
+
+    run = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'git_commit': git_commit(),
+            'backend': args.backend,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'settings': {k: v for k, v in vars(args).items() if k not in ('output', 'compare')},
+        },
+        'results': run_benchmark(args),
+    }
+    print_results(run['results'])
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(run, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        sys.exit(1 if compare_runs(baseline, run, args.threshold, args.min_delta_ms) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""
+Reset Pipeline Benchmark
+Drives ResetScheduler end-to-end against the offline unlocktool stand-in and
+reports accounts/minute at several concurrency levels.
+
+Usage:
+    python benchmark_reset_pipeline.py --accounts 20 --concurrency 1 2 4 --headless
+    python benchmark_reset_pipeline.py --engine contexts --lean --latency-ms 100 --error-rate 0.05
+"""
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+from src.database import PasswordResetDB
+from src.scheduler import ResetScheduler
+from unlocktool_standin import StandinConfig, create_app
+
+
+def start_standin(config, port):
+    """Run the stand-in app on a background thread; returns the server."""
+    server = make_server('127.0.0.1', port, create_app(config), threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def write_config(path, accounts, settings):
+    """Write an accounts config for the benchmark run."""
+    with open(path, 'w') as f:
+        json.dump({'accounts': accounts, 'settings': settings}, f, indent=2)
+
+
+def run_level(workdir, site_url, args, concurrency):
+    """Reset every benchmark account once at the given concurrency."""
+    db_path = os.path.join(workdir, f'bench_{concurrency}.db')
+    config_path = os.path.join(workdir, f'accounts_{concurrency}.json')
+
+    db = PasswordResetDB(db_path)
+    db.add_website('unlocktool', site_url, 6, 'Benchmark stand-in')
+
+    accounts = [
+        {
+            'id': i + 1,
+            'website': 'unlocktool',
+            'username': f'bench_c{concurrency}_{i:04d}',
+            'current_password': 'Initial-Passw0rd!',
+            'enabled': True
+        }
+        for i in range(args.accounts)
+    ]
+    settings = {
+        'site_url': site_url,
+        'headless': args.headless,
+        'lean_browser': args.lean,
+        'reset_engine': args.engine,
+        'reset_concurrency': concurrency,
+        'reset_deadline_seconds': args.deadline,
+        'email_notifications': False,
+        'cloud_sync': False
+    }
+    write_config(config_path, accounts, settings)
+
+    scheduler = ResetScheduler(config_path=config_path, db_path=db_path)
+    try:
+        start = time.monotonic()
+        results = scheduler.reset_all_accounts()
+        elapsed = time.monotonic() - start
+    finally:
+        scheduler.stop()
+
+    return {
+        'concurrency': concurrency,
+        'accounts': results['total'],
+        'successful': results['successful'],
+        'failed': results['failed'],
+        'elapsed_seconds': elapsed,
+        'accounts_per_minute': results['total'] / elapsed * 60 if elapsed else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the reset pipeline against the stand-in')
+    parser.add_argument('--accounts', type=int, default=10, help='Accounts per run (default: 10)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4],
+                        help='Concurrency levels to test (default: 1 2 4)')
+    parser.add_argument('--engine', choices=['browser', 'contexts'], default='browser',
+                        help='Reset engine (default: browser)')
+    parser.add_argument('--lean', action='store_true', help='Use the lean browsing profile')
+    parser.add_argument('--headless', action='store_true', help='Run Chrome headless')
+    parser.add_argument('--deadline', type=int, default=120, help='Per-account hard deadline in seconds')
+    parser.add_argument('--port', type=int, default=8765, help='Stand-in port (default: 8765)')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Stand-in latency per request')
+    parser.add_argument('--slow-rate', type=float, default=0, help='Fraction of slow stand-in requests')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of stand-in HTTP 500s')
+    parser.add_argument('--wrong-password-rate', type=float, default=0, help='Fraction of rejected logins')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for fault injection')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    config = StandinConfig(
+        latency_ms=args.latency_ms,
+        slow_rate=args.slow_rate,
+        error_rate=args.error_rate,
+        wrong_password_rate=args.wrong_password_rate,
+        seed=args.seed
+    )
+    server = start_standin(config, args.port)
+    site_url = f'http://127.0.0.1:{args.port}'
+
+    levels = []
+    try:
+        with tempfile.TemporaryDirectory(prefix='reset_bench_') as workdir:
+            for concurrency in args.concurrency:
+                print(f"Resetting {args.accounts} account(s) at concurrency {concurrency}...")
+                levels.append(run_level(workdir, site_url, args, concurrency))
+    finally:
+        server.shutdown()
+
+    print("\n" + "=" * 72)
+    print(f"RESET PIPELINE BENCHMARK - engine={args.engine}, lean={args.lean}")
+    print("=" * 72)
+    print(f"{'Concurrency':>11} {'Accounts':>9} {'OK':>5} {'Failed':>7} {'Seconds':>9} {'Accounts/min':>13}")
+    print("-" * 72)
+    for level in levels:
+        print(f"{level['concurrency']:>11} {level['accounts']:>9} {level['successful']:>5} "
+              f"{level['failed']:>7} {level['elapsed_seconds']:>9.1f} {level['accounts_per_minute']:>13.1f}")
+    print("=" * 72)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'settings': vars(args), 'levels': levels}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
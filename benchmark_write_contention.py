@@ -0,0 +1,154 @@
+"""
+Write Contention Benchmark
+Measures rent throughput when many threads write to the SQLite database at
+once, with every thread on its own connection (the default) and with all
+writes going through the single-writer actor (src/write_actor.py). Each
+rent is what the API does for POST /api/accounts/rent: rent_account,
+log_api_request and update_api_usage. Optional external writer processes
+stand in for CLI scripts holding the write lock from outside.
+
+Usage:
+    python benchmark_write_contention.py
+    python benchmark_write_contention.py --concurrency 1 8 32 --ops 2000
+    python benchmark_write_contention.py --external-writers 2 --output contention.json
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from benchmark_data_layer import BENCH_WEBSITE, available_account_ids, git_commit, run_operation, seed_sqlite
+from src.api_manager import APIManager
+from src.database import PasswordResetDB
+from src.write_actor import SQLiteWriteActor
+
+
+MODES = ('direct', 'actor')
+
+
+def external_writer(db_path, stop, hold_ms):
+    """Short exception-flag updates in a loop, like manage_exceptions.py run by hand."""
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    while not stop.is_set():
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("""
+            UPDATE accounts SET failed_login_attempts = failed_login_attempts
+            WHERE id = (SELECT MAX(id) FROM accounts WHERE status = 'exception')
+        """)
+        time.sleep(hold_ms / 1000.0)
+        conn.commit()
+        time.sleep(0.01)
+    conn.close()
+
+
+def rent_operation(db, api_manager, api_key_id, pool):
+    """func(i) renting pool[i] the way the rent endpoint does."""
+    def rent(i):
+        rental = db.rent_account(pool[i], customer_name='benchmark')
+        if rental is None:
+            raise RuntimeError("account no longer available")
+        api_manager.log_api_request(api_key_id, rental['account_id'], rental['website'],
+                                    'rent', 'success', '127.0.0.1', 'benchmark')
+        api_manager.update_api_usage(api_key_id)
+    return rent
+
+
+def run_level(workdir, args, mode, concurrency):
+    """Seed a fresh database and rent args.ops accounts from `concurrency` threads."""
+    db_path = os.path.join(workdir, f"contention_{mode}_{concurrency}.db")
+    seed_sqlite(db_path, args.accounts, args.seed)
+    pool = available_account_ids(db_path, BENCH_WEBSITE, args.ops)
+
+    actor = SQLiteWriteActor(db_path, max_batch=args.max_batch) if mode == 'actor' else None
+    db = PasswordResetDB(db_path, write_actor=actor)
+    api_manager = APIManager(db_path, write_actor=actor)
+    api_key_id = api_manager.generate_api_key('benchmark', rate_limit=10 ** 9)['id']
+
+    stop = multiprocessing.Event()
+    writers = [
+        multiprocessing.Process(target=external_writer, args=(db_path, stop, args.hold_ms), daemon=True)
+        for _ in range(args.external_writers)
+    ]
+    for writer in writers:
+        writer.start()
+    try:
+        result = run_operation(rent_operation(db, api_manager, api_key_id, pool), len(pool), concurrency)
+    finally:
+        stop.set()
+        for writer in writers:
+            writer.join()
+        if actor is not None:
+            actor.close()
+
+    result.update({'mode': mode, 'concurrency': concurrency})
+    return result
+
+
+def print_results(results):
+    print("\n" + "=" * 86)
+    print("WRITE CONTENTION BENCHMARK - rent_account + log_api_request + update_api_usage")
+    print("=" * 86)
+    print(f"{'Mode':<8} {'Conc':>5} {'Ops':>6} {'Err':>5} {'rents/s':>9} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'speedup':>12}")
+    print("-" * 86)
+    direct = {r['concurrency']: r for r in results if r['mode'] == 'direct'}
+    for r in results:
+        speedup = '-'
+        if r['mode'] == 'actor' and direct.get(r['concurrency'], {}).get('throughput'):
+            speedup = f"{r['throughput'] / direct[r['concurrency']]['throughput']:.2f}x"
+        print(f"{r['mode']:<8} {r['concurrency']:>5} {r['ops']:>6} {r['errors']:>5} {r['throughput']:>9.1f} "
+              f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {speedup:>12}")
+    print("=" * 86)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark rent throughput under write contention')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                        help='Writer threads (default: 1 8 32)')
+    parser.add_argument('--ops', type=int, default=1000, help='Rents per level (default: 1000)')
+    parser.add_argument('--accounts', type=int, default=10000, help='Accounts in the database (default: 10000)')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES),
+                        help='Write paths to compare (default: direct actor)')
+    parser.add_argument('--max-batch', type=int, default=64, help='Write actor batch size (default: 64)')
+    parser.add_argument('--external-writers', type=int, default=0,
+                        help='Processes writing from outside, like CLI scripts (default: 0)')
+    parser.add_argument('--hold-ms', type=float, default=5.0,
+                        help='How long each external write holds the lock (default: 5 ms)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed for the dataset')
+    parser.add_argument('--output', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='contention_bench_') as workdir:
+        for concurrency in args.concurrency:
+            for mode in args.modes:
+                print(f"  {mode} at concurrency {concurrency}...")
+                results.append(run_level(workdir, args, mode, concurrency))
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.now().isoformat(),
+                    'git_commit': git_commit(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'settings': {k: v for k, v in vars(args).items() if k != 'output'},
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
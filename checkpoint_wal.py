@@ -0,0 +1,66 @@
+"""
+Checkpoint WAL
+Shows the size of the SQLite write-ahead log and how far checkpoints lag
+behind, and runs a checkpoint by hand. The API server and the scheduler
+checkpoint in the background (see src/wal_checkpoint.py); use this when the
+-wal file has grown, e.g. after a long-running report.
+
+Usage:
+    python checkpoint_wal.py
+    python checkpoint_wal.py --truncate
+    python checkpoint_wal.py --watch 5
+"""
+
+import argparse
+import time
+
+from src.wal_checkpoint import CheckpointManager
+
+
+def print_status(manager: CheckpointManager, result: dict):
+    status = manager.get_status()
+    complete = not result['busy'] and result['checkpointed_frames'] >= result['log_frames']
+    print(f"  WAL size:        {status['wal_bytes'] / 1024 / 1024:>10.2f} MB")
+    print(f"  Frames in WAL:   {status['log_frames']:>10,}")
+    print(f"  Checkpointed:    {status['checkpointed_frames']:>10,}")
+    print(f"  Lag:             {status['lag_frames']:>10,} frames "
+          f"({status['lag_bytes'] / 1024 / 1024:.2f} MB)")
+    if complete:
+        print(f"  ✓ {status['last_checkpoint_mode']} checkpoint complete")
+    else:
+        print(f"  ⚠️  {status['last_checkpoint_mode']} checkpoint incomplete - "
+              f"a reader still uses an older snapshot")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Show WAL size and checkpoint lag, and checkpoint')
+    parser.add_argument('--db-path', default='database/rental_system.db', help='SQLite database file')
+    parser.add_argument('--truncate', action='store_true',
+                        help='TRUNCATE checkpoint: wait briefly for readers and reset the WAL to 0 bytes')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='Seconds a TRUNCATE checkpoint waits for readers (default: 5)')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help='Repeat a PASSIVE checkpoint every SECONDS until interrupted')
+    args = parser.parse_args()
+
+    manager = CheckpointManager(args.db_path, truncate_timeout=args.timeout, record_metrics=False)
+
+    print("\n" + "=" * 60)
+    print(f"WAL CHECKPOINT - {args.db_path}")
+    print("=" * 60)
+    print(f"  WAL size before: {manager.wal_size() / 1024 / 1024:>10.2f} MB\n")
+
+    print_status(manager, manager.checkpoint('TRUNCATE' if args.truncate else 'PASSIVE'))
+
+    if args.watch:
+        try:
+            while True:
+                time.sleep(args.watch)
+                print(f"\n{time.strftime('%H:%M:%S')}  blocked for {manager.blocked_seconds():.0f}s")
+                print_status(manager, manager.checkpoint('PASSIVE'))
+        except KeyboardInterrupt:
+            print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+Database Statement Report
+Summarizes the per-statement stats written by src/db_instrumentation.py
+(run the services with DB_INSTRUMENTATION=1 to collect them)
+
+Usage:
+    python db_query_report.py
+    python db_query_report.py --sort p95 --top 10 --backend sqlite
+    python db_query_report.py --json report.json
+"""
+
+import argparse
+import glob
+import json
+import os
+from collections import Counter
+
+from src import db_instrumentation
+
+
+def load_stats(directory):
+    """Merge the JSON stat files of all processes by (backend, statement)."""
+    merged = {}
+    buckets_ms = list(db_instrumentation.BUCKETS_MS)
+
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path) as f:
+            data = json.load(f)
+        buckets_ms = data.get('buckets_ms', buckets_ms)
+
+        for stat in data['statements']:
+            key = (stat['backend'], stat['statement'])
+            entry = merged.get(key)
+            if entry is None:
+                entry = merged[key] = {
+                    'backend': stat['backend'], 'statement': stat['statement'],
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                    'buckets': [0] * len(stat['buckets']), 'callers': Counter()
+                }
+            entry['count'] += stat['count']
+            entry['total_ms'] += stat['total_ms']
+            entry['max_ms'] = max(entry['max_ms'], stat['max_ms'])
+            entry['rows'] += stat['rows']
+            entry['buckets'] = [a + b for a, b in zip(entry['buckets'], stat['buckets'])]
+            entry['callers'].update(stat['callers'])
+
+    return list(merged.values()), buckets_ms
+
+
+def bucket_percentile(buckets, bounds, pct):
+    """Upper bound of the histogram bucket containing the pct-th percentile."""
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    rank = total * pct / 100.0
+    cumulative = 0
+    for bound, count in zip(list(bounds) + [float('inf')], buckets):
+        cumulative += count
+        if cumulative >= rank:
+            return bound
+    return float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Database statement timing report')
+    parser.add_argument('--dir', default=db_instrumentation.stats_dir,
+                        help=f'Stats directory (default: {db_instrumentation.stats_dir})')
+    parser.add_argument('--sort', choices=['total', 'avg', 'p95', 'max', 'calls'], default='total',
+                        help='Sort order (default: total time)')
+    parser.add_argument('--top', type=int, default=20, help='Statements to show (default: 20)')
+    parser.add_argument('--backend', choices=['sqlite', 'supabase'], help='Only show this backend')
+    parser.add_argument('--json', dest='json_path', help='Also write the report as JSON to this file')
+    args = parser.parse_args()
+
+    stats, bounds = load_stats(args.dir)
+    if args.backend:
+        stats = [s for s in stats if s['backend'] == args.backend]
+
+    for s in stats:
+        s['avg_ms'] = s['total_ms'] / s['count'] if s['count'] else 0.0
+        s['p50_ms'] = bucket_percentile(s['buckets'], bounds, 50)
+        s['p95_ms'] = bucket_percentile(s['buckets'], bounds, 95)
+        s['top_caller'] = s['callers'].most_common(1)[0][0] if s['callers'] else ''
+
+    sort_keys = {
+        'total': 'total_ms', 'avg': 'avg_ms', 'p95': 'p95_ms', 'max': 'max_ms', 'calls': 'count'
+    }
+    stats.sort(key=lambda s: s[sort_keys[args.sort]], reverse=True)
+
+    print("\n" + "=" * 110)
+    print(f"DATABASE STATEMENTS - {args.dir}")
+    print("=" * 110)
+
+    if not stats:
+        print("\nNo statement stats found. Run with DB_INSTRUMENTATION=1 to collect them.")
+        return
+
+    print(f"{'Backend':<9} {'Calls':>8} {'Total ms':>10} {'Avg ms':>8} {'p95 ms':>8} {'Max ms':>8} "
+          f"{'Rows/call':>9}  Statement / top caller")
+    print("-" * 110)
+    for s in stats[:args.top]:
+        p95 = '>' + str(bounds[-1]) if s['p95_ms'] == float('inf') else f"{s['p95_ms']:g}"
+        rows_per_call = s['rows'] / s['count'] if s['count'] else 0
+        statement = s['statement'] if len(s['statement']) <= 60 else s['statement'][:57] + '...'
+        print(f"{s['backend']:<9} {s['count']:>8} {s['total_ms']:>10.1f} {s['avg_ms']:>8.2f} {p95:>8} "
+              f"{s['max_ms']:>8.1f} {rows_per_call:>9.1f}  {statement}")
+        print(f"{'':<66}  ↳ {s['top_caller']}")
+    print("=" * 110)
+    print(f"Histogram p50/p95 are bucket upper bounds (ms); slow threshold: "
+          f"{db_instrumentation.slow_query_ms:g} ms")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump([
+                {**s, 'callers': dict(s['callers']),
+                 'p95_ms': None if s['p95_ms'] == float('inf') else s['p95_ms'],
+                 'p50_ms': None if s['p50_ms'] == float('inf') else s['p50_ms']}
+                for s in stats
+            ], f, indent=2)
+        print(f"\nReport written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,65 +1,76 @@
 """
 Check and manually expire old rentals
+
+Interactive by default (Supabase): lists active rentals and asks before
+expiring each overdue one. --batch expires every overdue rental with one
+set-based statement (auto_expire_rentals() on Supabase) and no prompts, so
+it can run from cron; --dry-run only reports what would be expired.
+
+Usage:
+    python expire_old_rentals.py
+    python expire_old_rentals.py --batch
+    python expire_old_rentals.py --dry-run
+    python expire_old_rentals.py --batch --backend sqlite --db-path database/rental_system.db
 """
-from src.supabase_db import SupabaseDB
+
+import argparse
+import time
 from datetime import datetime
 
-print("\n" + "="*80)
-print("CHECKING EXPIRED RENTALS")
-print("="*80 + "\n")
 
-db = SupabaseDB()
+def expire_interactively(db):
+    """List active rentals and expire overdue ones after a prompt each (Supabase)."""
+    # Get all active rentals
+    result = db.client.table('rentals').select('*, accounts(id, username)').eq('status', 'active').execute()
 
-# Get all active rentals
-result = db.client.table('rentals').select('*, accounts(id, username)').eq('status', 'active').execute()
+    if not result.data:
+        print("✅ No active rentals found")
+        return
 
-if not result.data:
-    print("✅ No active rentals found")
-else:
     now = datetime.now()
     print(f"Current time: {now.strftime('%Y-%m-%d %H:%M:%S')}\n")
     print(f"Found {len(result.data)} active rental(s):\n")
-    
+
     expired_count = 0
-    
+
     for rental in result.data:
         account = rental['accounts']
         expires_at = datetime.fromisoformat(rental['expires_at'].replace('Z', '+00:00'))
-        
+
         # Calculate time difference
         time_diff = expires_at - now
         hours_remaining = time_diff.total_seconds() / 3600
-        
+
         is_expired = expires_at < now
-        
+
         print(f"Rental ID: {rental['id']}")
         print(f"  Account: {account['username']} (ID: {account['id']})")
         print(f"  Customer: {rental.get('customer_name', 'Unknown')}")
         print(f"  Rented at: {rental['rented_at']}")
         print(f"  Expires at: {rental['expires_at']}")
         print(f"  Status: {'🔴 EXPIRED' if is_expired else '🟢 ACTIVE'}")
-        
+
         if is_expired:
             hours_ago = abs(hours_remaining)
             print(f"  ⚠️ Expired {hours_ago:.1f} hours ago!")
-            
+
             # Ask to expire it
             print(f"\n  Would you like to expire this rental? (yes/no): ", end='')
             response = input().strip().lower()
-            
+
             if response in ['yes', 'y']:
                 # Mark rental as expired
                 db.client.table('rentals').update({
                     'status': 'expired',
                     'returned_at': now.isoformat()
                 }).eq('id', rental['id']).execute()
-                
+
                 # Mark account as available
                 db.client.table('accounts').update({
                     'status': 'available',
                     'available_at': now.isoformat()
                 }).eq('id', account['id']).execute()
-                
+
                 print(f"  ✅ Rental {rental['id']} marked as expired")
                 print(f"  ✅ Account {account['username']} marked as available")
                 expired_count += 1
@@ -67,18 +78,70 @@ else:
                 print(f"  ⏭️ Skipped")
         else:
             print(f"  Time remaining: {hours_remaining:.1f} hours")
-        
+
         print()
-    
-    print("="*80)
+
+    print("=" * 80)
     print(f"Summary: {expired_count} rental(s) expired")
-    print("="*80 + "\n")
-
-# Show updated statistics
-print("\n📊 Updated Statistics:")
-stats = db.get_dashboard_stats()
-print(f"   Total Accounts: {stats['total_accounts']}")
-print(f"   Available: {stats['available_accounts']} 🟢")
-print(f"   Rented: {stats['rented_accounts']} 🔵")
-print(f"   Exceptions: {stats['exception_accounts']} 🔴")
-print()
+    print("=" * 80 + "\n")
+
+
+def print_overdue_summary(db):
+    summary = db.get_overdue_rentals_summary()
+    print(f"Overdue rentals: {summary['overdue']}")
+    if summary['overdue']:
+        print(f"  Oldest expired at: {summary['oldest_expires_at']}")
+        for website, count in sorted(summary['by_website'].items()):
+            print(f"  {website:<20} {count:>6}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Expire rentals that are past expires_at')
+    parser.add_argument('--batch', action='store_true',
+                        help='Expire every overdue rental in one statement, without prompts')
+    parser.add_argument('--dry-run', action='store_true', help='Only report the overdue rentals')
+    parser.add_argument('--backend', choices=['sqlite', 'supabase'], default='supabase',
+                        help='Database to expire rentals in (default: supabase)')
+    parser.add_argument('--db-path', default='database/rental_system.db', help='SQLite database file')
+    args = parser.parse_args()
+
+    if args.backend == 'sqlite' and not (args.batch or args.dry_run):
+        parser.error("the interactive mode is Supabase only; use --batch or --dry-run with --backend sqlite")
+
+    if args.backend == 'supabase':
+        from src.supabase_db import SupabaseDB
+        db = SupabaseDB()
+    else:
+        from src.database import PasswordResetDB
+        db = PasswordResetDB(args.db_path)
+
+    print("\n" + "=" * 80)
+    print("CHECKING EXPIRED RENTALS" + (" (dry run)" if args.dry_run else ""))
+    print("=" * 80 + "\n")
+
+    if args.dry_run:
+        print_overdue_summary(db)
+        print("\nNothing changed (dry run)")
+        return
+
+    if args.batch:
+        started = time.perf_counter()
+        expired = db.expire_overdue_rentals()
+        print(f"✅ {expired} rental(s) expired in {time.perf_counter() - started:.2f}s")
+    else:
+        expire_interactively(db)
+
+    # Show updated statistics
+    print("\n📊 Updated Statistics:")
+    stats = db.get_dashboard_stats()
+    print(f"   Total Accounts: {stats['total_accounts']}")
+    print(f"   Available: {stats['available_accounts']} 🟢")
+    print(f"   Rented: {stats['rented_accounts']} 🔵")
+    if 'exception_accounts' in stats:
+        print(f"   Exceptions: {stats['exception_accounts']} 🔴")
+    print()
+
+
+if __name__ == '__main__':
+    main()
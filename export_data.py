@@ -0,0 +1,85 @@
+"""
+Export Data
+Streams rentals, password history or API usage for a date range as CSV or
+NDJSON, one keyset page at a time, so memory stays flat however large the
+range is. An interrupted export to a file continues with --resume from the
+last complete row. See src/export.py.
+
+Usage:
+    python export_data.py rentals --start 2026-01-01 --end 2026-02-01 --output rentals.csv --format csv
+    python export_data.py api_usage --start 2026-01-01 --format ndjson > usage.ndjson
+    python export_data.py api_usage --start 2026-01-01 --output usage.ndjson --resume
+    python export_data.py password_history --backend supabase --output history.ndjson
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from src.export import EXPORT_TABLES, FORMATS, SQLiteExporter, SupabaseExporter, last_exported_id, parse_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream rentals, password history or API usage as CSV/NDJSON')
+    parser.add_argument('table', choices=list(EXPORT_TABLES), help='Table to export')
+    parser.add_argument('--format', choices=list(FORMATS), default='ndjson', help='Output format (default: ndjson)')
+    parser.add_argument('--start', help='Rows at or after this ISO date/time (UTC)')
+    parser.add_argument('--end', help='Rows before this ISO date/time (UTC)')
+    parser.add_argument('--after-id', type=int, default=0, help='Resume after this id')
+    parser.add_argument('--output', help='Output file (default: stdout)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Append to --output after its last complete row')
+    parser.add_argument('--backend', choices=['sqlite', 'supabase'], default='sqlite',
+                        help='Database to export from (default: sqlite; api_usage is always sqlite)')
+    parser.add_argument('--db-path', default='database/rental_system.db', help='SQLite database file')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per page (default: 1000)')
+    args = parser.parse_args()
+
+    if args.resume and not args.output:
+        parser.error("--resume needs --output")
+    try:
+        start, end = parse_time(args.start), parse_time(args.end)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.backend == 'supabase' and args.table != 'api_usage':
+        from src.supabase_db import SupabaseDB
+        exporter = SupabaseExporter(SupabaseDB().client, chunk_size=args.chunk_size)
+    else:
+        exporter = SQLiteExporter(args.db_path, chunk_size=args.chunk_size)
+
+    after_id = args.after_id
+    # CSV header only at the top of a new file
+    header = not (args.resume and os.path.exists(args.output) and os.path.getsize(args.output))
+    if args.resume:
+        after_id = max(after_id, last_exported_id(args.output, args.format))
+
+    # Progress goes to stderr so stdout carries only the export
+    log = sys.stderr
+    print("\n" + "=" * 60, file=log)
+    print(f"EXPORT DATA - {args.table} ({args.format})", file=log)
+    print("=" * 60, file=log)
+    if after_id:
+        print(f"Resuming after id {after_id}", file=log)
+
+    out = open(args.output, 'a' if args.resume else 'w', newline='') if args.output else sys.stdout
+    started = time.perf_counter()
+    try:
+        for chunk in exporter.stream(args.table, fmt=args.format, start=start, end=end, after_id=after_id,
+                                      header=header):
+            out.write(chunk)
+            out.flush()
+    except KeyboardInterrupt:
+        print(f"\n⚠️  Interrupted after id {exporter.last_id}; continue with --resume or --after-id", file=log)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✓ Exported {exporter.rows_exported:,} rows (last id {exporter.last_id}) in {elapsed:.1f}s"
+          + (f" to {args.output}" if args.output else ""), file=log)
+
+
+if __name__ == '__main__':
+    main()
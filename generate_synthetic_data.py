@@ -0,0 +1,88 @@
+"""
+Synthetic Data Generator
+Fills the SQLite database or Supabase with a production-sized synthetic
+dataset (websites, accounts, rentals, password history, API keys, API usage
+and error logs) for load testing. See src/synthetic_data.py for the
+distributions used.
+
+Usage:
+    python generate_synthetic_data.py --preset production --db-path database/loadtest.db
+    python generate_synthetic_data.py --preset small --accounts 5000 --rentals 80000
+    python generate_synthetic_data.py --backend supabase --preset medium --yes
+"""
+
+import argparse
+import logging
+import time
+
+from src.synthetic_data import PRESETS, SQLiteLoader, SupabaseLoader, generate_dataset
+
+
+TABLES = ['websites', 'accounts', 'rentals', 'password_history', 'api_keys', 'api_usage', 'error_logs']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic dataset for load testing')
+    parser.add_argument('--backend', choices=['sqlite', 'supabase'], default='sqlite',
+                        help='Target backend (default: sqlite)')
+    parser.add_argument('--db-path', default='database/loadtest.db',
+                        help='SQLite database file (default: database/loadtest.db)')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='small',
+                        help='Dataset size (default: small)')
+    for table in TABLES:
+        parser.add_argument(f"--{table.replace('_', '-')}", type=int, dest=table,
+                            help=f'Number of {table} rows (overrides the preset)')
+    parser.add_argument('--days', type=int, default=90, help='History window in days (default: 90)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed; use another seed to add a second dataset (default: 42)')
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help='Rows per Supabase insert request (default: 1000)')
+    parser.add_argument('--yes', action='store_true', help='Do not ask for confirmation')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    counts = dict(PRESETS[args.preset])
+    for table in TABLES:
+        if getattr(args, table) is not None:
+            counts[table] = getattr(args, table)
+
+    target = args.db_path if args.backend == 'sqlite' else 'Supabase'
+
+    print("\n" + "=" * 60)
+    print(f"SYNTHETIC DATA → {target}")
+    print("=" * 60)
+    for table in TABLES:
+        print(f"  {table:<18} {counts[table]:>12,}")
+    print("=" * 60)
+
+    if not args.yes:
+        confirm = input(f"\nInsert this data into {target}? (yes/no): ").strip().lower()
+        if confirm != 'yes':
+            print("❌ Cancelled")
+            return
+
+    if args.backend == 'sqlite':
+        loader = SQLiteLoader(args.db_path)
+    else:
+        from src.supabase_db import SupabaseDB
+        loader = SupabaseLoader(SupabaseDB().client, batch_size=args.batch_size)
+
+    started = time.perf_counter()
+    last = [started]
+
+    def progress(table, rows):
+        now = time.perf_counter()
+        print(f"  ✓ {table:<18} {rows:>12,} rows in {now - last[0]:6.1f}s")
+        last[0] = now
+
+    print()
+    inserted = generate_dataset(loader, counts, seed=args.seed, days=args.days, progress=progress)
+
+    print("\n" + "=" * 60)
+    print(f"✅ Inserted {sum(inserted.values()):,} rows in {time.perf_counter() - started:.1f}s")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
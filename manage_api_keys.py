@@ -22,9 +22,10 @@ def main():
         print("4. Revoke API key")
         print("5. View usage statistics")
         print("6. View recent activity")
-        print("7. Exit")
+        print("7. Prune old usage logs")
+        print("8. Exit")
         
-        choice = input("\nEnter your choice (1-7): ").strip()
+        choice = input("\nEnter your choice (1-8): ").strip()
         
         if choice == '1':
             create_api_key(api_manager)
@@ -39,6 +40,8 @@ def main():
         elif choice == '6':
             view_recent_activity(api_manager)
         elif choice == '7':
+            prune_usage_logs(api_manager)
+        elif choice == '8':
             print("\nGoodbye!")
             break
         else:
@@ -217,5 +220,28 @@ def view_recent_activity(api_manager):
         print()
 
 
+def prune_usage_logs(api_manager):
+    """Delete raw usage rows past the retention window (rollups keep the counts)."""
+    from src.api_manager import USAGE_RETENTION_DAYS, HOURLY_ROLLUP_RETENTION_DAYS
+    
+    print("\n" + "="*60)
+    print("Prune Usage Logs")
+    print("="*60)
+    
+    days = input(f"\nKeep raw usage rows for how many days? (default {USAGE_RETENTION_DAYS}, 0 = forever): ").strip()
+    days = int(days) if days.isdigit() else USAGE_RETENTION_DAYS
+    
+    raw_rows = f"usage rows older than {days} days" if days else "no usage rows"
+    confirm = input(f"\n⚠️  Delete {raw_rows} and hourly rollups older than "
+                    f"{HOURLY_ROLLUP_RETENTION_DAYS} days? (yes/no): ").strip().lower()
+    if confirm != 'yes':
+        print("\nPrune cancelled.")
+        return
+    
+    deleted = api_manager.prune_api_usage(retention_days=days)
+    print(f"\n✓ Deleted {deleted['api_usage']} usage rows and {deleted['api_usage_hourly']} hourly rollup rows")
+    print("  Daily statistics are kept.")
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,351 @@
+"""
+API Traffic Replay
+Exports a time window of the api_usage log (rent / return / check calls)
+to an NDJSON trace and replays it against a running API instance, at the
+original pace, N× faster or as fast as possible, then reports throughput,
+latency percentiles and error rates.
+
+Returns and checks refer to the accounts rented during the replay: when
+the trace rents account 17 and later returns it, the replay returns
+whichever account its own rent call received. Plaintext API keys are not
+written to the trace; they are looked up by id in --key-db at replay time
+(or one --api-key is used for every request).
+
+Usage:
+    python replay_api_usage.py export --since "2026-10-10 18:00" --until "2026-10-10 22:00" --output peak.ndjson
+    python replay_api_usage.py replay peak.ndjson --url http://localhost:5000 --speed 10 --concurrency 32
+    python replay_api_usage.py replay peak.ndjson --speed 0 --api-key urt_xxx --json result.json
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from src.utils import StatsHelper
+
+
+ACTIONS = ('rent', 'return', 'check')
+
+
+# ===================== EXPORT =====================
+
+def export_sqlite(db_path, since, until, api_key_id=None):
+    """Yield api_usage records between since and until, oldest first."""
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    conn.row_factory = sqlite3.Row
+    query = """
+        SELECT api_key_id, account_id, website, action, timestamp, response_status
+        FROM api_usage
+        WHERE timestamp >= ? AND timestamp < ?
+    """
+    params = [since, until]
+    if api_key_id is not None:
+        query += " AND api_key_id = ?"
+        params.append(api_key_id)
+    query += " ORDER BY timestamp, id"
+    try:
+        for row in conn.execute(query, params):
+            yield dict(row)
+    finally:
+        conn.close()
+
+
+def export_supabase(since, until, api_key_id=None, page_size=1000):
+    """Yield api_usage_logs records between since and until, oldest first."""
+    from src.supabase_db import SupabaseDB
+
+    client = SupabaseDB().client
+    start = 0
+    while True:
+        query = client.table('api_usage_logs').select(
+            'api_key_id, account_id, website, action, created_at, response_status'
+        ).gte('created_at', since.replace(' ', 'T')).lt('created_at', until.replace(' ', 'T'))
+        if api_key_id is not None:
+            query = query.eq('api_key_id', api_key_id)
+        rows = query.order('created_at').order('id').range(start, start + page_size - 1).execute().data
+        for row in rows:
+            row['timestamp'] = row.pop('created_at')
+            yield row
+        if len(rows) < page_size:
+            break
+        start += page_size
+
+
+def write_trace(records, path):
+    """
+    Write records as NDJSON with 'offset' (seconds since the first record).
+
+    Returns:
+        Number of records written
+    """
+    first = None
+    count = 0
+    with open(path, 'w') as f:
+        for record in records:
+            if record['action'] not in ACTIONS:
+                continue
+            ts = datetime.fromisoformat(str(record['timestamp']).replace('Z', '+00:00'))
+            if first is None:
+                first = ts
+            record['offset'] = round((ts - first).total_seconds(), 3)
+            record['timestamp'] = ts.isoformat()
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+def load_trace(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# ===================== REPLAY =====================
+
+def load_api_keys(db_path, key_ids):
+    """Plaintext keys for the given API key ids (SQLite api_keys table)."""
+    conn = sqlite3.connect(db_path, timeout=30.0)
+    try:
+        placeholders = ', '.join('?' * len(key_ids))
+        rows = conn.execute(f"SELECT id, api_key FROM api_keys WHERE id IN ({placeholders})",
+                            list(key_ids)).fetchall()
+    finally:
+        conn.close()
+    return dict(rows)
+
+
+class Replayer:
+    """Sends trace records to the API on schedule and collects the outcomes."""
+
+    def __init__(self, base_url, keys, default_key=None, speed=1.0, concurrency=16, timeout=30.0):
+        """
+        Args:
+            base_url: API base URL
+            keys: api_key_id -> plaintext API key
+            default_key: Key for records whose key id is not in keys
+            speed: Time compression (1 = original pace, 10 = ten times faster, 0 = no waiting)
+            concurrency: Maximum requests in flight
+            timeout: Per-request timeout in seconds
+        """
+        import requests
+
+        self.requests = requests
+        self.base_url = base_url.rstrip('/')
+        self.keys = keys
+        self.default_key = default_key
+        self.speed = speed
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._rented = {}           # account id in the trace -> account id rented by the replay
+        self._pending_rents = {}    # account id in the trace -> future of its latest rent
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.lags = []
+        self.skipped = Counter()
+
+    def _session(self):
+        if not hasattr(self._local, 'session'):
+            self._local.session = self.requests.Session()
+        return self._local.session
+
+    def _send(self, record, depends_on=None):
+        key = self.keys.get(record['api_key_id'], self.default_key)
+        if key is None:
+            with self._lock:
+                self.skipped['no api key'] += 1
+            return None
+
+        action = record['action']
+        account_id = record['account_id']
+        if action == 'rent':
+            method, path, body = 'POST', '/api/accounts/rent', {'website': record['website']}
+        else:
+            if depends_on is not None:
+                depends_on.result()
+            with self._lock:
+                account_id = self._rented.get(account_id, account_id)
+            if action == 'return':
+                method, path, body = 'POST', f"/api/accounts/return/{account_id}", None
+            else:
+                method, path, body = 'GET', f"/api/accounts/status/{account_id}", None
+
+        start = time.perf_counter()
+        try:
+            response = self._session().request(method, self.base_url + path, json=body,
+                                               headers={'X-API-Key': key}, timeout=self.timeout)
+            status = response.status_code
+        except self.requests.RequestException as e:
+            response, status = None, type(e).__name__
+        latency_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self.latencies[action].append(latency_ms)
+            self.statuses[action][status] += 1
+            if action == 'rent' and status == 200:
+                self._rented[record['account_id']] = response.json()['account']['id']
+        return status
+
+    def run(self, records):
+        """
+        Replay records (sorted by offset).
+
+        Returns:
+            Wall-clock duration in seconds
+        """
+        pool = ThreadPoolExecutor(max_workers=self.concurrency)
+        started = time.perf_counter()
+        try:
+            for record in records:
+                if self.speed > 0:
+                    due = started + record['offset'] / self.speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    self.lags.append(max(0.0, time.perf_counter() - due) * 1000)
+                # Returns and checks wait for the rent that maps their account
+                depends_on = None if record['action'] == 'rent' else self._pending_rents.get(record['account_id'])
+                future = pool.submit(self._send, record, depends_on)
+                if record['action'] == 'rent' and record['account_id']:
+                    self._pending_rents[record['account_id']] = future
+        finally:
+            pool.shutdown(wait=True)
+        return time.perf_counter() - started
+
+
+def summarize(replayer, duration, trace_span):
+    """Per-action and overall results as a dict."""
+    def stats(latencies, statuses):
+        total = sum(statuses.values())
+        errors = sum(count for status, count in statuses.items() if not (isinstance(status, int) and status < 400))
+        return {
+            'requests': total,
+            'errors': errors,
+            'error_rate': errors / total if total else 0.0,
+            'p50_ms': StatsHelper.percentile(latencies, 50),
+            'p95_ms': StatsHelper.percentile(latencies, 95),
+            'p99_ms': StatsHelper.percentile(latencies, 99),
+            'max_ms': max(latencies) if latencies else 0.0,
+            'statuses': {str(status): count for status, count in statuses.items()},
+        }
+
+    all_latencies = [ms for action in replayer.latencies for ms in replayer.latencies[action]]
+    all_statuses = Counter()
+    for counter in replayer.statuses.values():
+        all_statuses.update(counter)
+    overall = stats(all_latencies, all_statuses)
+    return {
+        'duration_s': duration,
+        'trace_span_s': trace_span,
+        'speed': replayer.speed,
+        'concurrency': replayer.concurrency,
+        'throughput_rps': overall['requests'] / duration if duration else 0.0,
+        'schedule_lag_p95_ms': StatsHelper.percentile(replayer.lags, 95),
+        'schedule_lag_max_ms': max(replayer.lags) if replayer.lags else 0.0,
+        'skipped': dict(replayer.skipped),
+        'overall': overall,
+        'actions': {action: stats(replayer.latencies[action], replayer.statuses[action])
+                    for action in ACTIONS if replayer.statuses[action]},
+    }
+
+
+def print_summary(result):
+    speed = f"{result['speed']:g}×" if result['speed'] > 0 else 'max'
+    print("\n" + "=" * 90)
+    print(f"REPLAY RESULT - {result['overall']['requests']} requests in {result['duration_s']:.1f}s "
+          f"(trace span {result['trace_span_s']:.1f}s, speed {speed}, "
+          f"concurrency {result['concurrency']})")
+    print("=" * 90)
+    print(f"{'Action':<10} {'Requests':>9} {'Errors':>7} {'Err %':>7} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'Max ms':>9}  Statuses")
+    print("-" * 90)
+    rows = list(result['actions'].items()) + [('overall', result['overall'])]
+    for name, s in rows:
+        statuses = ' '.join(f"{status}:{count}" for status, count in sorted(s['statuses'].items()))
+        print(f"{name:<10} {s['requests']:>9} {s['errors']:>7} {s['error_rate'] * 100:>6.2f}% "
+              f"{s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} {s['max_ms']:>9.1f}  {statuses}")
+    print("=" * 90)
+    print(f"Throughput: {result['throughput_rps']:.1f} req/s")
+    if result['speed'] > 0:
+        print(f"Schedule lag p95/max: {result['schedule_lag_p95_ms']:.1f} / {result['schedule_lag_max_ms']:.1f} ms "
+              f"(high lag means the client or server could not keep up with the trace)")
+    if result['skipped']:
+        print(f"⚠️  Skipped: {result['skipped']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export and replay recorded API traffic')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    exp = sub.add_parser('export', help='Export a time window of api_usage to an NDJSON trace')
+    exp.add_argument('--backend', choices=['sqlite', 'supabase'], default='sqlite',
+                     help='Where to read api_usage from (default: sqlite)')
+    exp.add_argument('--db-path', default='database/rental_system.db', help='SQLite database file')
+    exp.add_argument('--since', required=True, help='Window start, e.g. "2026-10-10 18:00"')
+    exp.add_argument('--until', required=True, help='Window end (exclusive)')
+    exp.add_argument('--api-key-id', type=int, help='Only export this API key')
+    exp.add_argument('--output', required=True, help='Trace file to write')
+
+    rep = sub.add_parser('replay', help='Replay a trace against a running API')
+    rep.add_argument('trace', help='Trace file written by export')
+    rep.add_argument('--url', default='http://localhost:5000', help='API base URL')
+    rep.add_argument('--speed', type=float, default=1.0,
+                     help='1 = original timing, N = N times faster, 0 = as fast as possible (default: 1)')
+    rep.add_argument('--concurrency', type=int, default=16, help='Maximum requests in flight (default: 16)')
+    rep.add_argument('--key-db', default='database/rental_system.db',
+                     help='SQLite database to look API keys up by id')
+    rep.add_argument('--api-key', help='Use this key for records whose key is not found')
+    rep.add_argument('--timeout', type=float, default=30.0, help='Request timeout in seconds')
+    rep.add_argument('--json', dest='json_path', help='Also write the result as JSON to this file')
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        if args.backend == 'sqlite':
+            records = export_sqlite(args.db_path, args.since, args.until, args.api_key_id)
+        else:
+            records = export_supabase(args.since, args.until, args.api_key_id)
+        count = write_trace(records, args.output)
+        print(f"✅ Exported {count} requests to {args.output}")
+        return
+
+    records = load_trace(args.trace)
+    if not records:
+        print("❌ Trace is empty")
+        sys.exit(1)
+
+    key_ids = {r['api_key_id'] for r in records if r['api_key_id'] is not None}
+    try:
+        keys = load_api_keys(args.key_db, key_ids) if key_ids else {}
+    except sqlite3.Error as e:
+        print(f"⚠️  Could not read API keys from {args.key_db}: {e}")
+        keys = {}
+    missing = key_ids - set(keys)
+    if missing and not args.api_key:
+        print(f"❌ No plaintext key for API key ids {sorted(missing)}; pass --api-key to use one key for them")
+        sys.exit(1)
+
+    span = records[-1]['offset']
+    print(f"Replaying {len(records)} requests spanning {span:.1f}s against {args.url} "
+          f"(speed {args.speed:g}×, concurrency {args.concurrency})...")
+
+    replayer = Replayer(args.url, keys, default_key=args.api_key, speed=args.speed,
+                        concurrency=args.concurrency, timeout=args.timeout)
+    duration = replayer.run(records)
+    result = summarize(replayer, duration, span)
+    print_summary(result)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nResult written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Reset Pipeline Timing Report
+Shows p50/p95 durations per reset step, overall and per website
+"""
+
+import argparse
+from collections import defaultdict
+
+from src.database import PasswordResetDB
+from src.utils import StatsHelper
+
+
+STEP_ORDER = [
+    '_init_driver',
+    'open_website',
+    'wait_for_cloudflare',
+    'login',
+    'reset_password',
+    'close',
+]
+
+
+def _step_sort_key(step):
+    """Sort pipeline steps in execution order, wait entries after their step."""
+    base = step.split(':', 1)[-1]
+    position = STEP_ORDER.index(base) if base in STEP_ORDER else len(STEP_ORDER)
+    return (position, step.startswith('wait:'), step)
+
+
+def print_table(title, rows):
+    """Print p50/p95 per step for a list of timing rows."""
+    by_step = defaultdict(list)
+    for row in rows:
+        by_step[row['step']].append(row['duration_ms'])
+
+    print(f"\n{title}")
+    print("-" * 70)
+    print(f"{'Step':<30} {'Count':>7} {'p50 (ms)':>12} {'p95 (ms)':>12}")
+    print("-" * 70)
+    for step in sorted(by_step, key=_step_sort_key):
+        values = by_step[step]
+        print(f"{step:<30} {len(values):>7} "
+              f"{StatsHelper.percentile(values, 50):>12.0f} "
+              f"{StatsHelper.percentile(values, 95):>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reset pipeline timing report')
+    parser.add_argument('--days', type=int, default=7, help='Days to look back (default: 7)')
+    parser.add_argument('--website', type=str, default=None, help='Only report this website')
+    parser.add_argument('--failed', action='store_true', help='Include failed attempts')
+    args = parser.parse_args()
+
+    db = PasswordResetDB()
+    rows = db.get_reset_timings(days=args.days, website=args.website)
+    if not args.failed:
+        rows = [row for row in rows if row['success']]
+
+    print("\n" + "=" * 70)
+    print(f"RESET TIMINGS - last {args.days} day(s)")
+    print("=" * 70)
+
+    if not rows:
+        print("\nNo reset timings recorded yet.")
+        return
+
+    attempts = {row['attempt_id'] for row in rows}
+    print(f"\nAttempts: {len(attempts)}")
+
+    print_table("All websites", rows)
+
+    by_website = defaultdict(list)
+    for row in rows:
+        by_website[row['website'] or 'unknown'].append(row)
+
+    for website in sorted(by_website):
+        print_table(f"Website: {website}", by_website[website])
+
+    print()
+
+
+if __name__ == '__main__':
+    main()
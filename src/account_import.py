@@ -0,0 +1,149 @@
+"""Bulk account import from CSV or JSON.
+
+Rows are parsed and validated here; the database side
+(bulk_add_accounts on PasswordResetDB and SupabaseDB) resolves websites
+once and writes in chunks. import_accounts() merges both into one report
+with a result per input row:
+
+    {'row': 3, 'website': 'unlocktool', 'username': 'u1', 'status': 'created',
+     'account_id': 42, 'error': None}
+
+status is 'created', 'exists', 'updated', 'invalid' (failed validation),
+'duplicate' (repeats an earlier row of the same import) or 'error'
+(e.g. unknown website).
+
+CSV needs a header row with website, username and password (or
+current_password) columns; email is optional. JSON is a list of objects
+with the same keys, or {"accounts": [...]}.
+"""
+
+import csv
+import io
+import json
+import os
+from collections import Counter
+from typing import Dict, List, Tuple
+
+FORMATS = ('csv', 'json')
+
+MAX_FIELD_LENGTH = 255
+
+
+def detect_format(path: str) -> str:
+    """'csv' or 'json' from a file extension."""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the format of '{path}' (expected .csv or .json)")
+    return extension
+
+
+def parse_records(text: str, fmt: str) -> List[Dict]:
+    """Raw records (dicts) from CSV or JSON text."""
+    if fmt == 'csv':
+        return list(csv.DictReader(io.StringIO(text.lstrip('\ufeff'))))
+    if fmt == 'json':
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get('accounts')
+        if not isinstance(data, list):
+            raise ValueError("JSON import must be a list of accounts or {\"accounts\": [...]}")
+        return data
+    raise ValueError(f"Unknown import format '{fmt}' (expected one of {', '.join(FORMATS)})")
+
+
+def load_records(path: str, fmt: str = None) -> List[Dict]:
+    """Raw records from a CSV or JSON file (format from the extension by default)."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return parse_records(f.read(), fmt or detect_format(path))
+
+
+def _text(record: Dict, *keys) -> str:
+    for key in keys:
+        value = record.get(key)
+        if value is not None:
+            return str(value).strip()
+    return ''
+
+
+def validate_records(records: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Split records into accounts to write and report entries for rejected rows.
+
+    Args:
+        records: Raw records from parse_records()
+
+    Returns:
+        (accounts, rejected): accounts are dicts with row, website, username,
+        password and email; rejected are report entries ('invalid' or 'duplicate')
+    """
+    accounts, rejected = [], []
+    seen = {}
+    for row, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            rejected.append({'row': row, 'website': None, 'username': None, 'status': 'invalid',
+                             'account_id': None, 'error': 'Not an object'})
+            continue
+
+        account = {
+            'row': row,
+            'website': _text(record, 'website'),
+            'username': _text(record, 'username'),
+            'password': _text(record, 'password', 'current_password'),
+            'email': _text(record, 'email') or None,
+        }
+        missing = [field for field in ('website', 'username', 'password') if not account[field]]
+        if missing:
+            error = f"Missing {', '.join(missing)}"
+        elif any(len(value) > MAX_FIELD_LENGTH for value in (account['website'], account['username'],
+                                                               account['password'], account['email'] or '')):
+            error = f"Field longer than {MAX_FIELD_LENGTH} characters"
+        elif account['email'] and '@' not in account['email']:
+            error = f"Invalid email '{account['email']}'"
+        else:
+            error = None
+
+        key = (account['website'], account['username'])
+        if error is None and key in seen:
+            rejected.append({'row': row, 'website': account['website'], 'username': account['username'],
+                             'status': 'duplicate', 'account_id': None,
+                             'error': f"Same website and username as row {seen[key]}"})
+        elif error is None:
+            seen[key] = row
+            accounts.append(account)
+        else:
+            rejected.append({'row': row, 'website': account['website'] or None,
+                             'username': account['username'] or None, 'status': 'invalid',
+                             'account_id': None, 'error': error})
+    return accounts, rejected
+
+
+def import_accounts(db, records: List[Dict], chunk_size: int = 500, update_existing: bool = False) -> List[Dict]:
+    """
+    Validate records and add the valid ones with db.bulk_add_accounts().
+
+    Args:
+        db: PasswordResetDB or SupabaseDB
+        records: Raw records from parse_records() / load_records()
+        chunk_size: Accounts per transaction (SQLite) or upsert request (Supabase)
+        update_existing: Overwrite the password/email of accounts that already exist
+
+    Returns:
+        One report entry per record, in input order
+
+    Raises:
+        ValueError: chunk_size is less than 1
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1 (got {chunk_size})")
+    accounts, rejected = validate_records(records)
+    written = db.bulk_add_accounts(accounts, chunk_size=chunk_size, update_existing=update_existing)
+    # zip() would silently drop the rows of a short result
+    if len(written) != len(accounts):
+        raise RuntimeError(f"bulk_add_accounts returned {len(written)} results for {len(accounts)} accounts")
+    report = [{'row': account['row'], **result} for account, result in zip(accounts, written)]
+    return sorted(report + rejected, key=lambda entry: entry['row'])
+
+
+def summarize(report: List[Dict]) -> Dict[str, int]:
+    """Row count per status."""
+    return dict(Counter(entry['status'] for entry in report))
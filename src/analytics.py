@@ -0,0 +1,146 @@
+"""Reports served away from the rental hot path.
+
+The API usage reports (usage stats and recent activity) scan api_usage and
+api_usage_hourly, the largest tables. Run on the live database, their long
+read transactions pin the WAL (see src/wal_checkpoint.py) and compete with
+rent/return for the page cache and disk. AnalyticsReports runs the same
+report queries either
+
+- 'snapshot': on a copy of the database refreshed in the background with
+  the online backup API (src/backup.py); the live file only sees the
+  page-stepped copy, or
+- 'readonly': on query_only, read-only connections to the live database
+  (always current, but still reading the live file).
+
+Every result can be paired with staleness(), the age of the data it came from.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from src.api_manager import APIManager
+from src.backup import snapshot
+
+
+MODES = ('snapshot', 'readonly')
+
+
+class AnalyticsReports:
+    """API usage reports from a snapshot or read-only connections."""
+
+    def __init__(self, db_path: str = "database/rental_system.db", mode: str = 'snapshot',
+                 snapshot_path: str = None, refresh_interval: float = 300.0,
+                 pages_per_step: int = 256, pause: float = 0.005):
+        """
+        Args:
+            db_path: Live SQLite database
+            mode: 'snapshot' or 'readonly' (see module docstring)
+            snapshot_path: Snapshot file (default: <db>-analytics.db next to the database)
+            refresh_interval: Seconds between snapshot refreshes
+            pages_per_step: Pages copied per backup step while refreshing
+            pause: Seconds between backup steps
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown analytics mode '{mode}' (expected one of {', '.join(MODES)})")
+        self.db_path = db_path
+        self.mode = mode
+        self.snapshot_path = snapshot_path or f"{os.path.splitext(db_path)[0]}-analytics.db"
+        self.refresh_interval = refresh_interval
+        self.pages_per_step = pages_per_step
+        self.pause = pause
+        self.logger = logging.getLogger(__name__)
+
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_refresh = None  # snapshot() result of the last refresh
+        self._taken_at = None     # wall time the current snapshot's copy started
+
+        source = self.snapshot_path if mode == 'snapshot' else db_path
+        self._api = APIManager(source, read_only=True)
+
+    # ===================== SNAPSHOT =====================
+
+    def refresh(self) -> Dict:
+        """Replace the snapshot with a fresh copy of the live database."""
+        with self._refresh_lock:
+            taken_at = time.time()
+            result = snapshot(self.db_path, self.snapshot_path,
+                              pages_per_step=self.pages_per_step, pause=self.pause)
+            self._taken_at = taken_at
+            self.last_refresh = result
+        self.logger.info(
+            f"Analytics snapshot refreshed: {result['bytes'] / 1024 / 1024:.1f} MB in "
+            f"{result['seconds']:.2f}s ({result['mb_per_s']:.1f} MB/s)"
+        )
+        return result
+
+    def _run(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.logger.error(f"Analytics snapshot refresh failed: {e}")
+
+    def start(self):
+        """Take the first snapshot now and refresh it in the background."""
+        if self.mode != 'snapshot' or (self._thread is not None and self._thread.is_alive()):
+            return
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='analytics-snapshot', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _ensure_snapshot(self):
+        if self.mode == 'snapshot' and self._taken_at is None:
+            if os.path.exists(self.snapshot_path):
+                # Left by an earlier run; as old as the file
+                self._taken_at = os.path.getmtime(self.snapshot_path)
+            else:
+                self.refresh()
+
+    def staleness(self) -> Dict:
+        """How old the data behind the reports is."""
+        if self.mode == 'readonly':
+            return {'mode': self.mode, 'as_of': datetime.now().isoformat(), 'age_seconds': 0.0}
+        self._ensure_snapshot()
+        return {
+            'mode': self.mode,
+            'as_of': datetime.fromtimestamp(self._taken_at).isoformat(),
+            'age_seconds': round(time.time() - self._taken_at, 1),
+            'refresh_interval': self.refresh_interval,
+            'last_refresh_seconds': round(self.last_refresh['seconds'], 3) if self.last_refresh else None,
+        }
+
+    # ===================== REPORTS =====================
+
+    def get_usage_stats(self, api_key_id: int = None, days: int = 30) -> Dict:
+        self._ensure_snapshot()
+        return self._api.get_usage_stats(api_key_id=api_key_id, days=days)
+
+    def get_recent_activity(self, api_key_id: int = None, limit: int = 50) -> List[Dict]:
+        self._ensure_snapshot()
+        return self._api.get_recent_activity(api_key_id=api_key_id, limit=limit)
+
+
+def from_env(db_path: str) -> Optional[AnalyticsReports]:
+    """AnalyticsReports configured by ANALYTICS_MODE (off, snapshot or readonly)."""
+    mode = os.getenv('ANALYTICS_MODE', 'off').lower()
+    if mode in ('', 'off', '0', 'false', 'no'):
+        return None
+    return AnalyticsReports(
+        db_path,
+        mode=mode,
+        snapshot_path=os.getenv('ANALYTICS_SNAPSHOT_PATH') or None,
+        refresh_interval=float(os.getenv('ANALYTICS_REFRESH_SECONDS', '300')),
+    )
@@ -3,23 +3,78 @@ API Management System for Tool Rental
 Handles API key creation, account rentals, and usage tracking
 """
 
-import sqlite3
+import os
 import secrets
 import hashlib
+import time
 from datetime import datetime
 from typing import Optional, Dict, List
 
+from src import db_instrumentation
+from src.change_detection import ChangeDetector, VersionedCache, install_table_versions
+
+
+# Raw api_usage rows older than this are deleted by prune_api_usage();
+# the daily rollups keep their counts
+USAGE_RETENTION_DAYS = int(os.getenv('API_USAGE_RETENTION_DAYS', '90'))
+# Hourly rollups are kept this long; longer stats windows start at a day boundary
+HOURLY_ROLLUP_RETENTION_DAYS = int(os.getenv('API_USAGE_HOURLY_RETENTION_DAYS', '35'))
+
+# Rollup table -> bucket expression over api_usage.timestamp
+USAGE_ROLLUPS = (
+    ('api_usage_hourly', "strftime('%Y-%m-%d %H:00:00', timestamp)"),
+    ('api_usage_daily', "date(timestamp)"),
+)
+
 
 class APIManager:
     """Manages API keys and tracks their usage."""
     
-    def __init__(self, db_path: str = "database/rental_system.db"):
+    def __init__(self, db_path: str = "database/rental_system.db", write_actor=None,
+                 cache_keys: bool = False, read_only: bool = False):
+        """
+        Args:
+            db_path: Path to the SQLite database
+            write_actor: Optional SQLiteWriteActor for key and usage writes
+                (see src/write_actor.py)
+            cache_keys: Cache validate_api_key() lookups until api_keys changes
+                (in any process; see src/change_detection.py)
+            read_only: For reports only: open read-only, query_only connections
+                and skip schema setup and the rollup backfill (see src/analytics.py)
+        """
+        if read_only and write_actor is not None:
+            raise ValueError("A read-only APIManager cannot have a write actor")
         self.db_path = db_path
-        self._init_api_tables()
+        self.write_actor = write_actor
+        self.read_only = read_only
+        if not read_only:
+            self._init_api_tables()
+            self.backfill_usage_rollups()
+        self._key_cache = None
+        if cache_keys:
+            self._key_cache = VersionedCache('api_keys', ChangeDetector(db_path), ('api_keys',))
+    
+    def _get_connection(self):
+        """Get a database connection with proper timeout."""
+        if self.read_only:
+            return db_instrumentation.connect_read_only(self.db_path)
+        return db_instrumentation.connect(self.db_path, timeout=30.0)
+    
+    def _write(self, operation):
+        """Run operation(cursor) in a write transaction, on the write actor if there is one."""
+        if self.write_actor is not None:
+            return self.write_actor.run(operation)
+        conn = self._get_connection()
+        try:
+            result = operation(conn.cursor())
+            conn.commit()
+            return result
+        finally:
+            conn.close()
     
     def _init_api_tables(self):
         """Initialize API management tables."""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         # API Keys table
@@ -70,9 +125,87 @@ class APIManager:
             ON api_keys(api_key_hash)
         """)
         
+        # Usage rollups - request counts per hour/day, API key, website and action
+        for table, _ in USAGE_ROLLUPS:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    bucket TEXT NOT NULL,
+                    api_key_id INTEGER NOT NULL,
+                    website TEXT NOT NULL,
+                    action TEXT NOT NULL,
+                    requests INTEGER NOT NULL DEFAULT 0,
+                    errors INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (api_key_id, bucket, website, action)
+                ) WITHOUT ROWID
+            """)
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table}(bucket)")
+        
+        # Accounts used per API key and day (distinct account counts)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS api_usage_daily_accounts (
+                bucket TEXT NOT NULL,
+                api_key_id INTEGER NOT NULL,
+                account_id INTEGER NOT NULL,
+                PRIMARY KEY (api_key_id, bucket, account_id)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_api_usage_daily_accounts_bucket
+            ON api_usage_daily_accounts(bucket)
+        """)
+        
+        # Raw rows up to backfill_through predate the rollups and still have
+        # to be added by backfill_usage_rollups() (0 = nothing pending);
+        # hourly buckets before hourly_pruned_before have been deleted
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS api_usage_rollup_state (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                backfill_through INTEGER NOT NULL,
+                hourly_pruned_before TEXT
+            )
+        """)
+        cursor.execute("""
+            INSERT OR IGNORE INTO api_usage_rollup_state (id, backfill_through)
+            SELECT 1, COALESCE(MAX(id), 0) FROM api_usage
+        """)
+        
+        # Bumped when a key is created, revoked or edited (not on usage updates)
+        install_table_versions(cursor, ('api_keys',))
+        
         conn.commit()
         conn.close()
     
+    def _rollup_usage(self, cursor, where: str, params: tuple):
+        """Add the api_usage rows matching where to the rollup tables."""
+        for table, bucket in USAGE_ROLLUPS:
+            cursor.execute(f"""
+                INSERT INTO {table} (bucket, api_key_id, website, action, requests, errors)
+                SELECT {bucket}, api_key_id, website, action, COUNT(*),
+                       SUM(CASE WHEN response_status = 'success' THEN 0 ELSE 1 END)
+                FROM api_usage
+                WHERE {where}
+                GROUP BY 1, 2, 3, 4
+                ON CONFLICT (api_key_id, bucket, website, action) DO UPDATE SET
+                    requests = requests + excluded.requests,
+                    errors = errors + excluded.errors
+            """, params)
+        
+        cursor.execute(f"""
+            INSERT OR IGNORE INTO api_usage_daily_accounts (bucket, api_key_id, account_id)
+            SELECT DISTINCT date(timestamp), api_key_id, account_id
+            FROM api_usage
+            WHERE {where}
+        """, params)
+    
+    def rollup_usage_range(self, cursor, after_id: int, through_id: int):
+        """
+        Add api_usage rows with after_id < id <= through_id to the rollup tables.
+        
+        For rows inserted directly instead of through log_api_request (e.g.
+        by the synthetic data loader); runs in the caller's transaction.
+        """
+        self._rollup_usage(cursor, "id > ? AND id <= ?", (after_id, through_id))
+    
     def generate_api_key(self, name: str, email: str = None, 
                         rate_limit: int = 100, notes: str = None) -> Dict:
         """
@@ -91,17 +224,14 @@ class APIManager:
         api_key = f"urt_{secrets.token_urlsafe(32)}"
         api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()
         
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO api_keys (api_key_hash, name, email, rate_limit, notes, api_key)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (api_key_hash, name, email, rate_limit, notes, api_key))
+        def write(cursor):
+            cursor.execute("""
+                INSERT INTO api_keys (api_key_hash, name, email, rate_limit, notes, api_key)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (api_key_hash, name, email, rate_limit, notes, api_key))
+            return cursor.lastrowid
         
-        api_key_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        api_key_id = self._write(write)
         
         return {
             'id': api_key_id,
@@ -121,14 +251,23 @@ class APIManager:
             api_key: The API key to validate
             
         Returns:
-            API key details if valid, None otherwise
+            API key details if valid, None otherwise. With cache_keys,
+            total_requests and last_used are as of when the key was cached
+            (see get_api_key)
         """
         if not api_key or not api_key.startswith('urt_'):
             return None
         
         api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()
         
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        if self._key_cache is not None:
+            key_info = self._key_cache.get(api_key_hash, lambda: self._load_api_key(api_key_hash))
+            return dict(key_info) if key_info else None
+        return self._load_api_key(api_key_hash)
+    
+    def _load_api_key(self, api_key_hash: str) -> Optional[Dict]:
+        """Active API key with this hash."""
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -156,18 +295,12 @@ class APIManager:
     
     def update_api_usage(self, api_key_id: int):
         """Update API key usage statistics."""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        self._write(lambda cursor: cursor.execute("""
             UPDATE api_keys 
             SET total_requests = total_requests + 1,
                 last_used = CURRENT_TIMESTAMP
             WHERE id = ?
-        """, (api_key_id,))
-        
-        conn.commit()
-        conn.close()
+        """, (api_key_id,)))
     
     def log_api_request(self, api_key_id: int, account_id: int, website: str,
                        action: str, response_status: str, ip_address: str = None,
@@ -184,21 +317,21 @@ class APIManager:
             ip_address: IP address of requester
             user_agent: User agent string
         """
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO api_usage 
-            (api_key_id, account_id, website, action, response_status, ip_address, user_agent)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (api_key_id, account_id, website, action, response_status, ip_address, user_agent))
+        def write(cursor):
+            cursor.execute("""
+                INSERT INTO api_usage 
+                (api_key_id, account_id, website, action, response_status, ip_address, user_agent)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (api_key_id, account_id, website, action, response_status, ip_address, user_agent))
+            
+            # Keep the rollups current in the same transaction
+            self._rollup_usage(cursor, "id = ?", (cursor.lastrowid,))
         
-        conn.commit()
-        conn.close()
+        self._write(write)
     
     def get_api_keys(self, status: str = None) -> List[Dict]:
         """Get all API keys, optionally filtered by status."""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         if status:
@@ -234,27 +367,41 @@ class APIManager:
         conn.close()
         return keys
     
-    def revoke_api_key(self, api_key_id: int) -> bool:
-        """Revoke an API key."""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            UPDATE api_keys 
-            SET status = 'revoked'
+    def get_api_key(self, api_key_id: int) -> Optional[Dict]:
+        """Current details of one API key, including its usage counters."""
+        conn = self._get_connection()
+        row = conn.execute("""
+            SELECT id, name, email, status, rate_limit, total_requests, created_at, last_used
+            FROM api_keys
             WHERE id = ?
-        """, (api_key_id,))
-        
-        success = cursor.rowcount > 0
-        conn.commit()
+        """, (api_key_id,)).fetchone()
         conn.close()
         
-        return success
+        if not row:
+            return None
+        columns = ['id', 'name', 'email', 'status', 'rate_limit', 'total_requests', 'created_at', 'last_used']
+        return dict(zip(columns, row))
+    
+    def revoke_api_key(self, api_key_id: int) -> bool:
+        """Revoke an API key."""
+        def write(cursor):
+            cursor.execute("""
+                UPDATE api_keys 
+                SET status = 'revoked'
+                WHERE id = ?
+            """, (api_key_id,))
+            return cursor.rowcount > 0
+        
+        return self._write(write)
     
     def get_usage_stats(self, api_key_id: int = None, days: int = 30) -> Dict:
         """
         Get usage statistics for an API key or all keys.
         
+        Reads the hourly/daily rollups rather than raw api_usage rows. The
+        window starts at the hour `days` ago (at the day, once those hourly
+        buckets are pruned); unique accounts are counted per whole day.
+        
         Args:
             api_key_id: Specific API key ID, or None for all keys
             days: Number of days to look back
@@ -262,56 +409,180 @@ class APIManager:
         Returns:
             Usage statistics
         """
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        if api_key_id:
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_requests,
-                    COUNT(DISTINCT account_id) as unique_accounts,
-                    COUNT(DISTINCT website) as websites_used,
-                    SUM(CASE WHEN action = 'rent' THEN 1 ELSE 0 END) as rentals,
-                    SUM(CASE WHEN action = 'return' THEN 1 ELSE 0 END) as returns
-                FROM api_usage
-                WHERE api_key_id = ?
-                AND timestamp >= datetime('now', '-' || ? || ' days')
-            """, (api_key_id, days))
-        else:
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_requests,
-                    COUNT(DISTINCT account_id) as unique_accounts,
-                    COUNT(DISTINCT api_key_id) as active_api_keys,
-                    SUM(CASE WHEN action = 'rent' THEN 1 ELSE 0 END) as rentals,
-                    SUM(CASE WHEN action = 'return' THEN 1 ELSE 0 END) as returns
-                FROM api_usage
-                WHERE timestamp >= datetime('now', '-' || ? || ' days')
-            """, (days,))
+        start = f"-{int(days)} days"
+        key_filter = "AND api_key_id = ?" if api_key_id else ""
+        key_params = (api_key_id,) if api_key_id else ()
         
+        cursor.execute("""
+            SELECT hourly_pruned_before IS NULL
+                OR strftime('%Y-%m-%d %H:00:00', 'now', ?) >= hourly_pruned_before
+            FROM api_usage_rollup_state WHERE id = 1
+        """, (start,))
+        
+        if cursor.fetchone()[0]:
+            # Whole days after the start day, plus the start day from its hour on
+            buckets = f"""
+                SELECT api_key_id, website, action, requests FROM api_usage_daily
+                WHERE bucket > date('now', ?) {key_filter}
+                UNION ALL
+                SELECT api_key_id, website, action, requests FROM api_usage_hourly
+                WHERE bucket >= strftime('%Y-%m-%d %H:00:00', 'now', ?)
+                AND bucket < date('now', ?, '+1 day') {key_filter}
+            """
+            params = (start, *key_params, start, start, *key_params)
+        else:
+            buckets = f"""
+                SELECT api_key_id, website, action, requests FROM api_usage_daily
+                WHERE bucket >= date('now', ?) {key_filter}
+            """
+            params = (start, *key_params)
+        
+        cursor.execute(f"""
+            SELECT 
+                SUM(requests) as total_requests,
+                COUNT(DISTINCT website) as websites_used,
+                COUNT(DISTINCT api_key_id) as active_api_keys,
+                SUM(CASE WHEN action = 'rent' THEN requests ELSE 0 END) as rentals,
+                SUM(CASE WHEN action = 'return' THEN requests ELSE 0 END) as returns
+            FROM ({buckets})
+        """, params)
         row = cursor.fetchone()
+        
+        cursor.execute(f"""
+            SELECT COUNT(DISTINCT account_id)
+            FROM api_usage_daily_accounts
+            WHERE bucket >= date('now', ?) {key_filter}
+        """, (start, *key_params))
+        unique_accounts = cursor.fetchone()[0]
         conn.close()
         
         if api_key_id:
             return {
                 'total_requests': row[0] or 0,
-                'unique_accounts': row[1] or 0,
-                'websites_used': row[2] or 0,
+                'unique_accounts': unique_accounts or 0,
+                'websites_used': row[1] or 0,
                 'rentals': row[3] or 0,
                 'returns': row[4] or 0
             }
         else:
             return {
                 'total_requests': row[0] or 0,
-                'unique_accounts': row[1] or 0,
+                'unique_accounts': unique_accounts or 0,
                 'active_api_keys': row[2] or 0,
                 'rentals': row[3] or 0,
                 'returns': row[4] or 0
             }
     
+    def backfill_usage_rollups(self) -> int:
+        """
+        Add api_usage rows logged before the rollup tables existed.
+        
+        Runs once per database (APIManager calls it on start); later calls
+        return immediately.
+        
+        Returns:
+            Number of raw rows rolled up
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT backfill_through FROM api_usage_rollup_state WHERE id = 1")
+        if not cursor.fetchone()[0]:
+            conn.close()
+            return 0
+        
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("SELECT backfill_through FROM api_usage_rollup_state WHERE id = 1")
+        through = cursor.fetchone()[0]
+        rows = 0
+        if through:
+            cursor.execute("SELECT COUNT(*) FROM api_usage WHERE id <= ?", (through,))
+            rows = cursor.fetchone()[0]
+            self._rollup_usage(cursor, "id <= ?", (through,))
+            cursor.execute("UPDATE api_usage_rollup_state SET backfill_through = 0 WHERE id = 1")
+        
+        conn.commit()
+        conn.close()
+        return rows
+    
+    def prune_api_usage(self, retention_days: int = None, hourly_retention_days: int = None,
+                        batch_size: int = 5000, pause: float = 0.05) -> Dict:
+        """
+        Delete raw usage rows and hourly rollups past their retention.
+        
+        Daily rollups are kept, so statistics for older periods stay
+        available; get_recent_activity only shows retained raw rows. Raw
+        rows go in id-ordered batches, one short write transaction each, like
+        SQLiteArchiver (archive_old_data.py), which keeps a copy instead.
+        
+        Args:
+            retention_days: Raw api_usage retention (default API_USAGE_RETENTION_DAYS; 0 = keep forever)
+            hourly_retention_days: Hourly rollup retention (default API_USAGE_HOURLY_RETENTION_DAYS;
+                0 = keep forever)
+            batch_size: Raw rows deleted per transaction
+            pause: Seconds to sleep between batches so other writers get the lock
+            
+        Returns:
+            Rows deleted per table
+        """
+        if retention_days is None:
+            retention_days = USAGE_RETENTION_DAYS
+        if hourly_retention_days is None:
+            hourly_retention_days = HOURLY_ROLLUP_RETENTION_DAYS
+        
+        # Raw rows must be in the rollups before they can go
+        self.backfill_usage_rollups()
+        
+        raw = 0
+        if retention_days:
+            age = f"-{int(retention_days)} days"
+            
+            def delete_batch(cursor):
+                # The batch is the first batch_size expired ids, i.e. the expired rows up to last_id
+                cursor.execute("""
+                    SELECT MAX(id), COUNT(*) FROM (
+                        SELECT id FROM api_usage WHERE timestamp < datetime('now', ?) ORDER BY id LIMIT ?
+                    )
+                """, (age, batch_size))
+                last_id, count = cursor.fetchone()
+                if count:
+                    cursor.execute("DELETE FROM api_usage WHERE id <= ? AND timestamp < datetime('now', ?)",
+                                   (last_id, age))
+                return count
+            
+            while True:
+                count = self._write(delete_batch)
+                raw += count
+                if count < batch_size:
+                    break
+                time.sleep(pause)
+        
+        hourly = 0
+        if hourly_retention_days:
+            def prune_hourly(cursor):
+                cursor.execute("""
+                    SELECT strftime('%Y-%m-%d %H:00:00', 'now', '-' || ? || ' days')
+                """, (int(hourly_retention_days),))
+                horizon = cursor.fetchone()[0]
+                cursor.execute("DELETE FROM api_usage_hourly WHERE bucket < ?", (horizon,))
+                deleted = cursor.rowcount
+                cursor.execute("""
+                    UPDATE api_usage_rollup_state
+                    SET hourly_pruned_before = MAX(COALESCE(hourly_pruned_before, ''), ?)
+                    WHERE id = 1
+                """, (horizon,))
+                return deleted
+            
+            hourly = self._write(prune_hourly)
+        
+        return {'api_usage': raw, 'api_usage_hourly': hourly}
+    
     def get_recent_activity(self, api_key_id: int = None, limit: int = 50) -> List[Dict]:
         """Get recent API activity."""
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         if api_key_id:
@@ -0,0 +1,140 @@
+"""Isolated browser contexts sharing a single Chrome process.
+
+Each reset gets its own Chrome browser context (separate cookie jar, cache and
+storage, like an incognito window) and its own lightweight chromedriver
+session attached to the shared browser over its DevTools port. Concurrent
+resets therefore cost one renderer and one chromedriver each instead of a
+full Chrome process tree.
+"""
+
+import logging
+import threading
+from typing import List
+
+import psutil
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+
+
+class BrowserContext:
+    """One isolated browsing context leased from a SharedBrowser."""
+
+    def __init__(self, browser: 'SharedBrowser', context_id: str, target_id: str, driver):
+        self.browser = browser
+        self.context_id = context_id
+        self.target_id = target_id
+        self.driver = driver
+
+    def get_process_ids(self) -> List[int]:
+        """PID of this context's chromedriver (killing it leaves the browser running)."""
+        process = getattr(getattr(self.driver, 'service', None), 'process', None)
+        return [process.pid] if process else []
+
+    def close(self):
+        """Dispose of the context (and its cookies) and end the attached session."""
+        self.browser.dispose_context(self.context_id, self.target_id)
+        try:
+            self.driver.quit()
+        except (WebDriverException, OSError) as e:
+            self.browser.logger.warning(f"Context session did not quit cleanly: {e}")
+
+
+class SharedBrowser:
+    """A single Chrome process hosting many isolated browser contexts."""
+
+    def __init__(self, headless: bool = False, lean_profile: bool = False):
+        """
+        Initialize the shared browser (it is launched by start()).
+
+        Args:
+            headless: Run Chrome in headless mode
+            lean_profile: Launch with the lean browsing profile
+        """
+        self.logger = logging.getLogger(__name__)
+        self.headless = headless
+        self.lean_profile = lean_profile
+        self.driver = None
+        self._launcher = None
+        self._lock = threading.Lock()
+        self.debugger_address = None
+        self.chromedriver_path = None
+
+    def start(self):
+        """Launch the shared Chrome process."""
+        # Imported here to avoid a circular import with the bot module
+        from src.password_reset_bot import PasswordResetBot
+
+        # Reuse the bot's launch logic so both engines run identical browsers
+        self._launcher = PasswordResetBot('shared-browser', '', headless=self.headless,
+                                          lean_profile=self.lean_profile)
+        self._launcher._init_driver()
+        self.driver = self._launcher.driver
+
+        self.debugger_address = self.driver.capabilities['goog:chromeOptions']['debuggerAddress']
+        patcher = getattr(self.driver, 'patcher', None)
+        self.chromedriver_path = getattr(patcher, 'executable_path', None)
+        self.logger.info(f"Shared browser started (DevTools at {self.debugger_address})")
+
+    def is_running(self) -> bool:
+        """Whether the shared browser processes are still alive."""
+        if not self._launcher:
+            return False
+        pids = self._launcher.get_process_ids()
+        return bool(pids) and all(psutil.pid_exists(pid) for pid in pids)
+
+    def get_process_ids(self) -> List[int]:
+        """Root PIDs of the shared browser and its primary chromedriver."""
+        return self._launcher.get_process_ids() if self._launcher else []
+
+    def new_context(self) -> BrowserContext:
+        """
+        Create an isolated context with one page and attach a session to it.
+
+        Returns:
+            BrowserContext whose driver is switched to the new page
+        """
+        with self._lock:
+            context_id = self.driver.execute_cdp_cmd(
+                'Target.createBrowserContext', {'disposeOnDetach': False}
+            )['browserContextId']
+            target_id = self.driver.execute_cdp_cmd(
+                'Target.createTarget', {'url': 'about:blank', 'browserContextId': context_id}
+            )['targetId']
+
+        options = Options()
+        options.debugger_address = self.debugger_address
+        if self.lean_profile:
+            options.page_load_strategy = 'eager'
+        service = Service(executable_path=self.chromedriver_path) if self.chromedriver_path else Service()
+
+        try:
+            session = webdriver.Chrome(service=service, options=options)
+            # chromedriver window handles are DevTools target IDs
+            session.switch_to.window(target_id)
+        except Exception:
+            self.dispose_context(context_id, target_id)
+            raise
+
+        return BrowserContext(self, context_id, target_id, session)
+
+    def dispose_context(self, context_id: str, target_id: str):
+        """Close a context's page and drop its cookies and storage."""
+        with self._lock:
+            try:
+                self.driver.execute_cdp_cmd('Target.closeTarget', {'targetId': target_id})
+            except WebDriverException:
+                pass
+            try:
+                self.driver.execute_cdp_cmd('Target.disposeBrowserContext', {'browserContextId': context_id})
+            except WebDriverException as e:
+                self.logger.warning(f"Could not dispose browser context {context_id}: {e}")
+
+    def close(self):
+        """Shut down the shared browser."""
+        if self._launcher:
+            self._launcher.close()
+            self._launcher = None
+            self.driver = None
+            self.logger.info("Shared browser closed")
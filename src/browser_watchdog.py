@@ -0,0 +1,280 @@
+"""Hard deadlines and orphan cleanup for the reset browsers."""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Set, Tuple
+
+import psutil
+
+
+# Marker switch added to every Chrome we launch so stray browsers can be
+# traced back to the service process (and the bot) that started them:
+# --reset-bot-owner=<service pid>[:<bot tag>]
+OWNER_SWITCH = "--reset-bot-owner"
+
+
+class DeadlineGuard:
+    """A running per-account deadline; see BrowserWatchdog.start_deadline."""
+
+    def __init__(self, watchdog: 'BrowserWatchdog', bot, seconds: float, label: str):
+        self.watchdog = watchdog
+        self.bot = bot
+        self.seconds = seconds
+        self.label = label
+        self.expired = False
+        self.timer = threading.Timer(seconds, self._expire)
+        self.timer.daemon = True
+
+    def _expire(self):
+        self.expired = True
+        self.watchdog._on_deadline(self.bot, self.seconds, self.label)
+
+    def cancel(self):
+        """Stop the deadline timer if it has not fired yet."""
+        self.timer.cancel()
+        self.watchdog._release(self.bot)
+
+
+class BrowserWatchdog:
+    """Kills hung reset browsers and reaps Chrome processes left behind."""
+
+    def __init__(self, min_orphan_age: float = 120.0):
+        """
+        Initialize the watchdog.
+
+        Args:
+            min_orphan_age: Seconds a process must have existed before the
+                reaper considers it, so browsers still starting up are left alone
+        """
+        self.logger = logging.getLogger(__name__)
+        self.min_orphan_age = min_orphan_age
+        self._lock = threading.Lock()
+        self._active_bots = set()
+        self._protected_pids: Set[int] = set()
+        self.metrics = {
+            'deadline_kills': 0,
+            'processes_killed': 0,
+            'reaped_processes': 0,
+            'reclaimed_rss_bytes': 0,
+        }
+
+    @staticmethod
+    def owner_argument(bot_tag: str = None) -> str:
+        """Chrome command-line switch tagging a browser with this process (and bot_tag)."""
+        owner = f"{OWNER_SWITCH}={os.getpid()}"
+        return f"{owner}:{bot_tag}" if bot_tag else owner
+
+    # ===================== DEADLINES =====================
+
+    def start_deadline(self, bot, seconds: float, label: str = None) -> DeadlineGuard:
+        """
+        Start a hard deadline for one reset.
+
+        The deadline runs on a timer thread, so it fires even while the worker
+        is blocked inside a WebDriver call. On expiry the bot's driver and
+        browser process trees are killed, which makes the pending call fail.
+
+        Args:
+            bot: PasswordResetBot whose processes are killed on expiry
+            seconds: Deadline in seconds
+            label: Name used in log messages (e.g. the username)
+
+        Returns:
+            DeadlineGuard; call cancel() once the reset finishes
+        """
+        guard = DeadlineGuard(self, bot, seconds, label or bot.username)
+        with self._lock:
+            self._active_bots.add(bot)
+        guard.timer.start()
+        return guard
+
+    def _release(self, bot):
+        """Forget a bot whose reset has finished."""
+        with self._lock:
+            self._active_bots.discard(bot)
+
+    def _on_deadline(self, bot, seconds: float, label: str):
+        """Kill the process trees of a bot that exceeded its deadline."""
+        pids = bot.get_process_ids()
+        stage = "killing browser"
+        if not pids and getattr(bot, 'owner_tag', None):
+            # Hung while starting: there is no driver yet, but Chrome already
+            # carries the bot's tag
+            pids = self.find_tagged_processes(bot.owner_tag)
+            stage = "killing the browser that is still starting"
+        self.logger.error(f"⏱ Hard deadline of {seconds:.0f}s exceeded for {label}, {stage} (pids {pids})")
+
+        killed, rss = 0, 0
+        for pid in pids:
+            count, freed = self.kill_process_tree(pid)
+            killed += count
+            rss += freed
+
+        with self._lock:
+            self.metrics['deadline_kills'] += 1
+            self.metrics['processes_killed'] += killed
+            self.metrics['reclaimed_rss_bytes'] += rss
+
+        self.logger.warning(f"Killed {killed} process(es) for {label}, reclaimed {rss / 1024 / 1024:.1f} MB")
+
+    # ===================== PROCESS HELPERS =====================
+
+    @staticmethod
+    def collect_process_tree(pid: int) -> List[psutil.Process]:
+        """Return a process and all of its descendants (empty if it is gone)."""
+        try:
+            parent = psutil.Process(pid)
+            return [parent] + parent.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return []
+
+    @staticmethod
+    def tree_rss(pid: int) -> int:
+        """Resident memory in bytes of a process and its descendants."""
+        total = 0
+        for proc in BrowserWatchdog.collect_process_tree(pid):
+            try:
+                total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return total
+
+    def find_tagged_processes(self, bot_tag: str) -> List[int]:
+        """
+        Root processes of the browser launched with owner_argument(bot_tag).
+
+        Chrome carries the tag; when it was started by a chromedriver of
+        ours, that chromedriver is returned instead so both are killed.
+        """
+        switch = self.owner_argument(bot_tag)
+        roots = set()
+        for proc in psutil.process_iter(['pid', 'cmdline']):
+            try:
+                if switch not in (proc.info.get('cmdline') or []):
+                    continue
+                parent = proc.parent()
+                if parent and 'chromedriver' in parent.name().lower() and parent.ppid() == os.getpid():
+                    roots.add(parent.pid)
+                else:
+                    roots.add(proc.pid)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return sorted(roots)
+
+    def kill_process_tree(self, pid: int, timeout: float = 5.0) -> Tuple[int, int]:
+        """
+        Kill a process and all of its descendants.
+
+        Args:
+            pid: Root process ID
+            timeout: Seconds to wait for the processes to exit
+
+        Returns:
+            (number of processes killed, RSS bytes they were holding)
+        """
+        procs = self.collect_process_tree(pid)
+        rss = 0
+        for proc in procs:
+            try:
+                rss += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+
+        # Kill children first so the browser cannot respawn helpers
+        for proc in reversed(procs):
+            try:
+                proc.kill()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+
+        gone, alive = psutil.wait_procs(procs, timeout=timeout)
+        for proc in alive:
+            self.logger.warning(f"Process {proc.pid} survived kill")
+
+        return len(gone), rss
+
+    # ===================== REAPER =====================
+
+    def protect(self, pids: List[int]):
+        """Exclude long-lived processes (e.g. a shared browser) from reaping."""
+        with self._lock:
+            self._protected_pids.update(pids)
+
+    def unprotect(self, pids: List[int]):
+        """Allow previously protected processes to be reaped again."""
+        with self._lock:
+            self._protected_pids.difference_update(pids)
+
+    def _in_use_pids(self) -> Set[int]:
+        """PIDs belonging to bots that are currently running a reset."""
+        with self._lock:
+            roots = set(self._protected_pids)
+            bots = list(self._active_bots)
+        for bot in bots:
+            roots.update(bot.get_process_ids())
+
+        in_use = set()
+        for pid in roots:
+            in_use.update(proc.pid for proc in self.collect_process_tree(pid))
+        return in_use
+
+    def _is_service_process(self, proc: psutil.Process) -> bool:
+        """Whether a process is a Chrome/chromedriver started by this service."""
+        name = (proc.info.get('name') or '').lower()
+        if 'chrome' not in name:
+            return False
+
+        cmdline = proc.info.get('cmdline') or []
+        for arg in cmdline:
+            if arg.startswith(OWNER_SWITCH + '='):
+                owner = arg.split('=', 1)[1].split(':', 1)[0]
+                # Ours, or left behind by a previous run of the service
+                return owner == str(os.getpid()) or not (owner.isdigit() and psutil.pid_exists(int(owner)))
+
+        # chromedriver does not carry the marker; match it by parentage
+        return 'chromedriver' in name and proc.info.get('ppid') == os.getpid()
+
+    def reap_orphans(self) -> Dict:
+        """
+        Kill stray Chrome/chromedriver processes that belong to the service
+        but are not used by any running reset.
+
+        Returns:
+            Dictionary with the number of processes reaped and RSS reclaimed
+        """
+        in_use = self._in_use_pids()
+        now = time.time()
+        roots = []
+
+        for proc in psutil.process_iter(['pid', 'ppid', 'name', 'cmdline', 'create_time']):
+            try:
+                if proc.pid in in_use or now - proc.info['create_time'] < self.min_orphan_age:
+                    continue
+                if self._is_service_process(proc):
+                    roots.append(proc.pid)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+        reaped, rss = 0, 0
+        for pid in roots:
+            count, freed = self.kill_process_tree(pid)
+            reaped += count
+            rss += freed
+
+        with self._lock:
+            self.metrics['reaped_processes'] += reaped
+            self.metrics['reclaimed_rss_bytes'] += rss
+
+        if reaped:
+            self.logger.warning(f"🧹 Reaped {reaped} orphaned browser process(es), reclaimed {rss / 1024 / 1024:.1f} MB")
+        else:
+            self.logger.debug("Reaper found no orphaned browser processes")
+
+        return {'reaped_processes': reaped, 'reclaimed_rss_bytes': rss}
+
+    def get_metrics(self) -> Dict:
+        """Snapshot of the kill and reclaim counters."""
+        with self._lock:
+            return dict(self.metrics)
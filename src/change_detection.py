@@ -0,0 +1,156 @@
+"""Cross-process change detection for the SQLite database.
+
+PRAGMA data_version returns a number that changes whenever another
+connection - in this process or any other - has committed to the database
+since the last call on the same connection. It is answered from the pager
+without reading a page, so checking it on every request is free.
+
+It only says *something* changed. To tell which table, triggers installed by
+install_table_versions() bump a per-table counter in table_versions on every
+write, whoever the writer is (manage_api_keys.py, manage_exceptions.py, the
+scheduler, raw sqlite3). ChangeDetector re-reads that tiny table only
+when data_version has moved, and VersionedCache drops its entries when a
+table it depends on has a new version - no TTLs, no re-querying on a hit.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Sequence
+
+from src import db_instrumentation
+from src import metrics
+
+
+# Tracked table -> columns whose updates count as a change (None = any column).
+# api_keys ignores total_requests/last_used, which change on every request.
+# Only tables with a VersionedCache belong here: every tracked write also
+# writes table_versions, so hot-path tables such as accounts stay out.
+TRACKED_TABLES = {
+    'websites': None,
+    'api_keys': ('name', 'email', 'status', 'rate_limit', 'api_key_hash'),
+}
+
+TRIGGER_EVENTS = ('insert', 'update', 'delete')
+
+
+def install_table_versions(cursor, tables: Iterable[str]):
+    """
+    Create table_versions and the triggers that bump it for tables.
+
+    Args:
+        cursor: Cursor inside the schema transaction
+        tables: Names from TRACKED_TABLES (the tables must already exist)
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            table_name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for table in tables:
+        columns = TRACKED_TABLES[table]
+        cursor.execute("INSERT OR IGNORE INTO table_versions (table_name, version) VALUES (?, 0)", (table,))
+        update_of = f"UPDATE OF {', '.join(columns)}" if columns else "UPDATE"
+        for event in ('INSERT', update_of, 'DELETE'):
+            name = f"trg_{table}_version_{event.split()[0].lower()}"
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE table_name = '{table}';
+                END
+            """)
+
+
+def uninstall_table_versions(cursor, tables: Iterable[str]):
+    """Drop the version triggers of tables (installed by an earlier version of the schema)."""
+    for table in tables:
+        for event in TRIGGER_EVENTS:
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_{table}_version_{event}")
+        cursor.execute("DELETE FROM table_versions WHERE table_name = ?", (table,))
+
+
+class ChangeDetector:
+    """Per-table versions of the database, revalidated with PRAGMA data_version."""
+
+    def __init__(self, db_path: str = "database/rental_system.db"):
+        """
+        Args:
+            db_path: Path to the SQLite database (with table_versions installed)
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # Never writes: its data_version moves on every commit by any other connection
+        self._conn = db_instrumentation.connect(db_path, timeout=30.0, check_same_thread=False)
+        self._data_version = None
+        self._versions: Dict[str, int] = {}
+
+    def versions(self) -> Dict[str, int]:
+        """Current version of every tracked table (one PRAGMA when nothing changed)."""
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._data_version:
+                # Read after the pragma: a commit in between only causes one more re-read
+                self._versions = dict(self._conn.execute("SELECT table_name, version FROM table_versions"))
+                self._data_version = data_version
+            return self._versions
+
+    def version(self, tables: Sequence[str]) -> tuple:
+        """Combined version of tables; changes whenever any of them is written."""
+        versions = self.versions()
+        return tuple(versions.get(table, 0) for table in tables)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class VersionedCache:
+    """Bounded LRU cache emptied whenever a table it depends on changes."""
+
+    def __init__(self, name: str, detector: ChangeDetector, tables: Sequence[str], maxsize: int = 1024):
+        """
+        Args:
+            name: Cache name for the cache_lookups_total metric
+            detector: ChangeDetector of the database the values come from
+            tables: Tables the cached values are read from
+            maxsize: Most entries kept
+        """
+        self.name = name
+        self.detector = detector
+        self.tables = tuple(tables)
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._version = None
+
+    def get(self, key, loader: Callable[[], object]):
+        """
+        Cached value for key, or loader() stored under key.
+
+        The version is taken before loading, so a write that lands while
+        loader() runs invalidates the entry on the next call.
+        """
+        version = self.detector.version(self.tables)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            elif key in self._entries:
+                self._entries.move_to_end(key)
+                metrics.CACHE_LOOKUPS.inc(cache=self.name, result='hit')
+                return self._entries[key]
+
+        metrics.CACHE_LOOKUPS.inc(cache=self.name, result='miss')
+        value = loader()
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = value
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
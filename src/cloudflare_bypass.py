@@ -31,13 +31,16 @@ class CloudflareBypassHTTP:
         """
         Create a curl-cffi session that impersonates a real browser.
         
+        The session keeps its connections alive and carries cookies between
+        requests, so reuse one session for all steps of a flow.
+        
         Args:
             impersonate: Browser to impersonate (default: chrome120)
             
         Returns:
             curl-cffi requests.Session object
         """
-        session = requests.Session()
+        session = requests.Session(impersonate=impersonate)
         # Default headers
         session.headers.update({
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -51,11 +54,19 @@ class CloudflareBypassHTTP:
         })
         return session
     
+    @staticmethod
+    def _log_latency(method: str, url: str, started: float, response: Response, session) -> None:
+        """Log how long a request took and whether it used a pooled session."""
+        elapsed_ms = (time.monotonic() - started) * 1000
+        via = "pooled session" if session is not None else "new connection"
+        logger.info(f"⏱ {method} {url} -> {response.status_code} in {elapsed_ms:.0f} ms ({via})")
+
     @staticmethod
     def get_with_cloudflare_bypass(
         url: str,
         impersonate: str = "chrome120",
         timeout: int = 30,
+        session: requests.Session = None,
         **kwargs
     ) -> Optional[Response]:
         """
@@ -65,6 +76,7 @@ class CloudflareBypassHTTP:
             url: URL to fetch
             impersonate: Browser to impersonate
             timeout: Request timeout in seconds
+            session: Optional session to reuse (keeps connections and cookies)
             **kwargs: Additional requests parameters
             
         Returns:
@@ -73,12 +85,15 @@ class CloudflareBypassHTTP:
         try:
             logger.info(f"🔓 Fetching {url} with curl-cffi (impersonating {impersonate})...")
             
-            response = requests.get(
+            client = session if session is not None else requests
+            started = time.monotonic()
+            response = client.get(
                 url,
                 impersonate=impersonate,
                 timeout=timeout,
                 **kwargs
             )
+            CloudflareBypassHTTP._log_latency("GET", url, started, response, session)
             
             # Check if Cloudflare challenge still appears
             if "challenge" in response.text.lower():
@@ -102,6 +117,7 @@ class CloudflareBypassHTTP:
         data: Dict = None,
         impersonate: str = "chrome120",
         timeout: int = 30,
+        session: requests.Session = None,
         **kwargs
     ) -> Optional[Response]:
         """
@@ -112,6 +128,7 @@ class CloudflareBypassHTTP:
             data: Data to post
             impersonate: Browser to impersonate
             timeout: Request timeout in seconds
+            session: Optional session to reuse (keeps connections and cookies)
             **kwargs: Additional requests parameters
             
         Returns:
@@ -120,13 +137,16 @@ class CloudflareBypassHTTP:
         try:
             logger.info(f"📤 Posting to {url} with curl-cffi...")
             
-            response = requests.post(
+            client = session if session is not None else requests
+            started = time.monotonic()
+            response = client.post(
                 url,
                 data=data,
                 impersonate=impersonate,
                 timeout=timeout,
                 **kwargs
             )
+            CloudflareBypassHTTP._log_latency("POST", url, started, response, session)
             
             if response.status_code in [200, 302, 303, 307, 308]:
                 logger.info(f"✅ POST successful! Status: {response.status_code}")
@@ -216,9 +236,23 @@ class UnlocktoolHTTPBot:
         """
         self.logger = logging.getLogger(__name__)
         self.timeout = timeout
+        # One persistent session per bot: keep-alive connections and cookies
+        # carry over from login to the password reset
         self.session = CloudflareBypassHTTP.get_session()
         self.base_url = "https://unlocktool.net"
     
+    def close(self):
+        """Close the pooled connections of this bot's session."""
+        self.session.close()
+    
+    def __enter__(self):
+        """Context manager entry."""
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit."""
+        self.close()
+    
     def login(self, username: str, password: str) -> bool:
         """
         Login to unlocktool.net using HTTP requests.
@@ -238,7 +272,8 @@ class UnlocktoolHTTPBot:
             response = CloudflareBypassHTTP.get_with_cloudflare_bypass(
                 f"{self.base_url}/login",
                 impersonate="chrome120",
-                timeout=self.timeout
+                timeout=self.timeout,
+                session=self.session
             )
             
             if not response:
@@ -263,7 +298,8 @@ class UnlocktoolHTTPBot:
                 f"{self.base_url}/login",
                 data=login_data,
                 impersonate="chrome120",
-                timeout=self.timeout
+                timeout=self.timeout,
+                session=self.session
             )
             
             if not response:
@@ -280,7 +316,8 @@ class UnlocktoolHTTPBot:
                         response = CloudflareBypassHTTP.get_with_cloudflare_bypass(
                             redirect_url,
                             impersonate="chrome120",
-                            timeout=self.timeout
+                            timeout=self.timeout,
+                            session=self.session
                         )
                 
                 if response and "dashboard" in response.text.lower():
@@ -317,7 +354,8 @@ class UnlocktoolHTTPBot:
             response = CloudflareBypassHTTP.get_with_cloudflare_bypass(
                 f"{self.base_url}/account/reset-password",
                 impersonate="chrome120",
-                timeout=self.timeout
+                timeout=self.timeout,
+                session=self.session
             )
             
             if not response:
@@ -340,7 +378,8 @@ class UnlocktoolHTTPBot:
                 f"{self.base_url}/account/reset-password",
                 data=reset_data,
                 impersonate="chrome120",
-                timeout=self.timeout
+                timeout=self.timeout,
+                session=self.session
             )
             
             if response and response.status_code in [200, 302, 303]:
@@ -375,7 +414,7 @@ if __name__ == "__main__":
    - Use Selenium only for password reset form (if needed)
 
 Example:
-    bot = UnlocktoolHTTPBot()
-    if bot.login("vpbgkt", "api@1234"):
-        bot.reset_password("NewPassword123!")
+    with UnlocktoolHTTPBot() as bot:
+        if bot.login("vpbgkt", "api@1234"):
+            bot.reset_password("NewPassword123!")
     """)
@@ -1,40 +1,74 @@
 """Database management module for tool rental and password management."""
 
-import sqlite3
 import json
+import uuid
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional
 
+from src import db_instrumentation
+from src.change_detection import ChangeDetector, VersionedCache, install_table_versions, uninstall_table_versions
+
 
 class PasswordResetDB:
     """SQLite database for managing tool rental accounts and password resets."""
 
-    def __init__(self, db_path: str = "database/rental_system.db"):
+    def __init__(self, db_path: str = "database/rental_system.db", write_actor=None,
+                 cache_websites: bool = False):
         """
         Initialize database connection.
         
         Args:
             db_path: Path to SQLite database file
+            write_actor: Optional SQLiteWriteActor that runs every mutation
+                (see src/write_actor.py); without one each call writes on
+                its own connection
+            cache_websites: Cache get_website() lookups until websites changes
+                (in any process; see src/change_detection.py)
         """
         self.db_path = db_path
+        self.write_actor = write_actor
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         self.init_schema()
+        self._website_cache = None
+        if cache_websites:
+            self._website_cache = VersionedCache('websites', ChangeDetector(db_path), ('websites',))
         
         # Enable WAL mode for better concurrent access
-        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn = self._get_connection()
         conn.execute("PRAGMA journal_mode=WAL")
         conn.close()
 
     def _get_connection(self):
         """Get a database connection with proper timeout."""
-        return sqlite3.connect(self.db_path, timeout=30.0)
+        return db_instrumentation.connect(self.db_path, timeout=30.0)
+
+    def _write(self, operation):
+        """
+        Run operation(cursor) in a write transaction and return its result.
+        
+        Goes through the write actor when there is one; otherwise opens a
+        connection, commits and closes it (an exception rolls back).
+        """
+        if self.write_actor is not None:
+            return self.write_actor.run(operation)
+        conn = self._get_connection()
+        try:
+            result = operation(conn.cursor())
+            conn.commit()
+            return result
+        finally:
+            conn.close()
 
     def init_schema(self):
         """Initialize database schema if it doesn't exist."""
-        conn = self._get_connection() if hasattr(self, '_get_connection') else sqlite3.connect(self.db_path, timeout=30.0)
+        conn = self._get_connection()
         cursor = conn.cursor()
 
+        # Lets retention (src/retention.py) shrink the file with incremental
+        # vacuum; only takes effect on a new, empty database
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
         # Websites/Tools table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS websites (
@@ -111,6 +145,30 @@ class PasswordResetDB:
             )
         """)
 
+        # Reset timings table - per-step durations of each reset attempt
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS reset_timings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                attempt_id TEXT NOT NULL,
+                account_id INTEGER,
+                website TEXT,
+                step TEXT NOT NULL,
+                duration_ms REAL NOT NULL,
+                success INTEGER NOT NULL,
+                recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(account_id) REFERENCES accounts(id)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_reset_timings_recorded
+            ON reset_timings(recorded_at)
+        """)
+
+        # Write counter for the website cache (src/change_detection.py); accounts
+        # is written on every rent/return and has no cache, so it is not tracked
+        install_table_versions(cursor, ('websites',))
+        uninstall_table_versions(cursor, ('accounts',))
+
         conn.commit()
         conn.close()
 
@@ -129,24 +187,26 @@ class PasswordResetDB:
         Returns:
             Website ID
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT OR IGNORE INTO websites (name, url, validity_hours, description)
-            VALUES (?, ?, ?, ?)
-        """, (name, url, validity_hours, description))
+        def write(cursor):
+            cursor.execute("""
+                INSERT OR IGNORE INTO websites (name, url, validity_hours, description)
+                VALUES (?, ?, ?, ?)
+            """, (name, url, validity_hours, description))
 
-        conn.commit()
+            cursor.execute("SELECT id FROM websites WHERE name = ?", (name,))
+            return cursor.fetchone()[0]
 
-        cursor.execute("SELECT id FROM websites WHERE name = ?", (name,))
-        website_id = cursor.fetchone()[0]
-        conn.close()
-
-        return website_id
+        return self._write(write)
 
     def get_website(self, name: str) -> Optional[Dict]:
         """Get website details by name."""
+        if self._website_cache is None:
+            return self._load_website(name)
+        website = self._website_cache.get(name, lambda: self._load_website(name))
+        # Callers may modify the result; keep the cached entry intact
+        return dict(website) if website else None
+
+    def _load_website(self, name: str) -> Optional[Dict]:
         conn = self._get_connection()
         cursor = conn.cursor()
 
@@ -180,32 +240,119 @@ class PasswordResetDB:
         Returns:
             Account ID
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
+        def write(cursor):
+            # Get website ID
+            cursor.execute("SELECT id FROM websites WHERE name = ?", (website_name,))
+            result = cursor.fetchone()
+            if not result:
+                raise ValueError(f"Website '{website_name}' not found. Add it first using add_website()")
+            
+            website_id = result[0]
 
-        # Get website ID
-        cursor.execute("SELECT id FROM websites WHERE name = ?", (website_name,))
-        result = cursor.fetchone()
-        if not result:
-            conn.close()
-            raise ValueError(f"Website '{website_name}' not found. Add it first using add_website()")
-        
-        website_id = result[0]
+            cursor.execute("""
+                INSERT OR IGNORE INTO accounts (website_id, username, current_password, email, status)
+                VALUES (?, ?, ?, ?, 'available')
+            """, (website_id, username, password, email))
 
-        cursor.execute("""
-            INSERT OR IGNORE INTO accounts (website_id, username, current_password, email, status)
-            VALUES (?, ?, ?, ?, 'available')
-        """, (website_id, username, password, email))
+            cursor.execute("""
+                SELECT id FROM accounts WHERE website_id = ? AND username = ?
+            """, (website_id, username))
+            return cursor.fetchone()[0]
 
-        conn.commit()
+        return self._write(write)
 
-        cursor.execute("""
-            SELECT id FROM accounts WHERE website_id = ? AND username = ?
-        """, (website_id, username))
-        account_id = cursor.fetchone()[0]
-        conn.close()
+    def bulk_add_accounts(self, accounts: List[Dict], chunk_size: int = 500,
+                          update_existing: bool = False) -> List[Dict]:
+        """
+        Add many accounts, one write transaction per chunk.
 
-        return account_id
+        Websites are resolved once and each chunk is inserted with a single
+        executemany. Accounts that already exist (same website and username)
+        are left alone, or get the new password and email with update_existing.
+
+        Args:
+            accounts: Dicts with website, username, password and optional email;
+                a repeated (website, username) is reported as 'duplicate' and
+                only its first occurrence is written
+            chunk_size: Accounts per transaction
+            update_existing: Overwrite the password/email of existing accounts
+
+        Returns:
+            One result per account, in order: website, username, status
+            ('created', 'exists', 'updated' or 'error'), account_id and error
+        """
+        conn = self._get_connection()
+        try:
+            website_ids = dict(conn.execute("SELECT name, id FROM websites"))
+        finally:
+            conn.close()
+
+        results = []
+        seen = set()  # (website_id, username) written by earlier chunks
+        for offset in range(0, len(accounts), chunk_size):
+            chunk = accounts[offset:offset + chunk_size]
+            results.extend(self._write(
+                lambda cursor, chunk=chunk: self._bulk_add_chunk(cursor, chunk, website_ids, update_existing, seen)
+            ))
+        return results
+
+    @staticmethod
+    def _bulk_add_chunk(cursor, chunk: List[Dict], website_ids: Dict[str, int], update_existing: bool,
+                        seen: set) -> List[Dict]:
+        results = [{'website': account['website'], 'username': account['username'], 'status': 'error',
+                    'account_id': None, 'error': None} for account in chunk]
+        keyed = {}  # (website_id, username) -> (result, account) of its first occurrence
+        for result, account in zip(results, chunk):
+            website_id = website_ids.get(account['website'])
+            key = (website_id, account['username'])
+            if website_id is None:
+                result['error'] = f"Website '{account['website']}' not found. Add it first using add_website()"
+            elif key in keyed or key in seen:
+                result['status'] = 'duplicate'
+                result['error'] = "Same website and username as an earlier account in this import"
+            else:
+                keyed[key] = (result, account)
+        seen.update(keyed)
+        if not keyed:
+            return results
+
+        def lookup_ids():
+            usernames = {}
+            for website_id, username in keyed:
+                usernames.setdefault(website_id, []).append(username)
+            ids = {}
+            for website_id, names in usernames.items():
+                cursor.execute(f"""
+                    SELECT username, id FROM accounts
+                    WHERE website_id = ? AND username IN ({', '.join('?' * len(names))})
+                """, [website_id] + names)
+                ids.update(((website_id, username), account_id) for username, account_id in cursor.fetchall())
+            return ids
+
+        existing = lookup_ids()
+        if update_existing:
+            on_conflict = """DO UPDATE SET current_password = excluded.current_password,
+                                           email = COALESCE(excluded.email, accounts.email)"""
+        else:
+            on_conflict = "DO NOTHING"
+        cursor.executemany(f"""
+            INSERT INTO accounts (website_id, username, current_password, email, status)
+            VALUES (?, ?, ?, ?, 'available')
+            ON CONFLICT(website_id, username) {on_conflict}
+        """, [
+            (website_id, username, account['password'], account.get('email'))
+            for (website_id, username), (_, account) in keyed.items()
+            if update_existing or (website_id, username) not in existing
+        ])
+
+        ids = lookup_ids() if len(existing) < len(keyed) else existing
+        for key, (result, _) in keyed.items():
+            result['account_id'] = ids.get(key)
+            if key in existing:
+                result['status'] = 'updated' if update_existing else 'exists'
+            else:
+                result['status'] = 'created'
+        return results
 
     def update_password(self, account_id: int, old_password: str, new_password: str, status: str = 'success'):
         """
@@ -217,24 +364,21 @@ class PasswordResetDB:
             new_password: New password
             status: 'success' or 'failed'
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        # Update current password
-        cursor.execute("""
-            UPDATE accounts 
-            SET current_password = ?, last_reset = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (new_password, account_id))
-
-        # Log password history
-        cursor.execute("""
-            INSERT INTO password_history (account_id, old_password, new_password, status)
-            VALUES (?, ?, ?, ?)
-        """, (account_id, old_password, new_password, status))
-
-        conn.commit()
-        conn.close()
+        def write(cursor):
+            # Update current password
+            cursor.execute("""
+                UPDATE accounts 
+                SET current_password = ?, last_reset = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (new_password, account_id))
+
+            # Log password history
+            cursor.execute("""
+                INSERT INTO password_history (account_id, old_password, new_password, status)
+                VALUES (?, ?, ?, ?)
+            """, (account_id, old_password, new_password, status))
+
+        self._write(write)
 
     def get_available_accounts(self, website_name: str) -> List[Dict]:
         """
@@ -246,16 +390,15 @@ class PasswordResetDB:
         Returns:
             List of available accounts
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
         # First, mark expired rentals as available
-        cursor.execute("""
+        self._write(lambda cursor: cursor.execute("""
             UPDATE accounts 
             SET status = 'available', available_at = CURRENT_TIMESTAMP
             WHERE status = 'rented' AND available_at < CURRENT_TIMESTAMP
-        """)
-        conn.commit()
+        """))
+
+        conn = self._get_connection()
+        cursor = conn.cursor()
 
         # Get available accounts
         cursor.execute("""
@@ -288,54 +431,50 @@ class PasswordResetDB:
         Returns:
             Dictionary with rental details
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        # Get account and website details
-        cursor.execute("""
-            SELECT a.id, a.username, a.current_password, w.name, w.url, w.validity_hours
-            FROM accounts a
-            JOIN websites w ON a.website_id = w.id
-            WHERE a.id = ? AND a.status = 'available'
-        """, (account_id,))
+        def write(cursor):
+            # Get account and website details
+            cursor.execute("""
+                SELECT a.id, a.username, a.current_password, w.name, w.url, w.validity_hours
+                FROM accounts a
+                JOIN websites w ON a.website_id = w.id
+                WHERE a.id = ? AND a.status = 'available'
+            """, (account_id,))
+
+            account = cursor.fetchone()
+            if not account:
+                return None
+
+            # Calculate expiry time
+            validity_hours = account[5]
+            expires_at = datetime.now() + timedelta(hours=validity_hours)
+
+            # Create rental record
+            cursor.execute("""
+                INSERT INTO rentals (account_id, customer_name, customer_email, customer_phone, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (account_id, customer_name, customer_email, customer_phone, expires_at))
+
+            rental_id = cursor.lastrowid
+
+            # Mark account as rented
+            cursor.execute("""
+                UPDATE accounts 
+                SET status = 'rented', rented_at = CURRENT_TIMESTAMP, available_at = ?
+                WHERE id = ?
+            """, (expires_at, account_id))
 
-        account = cursor.fetchone()
-        if not account:
-            conn.close()
-            return None
-
-        # Calculate expiry time
-        validity_hours = account[5]
-        expires_at = datetime.now() + timedelta(hours=validity_hours)
-
-        # Create rental record
-        cursor.execute("""
-            INSERT INTO rentals (account_id, customer_name, customer_email, customer_phone, expires_at)
-            VALUES (?, ?, ?, ?, ?)
-        """, (account_id, customer_name, customer_email, customer_phone, expires_at))
-
-        rental_id = cursor.lastrowid
-
-        # Mark account as rented
-        cursor.execute("""
-            UPDATE accounts 
-            SET status = 'rented', rented_at = CURRENT_TIMESTAMP, available_at = ?
-            WHERE id = ?
-        """, (expires_at, account_id))
-
-        conn.commit()
-        conn.close()
+            return {
+                'id': rental_id,
+                'account_id': account[0],
+                'username': account[1],
+                'password': account[2],
+                'website': account[3],
+                'url': account[4],
+                'validity_hours': validity_hours,
+                'expires_at': expires_at.strftime('%Y-%m-%d %H:%M:%S')
+            }
 
-        return {
-            'id': rental_id,
-            'account_id': account[0],
-            'username': account[1],
-            'password': account[2],
-            'website': account[3],
-            'url': account[4],
-            'validity_hours': validity_hours,
-            'expires_at': expires_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
+        return self._write(write)
 
     def return_account(self, account_id: int):
         """
@@ -344,23 +483,78 @@ class PasswordResetDB:
         Args:
             account_id: ID of the account
         """
+        def write(cursor):
+            cursor.execute("""
+                UPDATE accounts 
+                SET status = 'available', available_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (account_id,))
+
+            cursor.execute("""
+                UPDATE rentals 
+                SET returned_at = CURRENT_TIMESTAMP, status = 'completed'
+                WHERE account_id = ? AND status = 'active'
+            """, (account_id,))
+
+        self._write(write)
+
+    def get_overdue_rentals_summary(self) -> Dict:
+        """
+        Active rentals past expires_at (what expire_overdue_rentals would expire).
+
+        Returns:
+            Dict with overdue (count), oldest_expires_at and by_website (count per website)
+        """
         conn = self._get_connection()
-        cursor = conn.cursor()
+        try:
+            rows = conn.execute("""
+                SELECT w.name, COUNT(*), MIN(r.expires_at)
+                FROM rentals r
+                JOIN accounts a ON r.account_id = a.id
+                JOIN websites w ON a.website_id = w.id
+                WHERE r.status = 'active' AND r.expires_at < ?
+                GROUP BY w.name
+            """, (datetime.now(),)).fetchall()
+        finally:
+            conn.close()
 
-        cursor.execute("""
-            UPDATE accounts 
-            SET status = 'available', available_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (account_id,))
+        return {
+            'overdue': sum(count for _, count, _ in rows),
+            'oldest_expires_at': min((oldest for _, _, oldest in rows), default=None),
+            'by_website': {name: count for name, count, _ in rows},
+        }
 
-        cursor.execute("""
-            UPDATE rentals 
-            SET returned_at = CURRENT_TIMESTAMP, status = 'completed'
-            WHERE account_id = ? AND status = 'active'
-        """, (account_id,))
+    def expire_overdue_rentals(self) -> int:
+        """
+        Expire every active rental past expires_at in one transaction.
 
-        conn.commit()
-        conn.close()
+        Set-based counterpart of auto_expire_rentals() in supabase_schema.sql:
+        the rented accounts become available and the rentals 'expired'.
+
+        Returns:
+            Number of rentals expired
+        """
+        # expires_at is stored as local time by rent_account()
+        now = datetime.now()
+
+        def write(cursor):
+            cursor.execute("""
+                UPDATE accounts
+                SET status = 'available', available_at = CURRENT_TIMESTAMP
+                WHERE status = 'rented' AND id IN (
+                    SELECT account_id FROM rentals
+                    WHERE status = 'active' AND expires_at < ?
+                )
+            """, (now,))
+
+            cursor.execute("""
+                UPDATE rentals
+                SET status = 'expired'
+                WHERE status = 'active' AND expires_at < ?
+            """, (now,))
+            return cursor.rowcount
+
+        return self._write(write)
 
     # ===================== ACCOUNT STATUS & EXCEPTIONS =====================
 
@@ -372,20 +566,14 @@ class PasswordResetDB:
             account_id: ID of the account
             reason: Reason for exception (e.g., 'wrong_password', 'customer_changed', 'hacked')
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
+        self._write(lambda cursor: cursor.execute("""
             UPDATE accounts 
             SET status = 'exception', 
                 exception_reason = ?,
                 last_failed_login = CURRENT_TIMESTAMP,
                 failed_login_attempts = failed_login_attempts + 1
             WHERE id = ?
-        """, (reason, account_id))
-
-        conn.commit()
-        conn.close()
+        """, (reason, account_id)))
 
     def reset_account_exception(self, account_id: int, new_password: str):
         """
@@ -395,10 +583,7 @@ class PasswordResetDB:
             account_id: ID of the account
             new_password: The correct password
         """
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
+        self._write(lambda cursor: cursor.execute("""
             UPDATE accounts 
             SET status = 'available', 
                 exception_reason = NULL,
@@ -406,10 +591,7 @@ class PasswordResetDB:
                 current_password = ?,
                 available_at = CURRENT_TIMESTAMP
             WHERE id = ?
-        """, (new_password, account_id))
-
-        conn.commit()
-        conn.close()
+        """, (new_password, account_id)))
 
     def get_exception_accounts(self) -> List[Dict]:
         """Get all accounts marked with exceptions."""
@@ -486,16 +668,10 @@ class PasswordResetDB:
 
     def log_reset(self, account_id: int, status: str, message: str = None):
         """Log a password reset attempt (legacy method)."""
-        conn = self._get_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
+        self._write(lambda cursor: cursor.execute("""
             INSERT INTO password_history (account_id, new_password, status, message)
             VALUES (?, '', ?, ?)
-        """, (account_id, status, message))
-
-        conn.commit()
-        conn.close()
+        """, (account_id, status, message)))
 
     def log_error(self, account_id: int, error_type: str, error_message: str, traceback_str: str = None):
         """
@@ -507,17 +683,75 @@ class PasswordResetDB:
             error_message: Error message
             traceback_str: Full traceback
         """
+        self._write(lambda cursor: cursor.execute("""
+            INSERT INTO error_logs (account_id, error_type, error_message, traceback)
+            VALUES (?, ?, ?, ?)
+        """, (account_id, error_type, error_message, traceback_str)))
+
+    # ===================== RESET TIMINGS =====================
+
+    def log_reset_timings(self, account_id: int, website: str, timings: Dict[str, float],
+                          success: bool, attempt_id: str = None) -> str:
+        """
+        Store the per-step durations of one reset attempt.
+        
+        Args:
+            account_id: ID of the account
+            website: Website name
+            timings: Seconds per step name
+            success: Whether the attempt succeeded
+            attempt_id: Identifier grouping the rows of one attempt (generated if omitted)
+            
+        Returns:
+            The attempt ID
+        """
+        attempt_id = attempt_id or uuid.uuid4().hex
+        if not timings:
+            return attempt_id
+
+        rows = [
+            (attempt_id, account_id, website, step, seconds * 1000.0, 1 if success else 0)
+            for step, seconds in timings.items()
+        ]
+        self._write(lambda cursor: cursor.executemany("""
+            INSERT INTO reset_timings (attempt_id, account_id, website, step, duration_ms, success)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, rows))
+
+        return attempt_id
+
+    def get_reset_timings(self, days: int = 7, website: str = None) -> List[Dict]:
+        """
+        Get recorded reset step timings.
+        
+        Args:
+            days: Number of days to look back
+            website: Optional website name filter
+            
+        Returns:
+            List of timing rows
+        """
         conn = self._get_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
-            INSERT INTO error_logs (account_id, error_type, error_message, traceback)
-            VALUES (?, ?, ?, ?)
-        """, (account_id, error_type, error_message, traceback_str))
+        query = """
+            SELECT attempt_id, account_id, website, step, duration_ms, success, recorded_at
+            FROM reset_timings
+            WHERE recorded_at >= datetime('now', '-' || ? || ' days')
+        """
+        params = [days]
+        if website:
+            query += " AND website = ?"
+            params.append(website)
 
-        conn.commit()
+        cursor.execute(query, params)
+
+        columns = ['attempt_id', 'account_id', 'website', 'step', 'duration_ms', 'success', 'recorded_at']
+        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
         conn.close()
 
+        return results
+
     # ===================== REPORTING & STATISTICS =====================
 
     def get_dashboard_stats(self) -> Dict:
@@ -0,0 +1,334 @@
+"""Statement-level timing for SQLite and Supabase queries.
+
+Disabled by default. When DB_INSTRUMENTATION=1, connections returned by
+connect() use a cursor class that times every statement, and SupabaseDB
+wraps its client so each query builder's execute() is timed. Statements are
+grouped by a normalized fingerprint (literals replaced by ?), with a latency
+histogram, row counts and calling methods per fingerprint. Statements slower
+than SLOW_QUERY_MS are logged to the 'db.slow' logger.
+
+When disabled, connect() is a plain sqlite3.connect and nothing is wrapped,
+so statements pay no instrumentation cost at all.
+
+Stats are written as JSON to DB_STATS_DIR (default logs/db_stats) at exit
+and at most once a minute; db_query_report.py summarizes them.
+"""
+
+import atexit
+import bisect
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List
+from urllib.parse import quote
+
+
+enabled = os.getenv('DB_INSTRUMENTATION', '').lower() in ('1', 'true', 'yes', 'on')
+slow_query_ms = float(os.getenv('SLOW_QUERY_MS', '100'))
+stats_dir = os.getenv('DB_STATS_DIR', os.path.join('logs', 'db_stats'))
+
+# Histogram bucket upper bounds in milliseconds
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+DUMP_INTERVAL_SECONDS = 60
+
+slow_logger = logging.getLogger('db.slow')
+
+
+# ===================== FINGERPRINTS =====================
+
+_COMMENT = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(sql: str) -> str:
+    """
+    Normalize a SQL statement so executions with different literals group together.
+
+    Args:
+        sql: SQL text
+
+    Returns:
+        Statement with comments removed, literals replaced by ? and
+        whitespace collapsed
+    """
+    text = _COMMENT.sub(' ', sql)
+    text = _STRING.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _IN_LIST.sub('(?...)', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def _caller() -> str:
+    """Qualified name of the first frame outside this module and sqlite3."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module != __name__ and not module.startswith(('sqlite3', 'postgrest', 'supabase')):
+            code = frame.f_code
+            # co_qualname is 3.11+; older Pythons only have the bare name
+            return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+# ===================== RECORDER =====================
+
+class StatementRecorder:
+    """Per-fingerprint counts, durations, histograms, rows and callers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[tuple, Dict] = {}
+        self._last_dump = time.monotonic()
+
+    def record(self, backend: str, statement: str, duration_ms: float, rows: int, caller: str):
+        """Add one execution of a statement."""
+        key = (backend, statement)
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                entry = self._stats[key] = {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                    'buckets': [0] * (len(BUCKETS_MS) + 1), 'callers': Counter()
+                }
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['rows'] += max(rows, 0)
+            entry['buckets'][bisect.bisect_left(BUCKETS_MS, duration_ms)] += 1
+            entry['callers'][caller] += 1
+
+            dump_due = time.monotonic() - self._last_dump >= DUMP_INTERVAL_SECONDS
+
+        if duration_ms >= slow_query_ms:
+            slow_logger.warning(f"Slow {backend} statement ({duration_ms:.1f} ms, {max(rows, 0)} rows) "
+                                f"from {caller}: {statement}")
+        if dump_due:
+            self.dump()
+
+    def add_rows(self, backend: str, statement: str, rows: int):
+        """Add rows fetched after the statement was timed (SELECT results)."""
+        with self._lock:
+            entry = self._stats.get((backend, statement))
+            if entry is not None:
+                entry['rows'] += rows
+
+    def snapshot(self) -> List[Dict]:
+        """Copy of the collected stats as a list of JSON-serializable dicts."""
+        with self._lock:
+            return [
+                {
+                    'backend': backend,
+                    'statement': statement,
+                    'count': entry['count'],
+                    'total_ms': entry['total_ms'],
+                    'max_ms': entry['max_ms'],
+                    'rows': entry['rows'],
+                    'buckets': list(entry['buckets']),
+                    'callers': dict(entry['callers'])
+                }
+                for (backend, statement), entry in self._stats.items()
+            ]
+
+    def dump(self, path: str = None) -> str:
+        """
+        Write the stats of this process as JSON.
+
+        Args:
+            path: Output file (default: <DB_STATS_DIR>/<script>-<pid>.json)
+
+        Returns:
+            Path written
+        """
+        if path is None:
+            script = os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0] or 'python'
+            path = os.path.join(stats_dir, f"{script}-{os.getpid()}.json")
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        with self._lock:
+            self._last_dump = time.monotonic()
+        data = {
+            'pid': os.getpid(),
+            'written_at': time.time(),
+            'buckets_ms': list(BUCKETS_MS),
+            'statements': self.snapshot()
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        return path
+
+
+recorder = StatementRecorder()
+
+
+# ===================== SQLITE =====================
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that records every statement it executes."""
+
+    _statement = None
+
+    def _timed(self, method, sql, *args):
+        start = time.perf_counter()
+        try:
+            return method(self, sql, *args)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self._statement = fingerprint(sql)
+            recorder.record('sqlite', self._statement, duration_ms, self.rowcount, _caller())
+
+    def execute(self, sql, parameters=()):
+        return self._timed(sqlite3.Cursor.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._timed(sqlite3.Cursor.executemany, sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self._timed(sqlite3.Cursor.executescript, sql_script)
+
+    def _count_rows(self, rows: int):
+        if self._statement is not None and rows:
+            recorder.add_rows('sqlite', self._statement, rows)
+
+    def fetchone(self):
+        row = super().fetchone()
+        self._count_rows(int(row is not None))
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._count_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._count_rows(len(rows))
+        return rows
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection whose cursors (including conn.execute) are instrumented."""
+
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script):
+        return self.cursor().executescript(sql_script)
+
+
+def connect(db_path: str, timeout: float = 30.0, **kwargs) -> sqlite3.Connection:
+    """
+    Open a SQLite connection, instrumented when DB_INSTRUMENTATION is on.
+
+    Args:
+        db_path: Path to the database file
+        timeout: Busy timeout in seconds
+        **kwargs: Passed to sqlite3.connect
+
+    Returns:
+        sqlite3.Connection
+    """
+    if enabled:
+        kwargs['factory'] = InstrumentedConnection
+    return sqlite3.connect(db_path, timeout=timeout, **kwargs)
+
+
+def connect_read_only(db_path: str, timeout: float = 30.0) -> sqlite3.Connection:
+    """Connection that cannot write: opened read-only and with PRAGMA query_only."""
+    conn = connect(f"file:{quote(os.path.abspath(db_path))}?mode=ro", timeout=timeout, uri=True)
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+# ===================== SUPABASE =====================
+
+# Builder methods whose first argument is a column name (kept in the
+# fingerprint); their values are dropped
+_FILTER_METHODS = {
+    'eq', 'neq', 'gt', 'gte', 'lt', 'lte', 'like', 'ilike', 'is_', 'in_',
+    'contains', 'contained_by', 'order', 'filter', 'match'
+}
+
+
+class _QueryProxy:
+    """Wraps a postgrest query builder and times its execute()."""
+
+    def __init__(self, builder, parts: List[str]):
+        self._builder = builder
+        self._parts = parts
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            if name in _FILTER_METHODS and args:
+                part = f"{name}({args[0]})"
+            elif name == 'select':
+                part = f"select({', '.join(map(str, args))})"
+            else:
+                part = name
+            return _QueryProxy(attr(*args, **kwargs), self._parts + [part])
+
+        return call
+
+    def execute(self):
+        statement = '.'.join(self._parts)
+        start = time.perf_counter()
+        result = None
+        try:
+            result = self._builder.execute()
+            return result
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            data = getattr(result, 'data', None)
+            rows = len(data) if isinstance(data, list) else int(data is not None)
+            recorder.record('supabase', statement, duration_ms, rows, _caller())
+
+
+class InstrumentedSupabaseClient:
+    """Supabase client wrapper that times table() and rpc() queries."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name: str):
+        return _QueryProxy(self._client.table(name), [name])
+
+    def from_(self, name: str):
+        return _QueryProxy(self._client.from_(name), [name])
+
+    def rpc(self, function: str, params: Dict = None, *args, **kwargs):
+        return _QueryProxy(self._client.rpc(function, params or {}, *args, **kwargs), [f"rpc:{function}"])
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrument_supabase(client):
+    """Return client wrapped for timing when DB_INSTRUMENTATION is on, else client itself."""
+    return InstrumentedSupabaseClient(client) if enabled else client
+
+
+if enabled:
+    atexit.register(recorder.dump)
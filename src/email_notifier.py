@@ -1,8 +1,11 @@
 """Email notification module for password reset status."""
 
+import itertools
 import logging
+import queue
 import smtplib
 import os
+import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
@@ -13,13 +16,226 @@ from typing import Dict
 class EmailNotifier:
     """Send email notifications for password resets."""
 
-    def __init__(self):
-        """Initialize email notifier with credentials from environment."""
+    def __init__(self, max_retries: int = 3, retry_delay: float = 30.0, idle_timeout: float = 60.0):
+        """
+        Initialize email notifier with credentials from environment.
+        
+        Args:
+            max_retries: Attempts per queued message before it is dropped
+            retry_delay: Base delay in seconds between attempts (doubles each time)
+            idle_timeout: Seconds without mail after which the SMTP connection is closed
+        """
         load_dotenv()
         self.logger = logging.getLogger(__name__)
         self.sender_email = os.getenv('EMAIL_SENDER')
         self.sender_password = os.getenv('EMAIL_PASSWORD')
         self.recipient_email = os.getenv('EMAIL_RECIPIENT')
+        self.smtp_host = os.getenv('EMAIL_SMTP_HOST', 'smtp.gmail.com')
+        self.smtp_port = int(os.getenv('EMAIL_SMTP_PORT', '465'))
+
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.idle_timeout = idle_timeout
+
+        # Background sender state
+        self._queue = queue.Queue()
+        self._worker = None
+        self._server = None
+        self._smtp_lock = threading.Lock()
+        self._worker_lock = threading.Lock()
+        # Failed messages waiting out their backoff: id -> (Timer, item)
+        self._retries = {}
+        self._retry_ids = itertools.count()
+        self._retry_lock = threading.Lock()
+        self._stopping = False
+
+    def _is_configured(self) -> bool:
+        """Whether sender credentials and a recipient are set."""
+        return all([self.sender_email, self.sender_password, self.recipient_email])
+
+    # ===================== SMTP CONNECTION =====================
+
+    def _connect(self) -> smtplib.SMTP_SSL:
+        """Return the authenticated SMTP connection, opening it if needed."""
+        if self._server is not None:
+            try:
+                if self._server.noop()[0] == 250:
+                    return self._server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._disconnect()
+
+        server = smtplib.SMTP_SSL(self.smtp_host, self.smtp_port, timeout=30)
+        server.login(self.sender_email, self.sender_password)
+        self._server = server
+        self.logger.debug(f"Opened SMTP connection to {self.smtp_host}:{self.smtp_port}")
+        return server
+
+    def _disconnect(self):
+        """Close the SMTP connection if one is open."""
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+    def _deliver(self, msg: MIMEMultipart):
+        """
+        Send a message over the shared connection, reconnecting once if the
+        server dropped it.
+        """
+        with self._smtp_lock:
+            try:
+                self._connect().send_message(msg)
+            except (smtplib.SMTPServerDisconnected, OSError):
+                self._disconnect()
+                self._connect().send_message(msg)
+
+    def _build_message(self, subject: str, html: str) -> MIMEMultipart:
+        """Create an HTML message to the configured recipient."""
+        msg = MIMEMultipart()
+        msg['From'] = self.sender_email
+        msg['To'] = self.recipient_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(html, 'html'))
+        return msg
+
+    def _build_reset_message(self, username: str, success: bool, stats: Dict = None) -> MIMEMultipart:
+        """Create the per-account reset notification."""
+        status_text = "✓ SUCCESS" if success else "✗ FAILED"
+        subject = f"Password Reset {status_text} - {username}"
+        return self._build_message(subject, self._build_email_body(username, success, stats))
+
+    # ===================== BACKGROUND QUEUE =====================
+
+    def _ensure_worker(self):
+        """Start the background sender thread if it is not running."""
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run_worker, name='email-sender', daemon=True)
+                self._worker.start()
+
+    def _enqueue(self, description: str, msg: MIMEMultipart) -> bool:
+        """Queue a message for the background sender."""
+        if not self._is_configured():
+            self.logger.warning("Email credentials not configured, skipping notification")
+            return False
+        self._queue.put({'description': description, 'msg': msg, 'attempt': 1})
+        self._ensure_worker()
+        return True
+
+    def _run_worker(self):
+        """Send queued messages, keeping the connection open while mail keeps coming."""
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._smtp_lock:
+                    self._disconnect()
+                continue
+
+            if item is None:
+                self._queue.task_done()
+                with self._smtp_lock:
+                    self._disconnect()
+                return
+
+            try:
+                self._deliver(item['msg'])
+                self.logger.info(f"{item['description']} sent to {self.recipient_email}")
+            except Exception as e:
+                self._schedule_retry(item, e)
+            finally:
+                self._queue.task_done()
+
+    def _schedule_retry(self, item: Dict, error: Exception):
+        """Re-queue a failed message after a backoff delay without blocking the sender."""
+        if item['attempt'] >= self.max_retries:
+            self.logger.error(f"Giving up on {item['description']} after {item['attempt']} attempts: {error}")
+            return
+
+        delay = self.retry_delay * (2 ** (item['attempt'] - 1))
+        retry = dict(item, attempt=item['attempt'] + 1)
+        with self._retry_lock:
+            if self._stopping:
+                self.logger.error(f"Dropping {item['description']} after attempt {item['attempt']}, "
+                                  f"shutting down: {error}")
+                return
+            self.logger.warning(f"Failed to send {item['description']} (attempt {item['attempt']}), "
+                                f"retrying in {delay:.0f}s: {error}")
+            retry_id = next(self._retry_ids)
+            timer = threading.Timer(delay, self._fire_retry, args=(retry_id,))
+            timer.daemon = True
+            self._retries[retry_id] = (timer, retry)
+            timer.start()
+
+    def _fire_retry(self, retry_id: int):
+        """Timer callback: put a message back on the queue unless shutdown() took it."""
+        with self._retry_lock:
+            pending = self._retries.pop(retry_id, None)
+        if pending is not None:
+            self._queue.put(pending[1])
+
+    def queue_reset_notification(self, username: str, success: bool, stats: Dict = None) -> bool:
+        """
+        Queue a per-account reset notification for background delivery.
+        
+        Args:
+            username: Account username
+            success: Whether reset was successful
+            stats: Account statistics dictionary
+            
+        Returns:
+            True if the message was queued
+        """
+        msg = self._build_reset_message(username, success, stats)
+        return self._enqueue(f"Notification email for {username}", msg)
+
+    def queue_batch_report(self, results: Dict) -> bool:
+        """
+        Queue a batch report (see send_batch_report) for background delivery.
+        
+        Args:
+            results: Dictionary with reset results
+            
+        Returns:
+            True if the message was queued
+        """
+        return self._enqueue("Batch report", self._build_batch_message(results))
+
+    def flush(self):
+        """Block until every queued message has been attempted once."""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.join()
+
+    def shutdown(self):
+        """
+        Deliver queued messages, then stop the sender and close the connection.
+        
+        Messages waiting for a retry get their next attempt now instead of
+        after the backoff; one that fails again is dropped and logged.
+        """
+        with self._retry_lock:
+            self._stopping = True
+            pending = list(self._retries.values())
+            self._retries.clear()
+        for timer, item in pending:
+            timer.cancel()
+            self._queue.put(item)
+        if pending:
+            self.logger.info(f"Retrying {len(pending)} message(s) now before shutting down")
+            self._ensure_worker()
+
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join()
+        with self._retry_lock:
+            self._stopping = False
+
+    # ===================== SYNCHRONOUS SENDING =====================
 
     def send_reset_notification(self, username: str, success: bool, stats: Dict = None):
         """
@@ -30,28 +246,12 @@ class EmailNotifier:
             success: Whether reset was successful
             stats: Account statistics dictionary
         """
-        if not all([self.sender_email, self.sender_password, self.recipient_email]):
+        if not self._is_configured():
             self.logger.warning("Email credentials not configured, skipping notification")
             return False
 
         try:
-            status_text = "✓ SUCCESS" if success else "✗ FAILED"
-            subject = f"Password Reset {status_text} - {username}"
-            
-            body = self._build_email_body(username, success, stats)
-            
-            # Create email message
-            msg = MIMEMultipart()
-            msg['From'] = self.sender_email
-            msg['To'] = self.recipient_email
-            msg['Subject'] = subject
-            msg.attach(MIMEText(body, 'html'))
-            
-            # Send email
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
-            
+            self._deliver(self._build_reset_message(username, success, stats))
             self.logger.info(f"Notification email sent to {self.recipient_email}")
             return True
             
@@ -119,6 +319,71 @@ class EmailNotifier:
         
         return html
 
+    def _build_batch_message(self, results: Dict) -> MIMEMultipart:
+        """
+        Create the batch report message.
+        
+        When results contains an 'accounts' list (digest mode), one row per
+        account is included.
+        """
+        subject = f"Batch Password Reset Report - {results.get('timestamp', datetime.now())}"
+        
+        rows = ""
+        for account in results.get('accounts', []):
+            status = '<span class="success">✓ SUCCESS</span>' if account.get('success') \
+                else '<span class="failed">✗ FAILED</span>'
+            rows += f"""
+                                <tr><td>{account.get('username')}</td><td>{account.get('website', '')}</td><td>{status}</td></tr>"""
+        
+        details = ""
+        if rows:
+            details = f"""
+                        <div class="stats">
+                            <h3>Accounts:</h3>
+                            <table>
+                                <tr><th>Username</th><th>Website</th><th>Status</th></tr>{rows}
+                            </table>
+                        </div>"""
+        
+        html = f"""
+        <html>
+            <head>
+                <style>
+                    body {{ font-family: Arial, sans-serif; }}
+                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                    .header {{ background-color: #2196F3; color: white; padding: 20px; border-radius: 5px; }}
+                    .stats {{ background-color: #f5f5f5; padding: 20px; margin-top: 20px; border-radius: 5px; }}
+                    .stat-item {{ display: inline-block; margin: 10px 20px; }}
+                    .success {{ color: green; font-weight: bold; }}
+                    .failed {{ color: red; font-weight: bold; }}
+                    th, td {{ text-align: left; padding: 4px 12px 4px 0; }}
+                </style>
+            </head>
+            <body>
+                <div class="container">
+                    <div class="header">
+                        <h2>Batch Password Reset Report</h2>
+                        <p>{results.get('timestamp', datetime.now())}</p>
+                    </div>
+                    <div class="stats">
+                        <h3>Summary:</h3>
+                        <div class="stat-item">
+                            <strong>Total:</strong> {results.get('total', 0)}
+                        </div>
+                        <div class="stat-item">
+                            <strong class="success">Successful:</strong> {results.get('successful', 0)}
+                        </div>
+                        <div class="stat-item">
+                            <strong class="failed">Failed:</strong> {results.get('failed', 0)}
+                        </div>
+                    </div>{details}
+                </div>
+            </body>
+        </html>
+        """
+        
+        return self._build_message(subject, html)
+
     def send_batch_report(self, results: Dict):
         """
         Send email report of batch password resets.
@@ -126,59 +391,12 @@ class EmailNotifier:
         Args:
             results: Dictionary with reset results
         """
-        if not all([self.sender_email, self.sender_password, self.recipient_email]):
+        if not self._is_configured():
             self.logger.warning("Email credentials not configured, skipping report")
             return False
 
         try:
-            subject = f"Batch Password Reset Report - {results.get('timestamp', datetime.now())}"
-            
-            html = f"""
-            <html>
-                <head>
-                    <style>
-                        body {{ font-family: Arial, sans-serif; }}
-                        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                        .header {{ background-color: #2196F3; color: white; padding: 20px; border-radius: 5px; }}
-                        .stats {{ background-color: #f5f5f5; padding: 20px; margin-top: 20px; border-radius: 5px; }}
-                        .stat-item {{ display: inline-block; margin: 10px 20px; }}
-                        .success {{ color: green; font-weight: bold; }}
-                        .failed {{ color: red; font-weight: bold; }}
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="header">
-                            <h2>Batch Password Reset Report</h2>
-                            <p>{results.get('timestamp', datetime.now())}</p>
-                        </div>
-                        <div class="stats">
-                            <h3>Summary:</h3>
-                            <div class="stat-item">
-                                <strong>Total:</strong> {results.get('total', 0)}
-                            </div>
-                            <div class="stat-item">
-                                <strong class="success">Successful:</strong> {results.get('successful', 0)}
-                            </div>
-                            <div class="stat-item">
-                                <strong class="failed">Failed:</strong> {results.get('failed', 0)}
-                            </div>
-                        </div>
-                    </div>
-                </body>
-            </html>
-            """
-            
-            msg = MIMEMultipart()
-            msg['From'] = self.sender_email
-            msg['To'] = self.recipient_email
-            msg['Subject'] = subject
-            msg.attach(MIMEText(html, 'html'))
-            
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
-            
+            self._deliver(self._build_batch_message(results))
             self.logger.info(f"Batch report sent to {self.recipient_email}")
             return True
             
@@ -0,0 +1,224 @@
+"""Streaming CSV/NDJSON export of rentals, password history and API usage.
+
+Exports page through a table by primary key (WHERE id > last_id ORDER BY id
+LIMIT n): every page is its own short read, so an export of any range holds
+one page in memory, never pins the WAL for its whole duration, and can be
+resumed from the id of the last row written. Rows are emitted in id order;
+start/end filter on each table's time column (stored as UTC
+'YYYY-MM-DD HH:MM:SS' by CURRENT_TIMESTAMP).
+
+Passwords are never exported.
+"""
+
+import csv
+import io
+from abc import ABC, abstractmethod
+import json
+import os
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence
+
+from src.db_instrumentation import connect_read_only
+
+
+EXPORT_TABLES = {
+    'rentals': {
+        'time': 'rented_at',
+        'columns': ('id', 'account_id', 'customer_name', 'customer_email', 'customer_phone',
+                    'rented_at', 'expires_at', 'returned_at', 'status'),
+    },
+    'password_history': {
+        'time': 'reset_date',
+        'columns': ('id', 'account_id', 'reset_date', 'status', 'message'),
+    },
+    'api_usage': {
+        'time': 'timestamp',
+        'columns': ('id', 'api_key_id', 'account_id', 'website', 'action', 'ip_address',
+                    'user_agent', 'timestamp', 'response_status'),
+    },
+}
+
+# Tables kept in Supabase when it is the primary database (api_usage is always SQLite)
+SUPABASE_TABLES = ('rentals', 'password_history')
+
+FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def parse_time(value) -> Optional[datetime]:
+    """datetime from an ISO date/datetime string (None and '' pass through as None)."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def format_rows(rows: Sequence[Sequence], columns: Sequence[str], fmt: str) -> str:
+    """One chunk of output: rows (tuples in column order) as CSV lines or NDJSON."""
+    if fmt == 'ndjson':
+        return ''.join(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue()
+
+
+def last_exported_id(path: str, fmt: str) -> int:
+    """
+    Id of the last complete row in an export file (0 if there is none).
+
+    A partial last line left by an interrupted export is cut off, so the
+    file can be appended to from the returned id.
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        tail_size = min(size, 64 * 1024)
+        f.seek(size - tail_size)
+        tail = f.read(tail_size)
+        if not tail.endswith(b"\n"):
+            keep = tail.rfind(b"\n") + 1
+            f.truncate(size - tail_size + keep)
+            tail = tail[:keep]
+
+    if fmt == 'ndjson':
+        lines = tail.splitlines()
+        return json.loads(lines[-1])['id'] if lines and lines[-1].strip() else 0
+
+    # CSV fields may span lines, so read records rather than lines
+    last_id = 0
+    with open(path, newline='') as f:
+        for record in csv.reader(f):
+            if record and record[0].isdigit():
+                last_id = int(record[0])
+    return last_id
+
+
+class _Exporter(ABC):
+    """Formatting shared by the SQLite and Supabase exporters; subclasses provide iter_pages()."""
+
+    chunk_size = 1000
+    rows_exported = 0  # by the last stream()
+    last_id = 0        # id of the last row stream() produced
+
+    @abstractmethod
+    def iter_pages(self, table: str, start: datetime = None, end: datetime = None,
+                   after_id: int = 0) -> Iterator[List[tuple]]:
+        """Rows of table in id order, one list of column-ordered tuples per page."""
+
+    def stream(self, table: str, fmt: str = 'ndjson', start: datetime = None, end: datetime = None,
+               after_id: int = 0, header: bool = None) -> Iterator[str]:
+        """
+        Export table as text chunks, one per page.
+
+        Args:
+            table: Name from EXPORT_TABLES
+            fmt: 'csv' or 'ndjson'
+            start: Rows at or after this time (None = from the beginning)
+            end: Rows before this time (None = up to now)
+            after_id: Resume after this id (the last id already exported)
+            header: Emit the CSV header (default: only when not resuming)
+        """
+        if table not in EXPORT_TABLES:
+            raise ValueError(f"Unknown export table '{table}' (expected one of {', '.join(EXPORT_TABLES)})")
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(FORMATS)})")
+        columns = EXPORT_TABLES[table]['columns']
+        self.rows_exported, self.last_id = 0, after_id or 0
+        if fmt == 'csv' and (header if header is not None else not after_id):
+            yield format_rows([columns], columns, 'csv')
+        for rows in self.iter_pages(table, start=start, end=end, after_id=after_id):
+            yield format_rows(rows, columns, fmt)
+            self.rows_exported += len(rows)
+            self.last_id = rows[-1][0]
+
+
+class SQLiteExporter(_Exporter):
+    """Keyset-paginated export from the SQLite database over read-only connections."""
+
+    def __init__(self, db_path: str = "database/rental_system.db", chunk_size: int = 1000):
+        """
+        Args:
+            db_path: Path to the SQLite database
+            chunk_size: Rows per page (one short read transaction each)
+        """
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+
+    def iter_pages(self, table: str, start: datetime = None, end: datetime = None,
+                   after_id: int = 0) -> Iterator[List[tuple]]:
+        spec = EXPORT_TABLES[table]
+        time_column = spec['time']
+        conditions, params = [], []
+        if start:
+            conditions.append(f"{time_column} >= ?")
+            params.append(start.strftime('%Y-%m-%d %H:%M:%S'))
+        if end:
+            conditions.append(f"{time_column} < ?")
+            params.append(end.strftime('%Y-%m-%d %H:%M:%S'))
+
+        conn = connect_read_only(self.db_path)
+        try:
+            last_id = after_id or 0
+            if conditions:
+                # Skip straight to the first row in range
+                row = conn.execute(f"SELECT id FROM {table} WHERE id > ? AND {' AND '.join(conditions)} "
+                                   f"ORDER BY id LIMIT 1", [last_id] + params).fetchone()
+                if row is None:
+                    return
+                last_id = max(last_id, row[0] - 1)
+
+            # Unary + keeps the planner on the primary key instead of sorting a time-index range per page
+            where = ' AND '.join(['id > ?'] + [f"+{c}" for c in conditions])
+            sql = f"SELECT {', '.join(spec['columns'])} FROM {table} WHERE {where} ORDER BY id LIMIT ?"
+            while True:
+                rows = conn.execute(sql, [last_id] + params + [self.chunk_size]).fetchall()
+                if not rows:
+                    break
+                yield rows
+                last_id = rows[-1][0]
+                if len(rows) < self.chunk_size:
+                    break
+        finally:
+            conn.close()
+
+
+class SupabaseExporter(_Exporter):
+    """Keyset-paginated export of rentals and password history from Supabase."""
+
+    def __init__(self, client, chunk_size: int = 1000):
+        """
+        Args:
+            client: Supabase client (e.g. SupabaseDB().client)
+            chunk_size: Rows per page (one request each)
+        """
+        self.client = client
+        self.chunk_size = chunk_size
+
+    def iter_pages(self, table: str, start: datetime = None, end: datetime = None,
+                   after_id: int = 0) -> Iterator[List[tuple]]:
+        if table not in SUPABASE_TABLES:
+            raise ValueError(f"'{table}' is not stored in Supabase; export it from SQLite")
+        spec = EXPORT_TABLES[table]
+        columns = spec['columns']
+        last_id = after_id or 0
+        while True:
+            query = self.client.table(table).select(','.join(columns)).gt('id', last_id)
+            if start:
+                query = query.gte(spec['time'], start.isoformat())
+            if end:
+                query = query.lt(spec['time'], end.isoformat())
+            data = query.order('id').limit(self.chunk_size).execute().data or []
+            if not data:
+                break
+            yield [tuple(row.get(column) for column in columns) for row in data]
+            last_id = data[-1]['id']
+            if len(data) < self.chunk_size:
+                break
+
+
+def exporter_for(table: str, db_path: str, supabase_client=None, chunk_size: int = 1000) -> _Exporter:
+    """Exporter for the database that holds table (Supabase when a client is given and has it)."""
+    if supabase_client is not None and table in SUPABASE_TABLES:
+        return SupabaseExporter(supabase_client, chunk_size=chunk_size)
+    return SQLiteExporter(db_path, chunk_size=chunk_size)
@@ -0,0 +1,421 @@
+"""In-memory stand-in for the Supabase client.
+
+Implements the part of the supabase-py query builder this project uses
+(table().select/insert/upsert/update/delete with eq/neq/gt/gte/lt/lte/in_/is_
+filters, order, limit, count='exact' and nested selects such as
+'*, accounts(id, username, websites(name))') plus the get_available_accounts,
+auto_expire_rentals and overdue_rentals_summary functions from
+supabase_schema.sql.
+
+Every execute() counts as one round trip and sleeps for the configured
+latency, so the cost of chatty query patterns can be measured offline:
+
+    client = FakeSupabaseClient(latency_ms=40)
+    db = SupabaseDB(client=client)
+"""
+
+import copy
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class FakeSupabaseError(Exception):
+    """Raised where PostgREST would return an error (e.g. a unique violation)."""
+
+
+class FakeResponse:
+    """Mimics postgrest's APIResponse (data and count)."""
+
+    def __init__(self, data, count: Optional[int] = None):
+        self.data = data
+        self.count = count
+
+
+# Column defaults and unique constraints per table, following supabase_schema.sql
+SCHEMA = {
+    'websites': {
+        'defaults': {'description': None},
+        'unique': [('name',)],
+    },
+    'accounts': {
+        'defaults': {
+            'email': None, 'status': 'available', 'rented_at': None, 'available_at': None,
+            'last_reset': None, 'failed_login_attempts': 0, 'last_failed_login': None,
+            'exception_reason': None,
+        },
+        'unique': [('website_id', 'username')],
+    },
+    'password_history': {
+        'defaults': {'old_password': None, 'message': None},
+        'unique': [],
+    },
+    'rentals': {
+        'defaults': {
+            'customer_name': None, 'customer_email': None, 'customer_phone': None,
+            'returned_at': None, 'status': 'active',
+        },
+        'unique': [],
+    },
+    'api_keys': {
+        'defaults': {'email': None, 'is_active': True, 'rate_limit': 100, 'total_requests': 0, 'last_used': None},
+        'unique': [('key',), ('key_hash',)],
+    },
+    'api_usage_logs': {
+        'defaults': {'api_key_id': None, 'website': None, 'account_id': None, 'ip_address': None,
+                     'user_agent': None, 'response_status': None},
+        'unique': [],
+    },
+}
+
+# Tables whose created timestamp column is not called created_at
+CREATED_COLUMNS = {'password_history': 'reset_date', 'rentals': 'rented_at'}
+
+_SQLITE_TIMESTAMP = re.compile(r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}')
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+def _split_columns(columns: str) -> List[str]:
+    """Split a select string on top-level commas."""
+    parts, depth, current = [], 0, ''
+    for char in columns:
+        if char == ',' and depth == 0:
+            parts.append(current.strip())
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+
+def _singular(table: str) -> str:
+    return table[:-1] if table.endswith('s') else table
+
+
+class _QueryBuilder:
+    """One table query; built up by chained calls and run by execute()."""
+
+    def __init__(self, client: 'FakeSupabaseClient', table: str):
+        self.client = client
+        self.table = table
+        self.operation = None
+        self.columns = '*'
+        self.count = None
+        self.payload = None
+        self.on_conflict = ''
+        self.ignore_duplicates = False
+        self.filters = []
+        self.ordering = []
+        self.row_limit = None
+
+    # ----- operations -----
+
+    def select(self, columns: str = '*', count: str = None):
+        self.operation, self.columns, self.count = 'select', columns, count
+        return self
+
+    def insert(self, rows):
+        self.operation, self.payload = 'insert', rows
+        return self
+
+    def upsert(self, rows, on_conflict: str = '', ignore_duplicates: bool = False):
+        self.operation, self.payload = 'upsert', rows
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def update(self, values: Dict):
+        self.operation, self.payload = 'update', values
+        return self
+
+    def delete(self):
+        self.operation = 'delete'
+        return self
+
+    # ----- filters and modifiers -----
+
+    def _filter(self, column, test):
+        self.filters.append((column, test))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column, value):
+        return self._filter(column, lambda v: v != value)
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v is not None and v < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v is not None and v <= value)
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._filter(column, lambda v: v in values)
+
+    def is_(self, column, value):
+        expected = None if value in (None, 'null') else value
+        return self._filter(column, lambda v: v is expected or v == expected)
+
+    def order(self, column: str, desc: bool = False):
+        self.ordering.append((column, desc))
+        return self
+
+    def limit(self, size: int):
+        self.row_limit = size
+        return self
+
+    def execute(self) -> FakeResponse:
+        return self.client._round_trip(self._run)
+
+    # ----- evaluation (runs under the client lock) -----
+
+    def _matching(self) -> List[Dict]:
+        rows = self.client._rows(self.table)
+        return [row for row in rows if all(test(row.get(column)) for column, test in self.filters)]
+
+    def _run(self) -> FakeResponse:
+        if self.operation == 'insert':
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            return FakeResponse([self.client._insert(self.table, row) for row in rows])
+
+        if self.operation == 'upsert':
+            rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            written = [self.client._upsert(self.table, row, self.on_conflict, self.ignore_duplicates) for row in rows]
+            return FakeResponse([row for row in written if row is not None])
+
+        matched = self._matching()
+
+        if self.operation == 'update':
+            for row in matched:
+                row.update(copy.deepcopy(self.payload))
+            return FakeResponse(copy.deepcopy(matched))
+
+        if self.operation == 'delete':
+            deleted = {id(row) for row in matched}
+            remaining = [row for row in self.client._rows(self.table) if id(row) not in deleted]
+            self.client.tables[self.table] = remaining
+            return FakeResponse(copy.deepcopy(matched))
+
+        # select
+        for column, desc in reversed(self.ordering):
+            # NULLs last ascending, first descending (PostgreSQL default)
+            matched.sort(key=lambda r: (r.get(column) is None, r.get(column) or 0), reverse=desc)
+        total = len(matched)
+        if self.row_limit is not None:
+            matched = matched[:self.row_limit]
+        data = [self.client._project(self.table, row, self.columns) for row in matched]
+        return FakeResponse(data, total if self.count == 'exact' else None)
+
+
+class _RpcBuilder:
+    """A stored-function call; run by execute()."""
+
+    def __init__(self, client: 'FakeSupabaseClient', function: str, params: Dict):
+        self.client = client
+        self.function = function
+        self.params = params or {}
+
+    def execute(self) -> FakeResponse:
+        handler = getattr(self.client, f"_rpc_{self.function}", None)
+        if handler is None:
+            raise FakeSupabaseError(f"Could not find the function public.{self.function}")
+        return self.client._round_trip(lambda: FakeResponse(handler(**self.params)))
+
+
+class FakeSupabaseClient:
+    """In-memory Supabase client with injectable per-request latency."""
+
+    url = 'memory://fake-supabase'
+
+    def __init__(self, latency_ms: float = 0.0):
+        """
+        Args:
+            latency_ms: Delay added to every execute(), simulating a network round trip
+        """
+        self.latency_ms = latency_ms
+        self.round_trips = 0
+        self.tables: Dict[str, List[Dict]] = {name: [] for name in SCHEMA}
+        self._next_id = {name: 1 for name in SCHEMA}
+        self._lock = threading.RLock()
+
+    def table(self, name: str) -> _QueryBuilder:
+        return _QueryBuilder(self, name)
+
+    from_ = table
+
+    def rpc(self, function: str, params: Dict = None) -> _RpcBuilder:
+        return _RpcBuilder(self, function, params)
+
+    # ===================== INTERNALS =====================
+
+    def _round_trip(self, run):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+        with self._lock:
+            self.round_trips += 1
+            return run()
+
+    def _rows(self, table: str) -> List[Dict]:
+        if table not in self.tables:
+            raise FakeSupabaseError(f"relation \"public.{table}\" does not exist")
+        return self.tables[table]
+
+    def _insert(self, table: str, values: Dict) -> Dict:
+        rows = self._rows(table)
+        schema = SCHEMA.get(table, {'defaults': {}, 'unique': []})
+        row = {**schema['defaults'], **copy.deepcopy(values)}
+        row.setdefault(CREATED_COLUMNS.get(table, 'created_at'), _now())
+
+        for columns in schema['unique']:
+            key = tuple(row.get(column) for column in columns)
+            if any(tuple(existing.get(column) for column in columns) == key for existing in rows):
+                raise FakeSupabaseError(
+                    f"duplicate key value violates unique constraint \"{table}_{'_'.join(columns)}_key\""
+                )
+
+        if 'id' not in row:
+            row['id'] = self._next_id[table]
+        self._next_id[table] = max(self._next_id[table], row['id'] + 1)
+        rows.append(row)
+        return copy.deepcopy(row)
+
+    def _upsert(self, table: str, values: Dict, on_conflict: str, ignore_duplicates: bool) -> Optional[Dict]:
+        """Insert values or update the row they conflict with on on_conflict (default id); None if ignored."""
+        columns = [column.strip() for column in on_conflict.split(',') if column.strip()] or ['id']
+        key = tuple(values.get(column) for column in columns)
+        for row in self._rows(table):
+            if tuple(row.get(column) for column in columns) == key:
+                if ignore_duplicates:
+                    return None
+                row.update(copy.deepcopy(values))
+                return copy.deepcopy(row)
+        return self._insert(table, values)
+
+    def _find(self, table: str, row_id) -> Optional[Dict]:
+        for row in self._rows(table):
+            if row['id'] == row_id:
+                return row
+        return None
+
+    def _project(self, table: str, row: Dict, columns: str) -> Dict:
+        """Apply a select string, resolving embedded tables through *_id columns."""
+        result = {}
+        for part in _split_columns(columns):
+            if part == '*':
+                result.update(copy.deepcopy(row))
+                continue
+
+            match = re.match(r'^(\w+)\((.*)\)$', part, re.S)
+            if not match:
+                result[part] = copy.deepcopy(row.get(part))
+                continue
+
+            related, nested = match.group(1), match.group(2) or '*'
+            foreign_key = f"{_singular(related)}_id"
+            if foreign_key in row:
+                # Many-to-one (e.g. rentals -> accounts): embedded object
+                target = self._find(related, row[foreign_key])
+                result[related] = self._project(related, target, nested) if target else None
+            else:
+                # One-to-many (e.g. websites -> accounts): embedded list
+                back_key = f"{_singular(table)}_id"
+                result[related] = [
+                    self._project(related, child, nested)
+                    for child in self._rows(related) if child.get(back_key) == row['id']
+                ]
+        return result
+
+    # ===================== STORED FUNCTIONS =====================
+
+    def _rpc_auto_expire_rentals(self):
+        now = _now()
+        expired = [r for r in self.tables['rentals'] if r['status'] == 'active' and r['expires_at'] < now]
+        expired_accounts = {r['account_id'] for r in expired}
+        for account in self.tables['accounts']:
+            if account['id'] in expired_accounts:
+                account['status'] = 'available'
+                account['available_at'] = now
+        for rental in expired:
+            rental['status'] = 'expired'
+        return len(expired)
+
+    def _rpc_overdue_rentals_summary(self):
+        now = _now()
+        accounts = {a['id']: a for a in self.tables['accounts']}
+        websites = {w['id']: w['name'] for w in self.tables['websites']}
+        summary = {}
+        for rental in self.tables['rentals']:
+            if rental['status'] == 'active' and rental['expires_at'] < now:
+                account = accounts.get(rental['account_id'])
+                website = websites.get(account['website_id']) if account else None
+                entry = summary.setdefault(website, {'website': website, 'overdue': 0,
+                                                     'oldest_expires_at': rental['expires_at']})
+                entry['overdue'] += 1
+                entry['oldest_expires_at'] = min(entry['oldest_expires_at'], rental['expires_at'])
+        return list(summary.values())
+
+    def _rpc_get_available_accounts(self, website_name: str):
+        self._rpc_auto_expire_rentals()
+        websites = {w['id']: w for w in self.tables['websites'] if w['name'] == website_name}
+        accounts = [a for a in self.tables['accounts']
+                    if a['website_id'] in websites and a['status'] == 'available']
+        accounts.sort(key=lambda a: (a['last_reset'] is not None, a['last_reset'] or ''))
+        return [
+            {
+                'id': a['id'],
+                'username': a['username'],
+                'email': a['email'],
+                'current_password': a['current_password'],
+                'last_reset': a['last_reset'],
+                'validity_hours': websites[a['website_id']]['validity_hours'],
+            }
+            for a in accounts
+        ]
+
+    # ===================== LOADING =====================
+
+    def load_from_sqlite(self, db_path: str, tables=('websites', 'accounts', 'password_history', 'rentals')):
+        """
+        Copy rows from a PasswordResetDB file (e.g. a benchmark dataset).
+
+        SQLite timestamps ('YYYY-MM-DD HH:MM:SS') are rewritten in ISO form so
+        they compare correctly with the timestamps this client writes.
+        """
+        conn = sqlite3.connect(db_path, timeout=30.0)
+        conn.row_factory = sqlite3.Row
+        try:
+            with self._lock:
+                for table in tables:
+                    for record in conn.execute(f"SELECT * FROM {table}"):
+                        row = {}
+                        for key in record.keys():
+                            value = record[key]
+                            if isinstance(value, str) and _SQLITE_TIMESTAMP.match(value):
+                                value = value.replace(' ', 'T', 1)
+                            row[key] = value
+                        self.tables[table].append(row)
+                        self._next_id[table] = max(self._next_id[table], row['id'] + 1)
+        finally:
+            conn.close()
+
+    def reset_round_trips(self) -> int:
+        """Return the round-trip count and reset it to zero."""
+        with self._lock:
+            count, self.round_trips = self.round_trips, 0
+        return count
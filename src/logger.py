@@ -1,54 +1,272 @@
 """Logging configuration module."""
 
+import atexit
+import contextvars
+import copy
+import gzip
+import json
 import logging
 import os
+import queue
+import shutil
+from contextlib import contextmanager
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 
 
-def setup_logging(log_level: str = "INFO", log_dir: str = "logs") -> logging.Logger:
+# Identifiers attached to every record logged inside a log_context block
+CONTEXT_FIELDS = ('request_id', 'rental_id', 'account_id')
+
+_log_context = contextvars.ContextVar('log_context', default={})
+_listener = None
+
+
+# ===================== LOG CONTEXT =====================
+
+def bind_log_context(**ids) -> contextvars.Token:
+    """
+    Add identifiers to the current log context.
+
+    Args:
+        **ids: Values such as request_id, rental_id or account_id
+
+    Returns:
+        Token for reset_log_context()
+    """
+    return _log_context.set({**_log_context.get(), **ids})
+
+
+def reset_log_context(token: contextvars.Token):
+    """Restore the log context to what it was before bind_log_context()."""
+    _log_context.set(token.old_value if token.old_value is not token.MISSING else {})
+
+
+@contextmanager
+def log_context(**ids):
+    """
+    Attach identifiers to every record logged inside the block.
+
+    Example:
+        with log_context(account_id=42):
+            logger.info("Resetting")   # record carries account_id=42
+    """
+    token = bind_log_context(**ids)
+    try:
+        yield
+    finally:
+        reset_log_context(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copy the current log context onto each record.
+
+    Runs on the QueueHandler, i.e. in the thread that made the logging call,
+    since the listener thread does not share that thread's context. Values
+    passed explicitly through ``extra=`` take precedence.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, context.get(field))
+        for field, value in context.items():
+            if not hasattr(record, field):
+                setattr(record, field, value)
+        record.context_fields = sorted(set(CONTEXT_FIELDS) | set(context))
+        return True
+
+
+class TracebackQueueHandler(QueueHandler):
+    """QueueHandler that keeps the traceback in its own field.
+
+    The stock prepare() appends the traceback to msg and drops exc_info, so
+    formatters on the listener side cannot tell them apart. Here the
+    traceback is rendered into exc_text in the calling thread (the traceback
+    objects themselves are not queued) and msg stays the bare message;
+    logging.Formatter appends exc_text as before and JsonFormatter emits it
+    as 'exception'.
+    """
+
+    _traceback_formatter = logging.Formatter()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._traceback_formatter.formatException(record.exc_info)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+# ===================== FORMATTERS =====================
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for field in getattr(record, 'context_fields', CONTEXT_FIELDS):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+# ===================== ROTATION =====================
+
+class CompressingRotatingFileHandler(TimedRotatingFileHandler):
+    """Rotate at midnight or when the file exceeds max_bytes; gzip rotated files."""
+
+    def __init__(self, filename: str, max_bytes: int = 0, backup_count: int = 14,
+                 compress: bool = True, **kwargs):
+        """
+        Args:
+            filename: Active log file
+            max_bytes: Also rotate once the file reaches this size (0 disables)
+            backup_count: Rotated files to keep
+            compress: Gzip rotated files
+            **kwargs: Passed to TimedRotatingFileHandler (when, interval, ...)
+        """
+        kwargs.setdefault('when', 'midnight')
+        kwargs.setdefault('encoding', 'utf-8')
+        super().__init__(filename, backupCount=backup_count, **kwargs)
+        self.max_bytes = max_bytes
+        self.compress = compress
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        message = f"{self.format(record)}{self.terminator}"
+        return self.stream.tell() + len(message) >= self.max_bytes
+
+    def rotation_filename(self, default_name: str) -> str:
+        # Size rollovers can happen several times within one period, so
+        # number the rotated files instead of overwriting the earlier ones
+        extension = '.gz' if self.compress else ''
+        name = default_name + extension
+        counter = 1
+        while os.path.exists(name):
+            name = f"{default_name}.{counter}{extension}"
+            counter += 1
+        return name
+
+    def rotate(self, source: str, dest: str):
+        if not self.compress:
+            os.replace(source, dest)
+            return
+        with open(source, 'rb') as src, gzip.open(dest, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(source)
+
+    def getFilesToDelete(self):
+        directory, base_name = os.path.split(self.baseFilename)
+        prefix = base_name + '.'
+        rotated = [
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.startswith(prefix)
+        ]
+        if len(rotated) <= self.backupCount:
+            return []
+        rotated.sort(key=os.path.getmtime)
+        return rotated[:len(rotated) - self.backupCount]
+
+
+# ===================== SETUP =====================
+
+def stop_logging():
+    """Flush queued records to the handlers and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def setup_logging(log_level: str = "INFO", log_dir: str = "logs", log_format: str = None,
+                  max_bytes: int = None, backup_count: int = None) -> logging.Logger:
     """
     Configure logging for the application.
-    
+
+    Logging calls only put records on a queue; a listener thread writes them
+    to the console and to ``reset_automation.log``, which is rotated at
+    midnight or when it reaches max_bytes and gzipped after rotation.
+
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_dir: Directory for log files
-        
+        log_format: 'text' or 'json' (JSON lines) for the log file;
+            defaults to the LOG_FORMAT environment variable, then 'text'
+        max_bytes: Size-based rotation threshold (LOG_MAX_BYTES, default 50 MB)
+        backup_count: Rotated files to keep (LOG_BACKUP_COUNT, default 14)
+
     Returns:
         Configured logger instance
     """
+    log_format = (log_format or os.getenv('LOG_FORMAT', 'text')).lower()
+    if max_bytes is None:
+        max_bytes = int(os.getenv('LOG_MAX_BYTES', str(50 * 1024 * 1024)))
+    if backup_count is None:
+        backup_count = int(os.getenv('LOG_BACKUP_COUNT', '14'))
+
     # Create logs directory if it doesn't exist
     os.makedirs(log_dir, exist_ok=True)
-    
+
     # Create logger
     logger = logging.getLogger()
     logger.setLevel(log_level)
-    
-    # Remove existing handlers
+
+    # Remove existing handlers (and a listener from an earlier call)
+    stop_logging()
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
-    
+
     # File handler
-    log_filename = os.path.join(
-        log_dir,
-        f"reset_automation_{datetime.now().strftime('%Y%m%d')}.log"
+    file_handler = CompressingRotatingFileHandler(
+        os.path.join(log_dir, "reset_automation.log"),
+        max_bytes=max_bytes,
+        backup_count=backup_count
     )
-    file_handler = logging.FileHandler(log_filename)
     file_handler.setLevel(log_level)
-    
+
     # Console handler
     console_handler = logging.StreamHandler()
     console_handler.setLevel(log_level)
-    
+
     # Formatter
     formatter = logging.Formatter(
         '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    file_handler.setFormatter(formatter)
+    file_handler.setFormatter(JsonFormatter() if log_format == 'json' else formatter)
     console_handler.setFormatter(formatter)
-    
-    # Add handlers
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+
+    # Callers only enqueue; the listener thread does the I/O
+    log_queue = queue.SimpleQueue()
+    queue_handler = TracebackQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
+
+    global _listener
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
     return logger
+
+
+atexit.register(stop_logging)
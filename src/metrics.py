@@ -0,0 +1,306 @@
+"""In-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are plain dictionaries guarded by one lock
+per metric, so recording a sample costs a dictionary update. The API server
+renders the registry at /metrics; processes without an HTTP server (the
+scheduler) write it to a textfile the API server appends to its output.
+"""
+
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+class _Metric:
+    """Shared label handling for all metric types."""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_text(self, key: Tuple, extra: Dict = None) -> str:
+        pairs = list(zip(self.labelnames, key)) + list((extra or {}).items())
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set."""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{self._label_text(key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, or be read from a callback at render time."""
+
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self._function = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the (unlabelled) value from function whenever metrics are rendered."""
+        self._function = function
+
+    def _samples(self) -> List[str]:
+        if self._function is not None:
+            return [f"{self.name} {_format_value(self._function())}"]
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{self._label_text(key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    """Bucketed observations (e.g. latencies in seconds) per label set."""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+
+        lines = []
+        for key, (counts, total, count) in values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = {'le': _format_value(bound)}
+                lines.append(f"{self.name}_bucket{self._label_text(key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args, **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} is already registered as a {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition of every registered metric."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+    def write_textfile(self, path: str):
+        """Atomically write the rendered metrics to path (node_exporter textfile format)."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+
+# Served by the API server's /metrics endpoint
+REGISTRY = MetricsRegistry()
+# Written to a textfile by the scheduler process and appended by /metrics
+SCHEDULER_REGISTRY = MetricsRegistry()
+
+
+# ===================== API =====================
+
+HTTP_REQUESTS = REGISTRY.counter(
+    'api_http_requests_total', 'HTTP requests handled', ['method', 'route', 'status'])
+HTTP_LATENCY = REGISTRY.histogram(
+    'api_http_request_duration_seconds', 'HTTP request latency', ['method', 'route'])
+DB_LATENCY = REGISTRY.histogram(
+    'db_operation_duration_seconds', 'Database operation latency', ['backend', 'operation'])
+DB_ERRORS = REGISTRY.counter(
+    'db_operation_errors_total', 'Database operations that raised', ['backend', 'operation'])
+CACHE_LOOKUPS = REGISTRY.counter(
+    'cache_lookups_total', 'Cache lookups by result (hit or miss)', ['cache', 'result'])
+
+# ===================== SQLITE =====================
+
+WAL_BYTES = REGISTRY.gauge(
+    'sqlite_wal_bytes', 'Size of the -wal file', ['database'])
+WAL_CHECKPOINT_LAG = REGISTRY.gauge(
+    'sqlite_wal_checkpoint_lag_frames', 'WAL frames the last checkpoint could not copy', ['database'])
+WAL_CHECKPOINT_BLOCKED = REGISTRY.gauge(
+    'sqlite_wal_checkpoint_blocked_seconds', 'Seconds checkpoints have been kept from completing by readers', ['database'])
+WAL_CHECKPOINTS = REGISTRY.counter(
+    'sqlite_wal_checkpoints_total', 'Checkpoints run by the checkpoint manager', ['database', 'mode', 'result'])
+WRITE_BATCH_SIZE = REGISTRY.histogram(
+    'sqlite_write_batch_size', 'Operations committed together by the write actor',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+WRITE_BATCH_LATENCY = REGISTRY.histogram(
+    'sqlite_write_batch_duration_seconds', 'Time the write actor holds the write lock per batch',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+
+# ===================== SCHEDULER =====================
+
+RESET_QUEUE_LENGTH = SCHEDULER_REGISTRY.gauge(
+    'reset_queue_length', 'Accounts of the current batch still waiting to be reset')
+RESET_DURATION = SCHEDULER_REGISTRY.histogram(
+    'reset_duration_seconds', 'Wall time of a password reset', ['website', 'success'],
+    buckets=(5, 10, 20, 30, 45, 60, 90, 120, 180, 300, 600))
+ACTIVE_BROWSERS = SCHEDULER_REGISTRY.gauge(
+    'reset_active_browsers', 'Reset browser sessions currently open', ['engine'])
+
+
+def instrument_methods(obj, backend: str, histogram: Histogram = DB_LATENCY,
+                       errors: Counter = DB_ERRORS):
+    """
+    Time every public method of a database object.
+
+    Methods are wrapped on the instance, so isinstance checks keep working.
+
+    Args:
+        obj: Database object (PasswordResetDB, SupabaseDB, APIManager, ...)
+        backend: Label identifying the backend (e.g. 'sqlite', 'supabase')
+        histogram: Histogram receiving the durations
+        errors: Counter incremented when a method raises
+
+    Returns:
+        The same object
+    """
+    def wrap(name, method):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            except Exception:
+                errors.inc(backend=backend, operation=name)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start, backend=backend, operation=name)
+        return timed
+
+    for name in dir(type(obj)):
+        if name.startswith('_'):
+            continue
+        method = getattr(obj, name, None)
+        if callable(method):
+            setattr(obj, name, wrap(name, method))
+    return obj
+
+
+def read_textfiles(directory: str) -> str:
+    """Concatenate the *.prom files written by other processes."""
+    if not directory or not os.path.isdir(directory):
+        return ''
+    parts = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith('.prom'):
+            try:
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    parts.append(f.read())
+            except OSError:
+                continue
+    return ''.join(parts)
@@ -3,7 +3,9 @@
 import logging
 import time
 import os
-from typing import Tuple
+import uuid
+from functools import wraps
+from typing import Dict, List, Tuple
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -15,14 +17,56 @@ from selenium.common.exceptions import (
     WebDriverException
 )
 
+from src.browser_watchdog import BrowserWatchdog
 from src.logger import setup_logging
 from src.utils import PasswordValidator
 
 
+def timed_step(name: str):
+    """
+    Decorator recording the wall time of a bot step in ``self.step_timings``.
+    
+    Time spent in nested timed steps (e.g. ``_init_driver`` inside
+    ``open_website``) is attributed only to the inner step.
+    
+    Args:
+        name: Step name used as the key in step_timings
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            outer_nested = self._nested_step_time
+            self._nested_step_time = 0.0
+            start = time.monotonic()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                elapsed = time.monotonic() - start
+                own = elapsed - self._nested_step_time
+                self.step_timings[name] = self.step_timings.get(name, 0.0) + own
+                self._nested_step_time = outer_nested + elapsed
+        return wrapper
+    return decorator
+
+
 class PasswordResetBot:
     """A bot to automate password resets on unlocktool.net."""
 
-    def __init__(self, username: str, password: str, headless: bool = False, timeout: int = 30):
+    # Lean profile: resource types the bot never looks at. Matched by URL so
+    # that reCAPTCHA challenge images (served without an extension) still load.
+    LEAN_BLOCKED_EXTENSIONS = (
+        "png", "jpg", "jpeg", "gif", "webp", "svg", "ico",
+        "woff", "woff2", "ttf", "otf", "eot",
+        "mp4", "webm", "mp3", "ogg", "wav",
+    )
+    # Patterns match the whole URL, so cache-busted assets (a.png?v=3) need their own
+    LEAN_BLOCKED_URLS = [pattern for extension in LEAN_BLOCKED_EXTENSIONS
+                         for pattern in (f"*.{extension}", f"*.{extension}?*")]
+    LEAN_WINDOW_SIZE = (1280, 800)
+
+    def __init__(self, username: str, password: str, headless: bool = False, timeout: int = 30,
+                 lean_profile: bool = False, shared_browser=None,
+                 base_url: str = "https://unlocktool.net"):
         """
         Initialize the password reset bot.
         
@@ -31,24 +75,104 @@ class PasswordResetBot:
             password: Account password
             headless: Run Chrome in headless mode
             timeout: Timeout for element waits in seconds
+            lean_profile: Use eager page loads, block images/fonts/media,
+                disable the GPU and use a small fixed window
+            shared_browser: Optional SharedBrowser; when given the bot runs in
+                an isolated context of that browser instead of launching Chrome
+            base_url: Site root, e.g. a local stand-in for benchmarks
         """
         self.logger = logging.getLogger(__name__)
         self.timeout = timeout
         self.driver = None
         self.headless = headless
+        self.lean_profile = lean_profile
+        self.shared_browser = shared_browser
+        self.context = None  # BrowserContext when running in a shared browser
+        # Identifies this bot's browser on the command line, so the watchdog
+        # can kill it even before the driver is returned
+        self.owner_tag = uuid.uuid4().hex[:12]
         self.use_uc = True  # Use undetected-chromedriver
+        self.base_url = base_url.rstrip('/')
 
         # User credentials
         self.username = username
         self.password = password
         self.new_password = None  # Will be set during password reset
 
+        # Seconds spent blocked in readiness waits, keyed by step name
+        self.wait_times: Dict[str, float] = {}
+
+        # Seconds spent in each pipeline step (see timed_step)
+        self.step_timings: Dict[str, float] = {}
+        self._nested_step_time = 0.0
+
+    def _wait_until(self, step: str, condition, timeout: float = None, poll_frequency: float = 0.1):
+        """
+        Block until a readiness condition holds, recording the time spent waiting.
+        
+        Args:
+            step: Step name the wait is accounted to
+            condition: Callable taking the driver, as accepted by WebDriverWait
+            timeout: Upper bound in seconds (defaults to self.timeout)
+            poll_frequency: Seconds between condition checks
+            
+        Returns:
+            The condition's truthy return value
+            
+        Raises:
+            TimeoutException: If the condition does not hold within the timeout
+        """
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        try:
+            return WebDriverWait(self.driver, timeout, poll_frequency=poll_frequency).until(condition)
+        finally:
+            elapsed = time.monotonic() - start
+            self.wait_times[step] = self.wait_times.get(step, 0.0) + elapsed
+            self.logger.debug(f"Waited {elapsed:.2f}s in step '{step}'")
+
+    def _document_ready(self, driver) -> bool:
+        """Condition: the current document has loaded as far as the profile requires."""
+        state = driver.execute_script("return document.readyState")
+        if self.lean_profile:
+            # Eager page loads return at DOMContentLoaded; the forms are usable then
+            return state in ("interactive", "complete")
+        return state == "complete"
+
+    @staticmethod
+    def _cloudflare_cleared(driver) -> bool:
+        """Condition: no Cloudflare interstitial is being shown."""
+        if "cloudflare" in driver.title.lower() or "just a moment" in driver.title.lower():
+            return False
+        return not driver.find_elements(By.CSS_SELECTOR, "#cf-challenge-running, #cf-wrapper")
+
+    @staticmethod
+    def _recaptcha_solved(driver) -> bool:
+        """Condition: the reCAPTCHA response token has been filled in."""
+        return bool(driver.execute_script(
+            "var el = document.getElementById('g-recaptcha-response');"
+            "return el !== null && el.value.length > 0;"
+        ))
+
+    def get_wait_summary(self) -> str:
+        """Format the per-step wait times for logging."""
+        if not self.wait_times:
+            return "no waits recorded"
+        total = sum(self.wait_times.values())
+        parts = ", ".join(f"{step}={seconds:.2f}s" for step, seconds in self.wait_times.items())
+        return f"{parts} (total {total:.2f}s)"
+
     def _find_chrome_executable(self):
         """Finds the path to the Google Chrome executable."""
         possible_paths = [
             "C:/Program Files/Google/Chrome/Application/chrome.exe",
             "C:/Program Files (x86)/Google/Chrome/Application/chrome.exe",
-            os.path.expanduser("~\\AppData\\Local\\Google\\Chrome\\Application\\chrome.exe")
+            os.path.expanduser("~\\AppData\\Local\\Google\\Chrome\\Application\\chrome.exe"),
+            "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+            "/usr/bin/google-chrome",
+            "/usr/bin/google-chrome-stable",
+            "/usr/bin/chromium",
+            "/usr/bin/chromium-browser",
         ]
         for path in possible_paths:
             if os.path.exists(path):
@@ -57,11 +181,30 @@ class PasswordResetBot:
         self.logger.error("Could not find chrome.exe in standard locations.")
         return None
 
+    def _apply_lean_options(self, options):
+        """Add the lean browsing profile switches to Chrome options."""
+        width, height = self.LEAN_WINDOW_SIZE
+        options.page_load_strategy = 'eager'
+        options.add_argument('--disable-gpu')
+        options.add_argument(f'--window-size={width},{height}')
+        options.add_argument('--mute-audio')
+        options.add_argument('--disable-extensions')
+
+    def _block_heavy_requests(self):
+        """Block image, font and media requests for the lean profile."""
+        self.driver.execute_cdp_cmd('Network.enable', {})
+        self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.LEAN_BLOCKED_URLS})
+
+    @timed_step("_init_driver")
     def _init_driver(self):
         """Initializes the WebDriver."""
         self.logger.info("Initializing WebDriver...")
         try:
-            if self.use_uc:
+            if self.shared_browser:
+                self.logger.info("Using an isolated context in the shared browser.")
+                self.context = self.shared_browser.new_context()
+                self.driver = self.context.driver
+            elif self.use_uc:
                 self.logger.info("Using undetected-chromedriver.")
                 options = uc.ChromeOptions()
                 if self.headless:
@@ -69,6 +212,10 @@ class PasswordResetBot:
                 # Disable sandbox for compatibility
                 options.add_argument('--no-sandbox')
                 options.add_argument('--disable-dev-shm-usage')
+                # Tag the browser so the watchdog can find it if it is orphaned
+                options.add_argument(BrowserWatchdog.owner_argument(self.owner_tag))
+                if self.lean_profile:
+                    self._apply_lean_options(options)
                 
                 # Find Chrome binary location
                 chrome_executable_path = self._find_chrome_executable()
@@ -84,45 +231,61 @@ class PasswordResetBot:
                     options.add_argument('--headless')
                 options.add_argument('--no-sandbox')
                 options.add_argument('--disable-dev-shm-usage')
-                options.add_argument("start-maximized")
+                options.add_argument(BrowserWatchdog.owner_argument(self.owner_tag))
+                if self.lean_profile:
+                    self._apply_lean_options(options)
+                else:
+                    options.add_argument("start-maximized")
                 options.add_experimental_option("excludeSwitches", ["enable-automation"])
                 options.add_experimental_option('useAutomationExtension', False)
                 service = ChromeService(ChromeDriverManager().install())
                 self.driver = webdriver.Chrome(service=service, options=options)
 
             self.driver.set_page_load_timeout(60)
+            if self.lean_profile:
+                self._block_heavy_requests()
+                self.logger.info("Lean browsing profile enabled.")
             self.logger.info("WebDriver initialized successfully.")
         except WebDriverException as e:
             self.logger.error(f"Failed to initialize WebDriver: {e}", exc_info=True)
             raise
 
-    def open_website(self, url: str = "https://unlocktool.net/") -> bool:
+    @timed_step("open_website")
+    def open_website(self, url: str = None) -> bool:
         """
         Open the website.
         
         Args:
-            url: Website URL
+            url: Website URL (defaults to the site root)
             
         Returns:
             True if successful, False otherwise
         """
+        url = url or f"{self.base_url}/"
         try:
             self._init_driver()
             self.logger.info(f"Opening URL: {url}")
             self.driver.get(url)
-            time.sleep(2) # Wait for page to load
+            self._wait_until("open_website", self._document_ready)
+            return True
+        except TimeoutException:
+            self.logger.warning(f"Page did not report ready within {self.timeout}s, continuing")
             return True
         except WebDriverException as e:
             self.logger.error(f"Failed to open URL: {str(e)}")
             return False
 
+    @timed_step("wait_for_cloudflare")
     def wait_for_cloudflare(self, timeout=90):
         """
         Wait for Cloudflare challenge to pass.
         This typically resolves automatically in non-headless mode.
+        
+        Args:
+            timeout: Maximum seconds to wait for the challenge to clear
         """
         self.logger.info("Waiting for Cloudflare challenge to pass...")
-        start_time = time.time()
+        start_time = time.monotonic()
         try:
             self.logger.info("Checking for Cloudflare protection...")
             self.logger.info(f"   Current URL: {self.driver.current_url}")
@@ -134,39 +297,21 @@ class PasswordResetBot:
                 self.logger.info("Already on the login page. No Cloudflare challenge detected.")
                 return
 
-            try:
-                # More robust check for Cloudflare
-                self.logger.info("Explicitly checking for Cloudflare challenge elements...")
-                wait = WebDriverWait(self.driver, 10)
-                wait.until(
-                    EC.any_of(
-                        EC.title_contains("Cloudflare"),
-                        EC.presence_of_element_located((By.ID, "cf-challenge-running")),
-                        EC.presence_of_element_located((By.ID, "cf-wrapper"))
-                    )
-                )
-                
-                self.logger.info("Cloudflare challenge detected. Waiting for it to be solved...")
-                self.logger.info("   This can be automatic or may require manual intervention.")
-                self.logger.info("   Please wait patiently. This can take up to 90 seconds.")
+            # The interstitial is part of the initial document, so once the page
+            # reports ready a single check tells us whether a challenge is running.
+            if self._cloudflare_cleared(self.driver):
+                self.logger.info("No Cloudflare challenge detected. Proceeding.")
+                return
 
-                # Wait for the challenge to be solved and the title to change
-                WebDriverWait(self.driver, timeout).until(
-                    EC.not_(EC.title_contains("Cloudflare"))
-                )
-                self.logger.info("Cloudflare challenge passed.")
-                
-                # Additional wait for the homepage to fully load
-                self.logger.info("Waiting for homepage content to fully load...")
-                time.sleep(5)
-                
-            except TimeoutException:
-                # If the initial check for Cloudflare times out, we assume it's not there.
-                self.logger.info("No Cloudflare challenge detected within the initial 10 seconds. Proceeding.")
-            except Exception as e:
-                self.logger.error(f"An unexpected error occurred while waiting for Cloudflare: {e}", exc_info=True)
-                # For now, let's try to continue
-                pass
+            self.logger.info("Cloudflare challenge detected. Waiting for it to be solved...")
+            self.logger.info("   This can be automatic or may require manual intervention.")
+            self.logger.info(f"   Please wait patiently. This can take up to {timeout} seconds.")
+
+            self._wait_until("wait_for_cloudflare", self._cloudflare_cleared, timeout=timeout, poll_frequency=0.25)
+            self.logger.info("Cloudflare challenge passed.")
+
+            # The challenge redirects to the real homepage; wait for that document to load
+            self._wait_until("wait_for_cloudflare", self._document_ready)
 
         except TimeoutException:
             self.logger.warning("[WARN] Timeout waiting for Cloudflare challenge to resolve")
@@ -175,9 +320,8 @@ class PasswordResetBot:
         except Exception as e:
             self.logger.error(f"Error checking Cloudflare: {e}", exc_info=True)
         finally:
-            self.logger.info(f"Cloudflare check finished in {time.time() - start_time:.2f} seconds.")
+            self.logger.info(f"Cloudflare check finished in {time.monotonic() - start_time:.2f} seconds.")
             self.logger.info(f"Final URL after Cloudflare check: {self.driver.current_url}")
-            time.sleep(3) # Add a small delay to stabilize the page
 
     def handle_recaptcha(self, two_captcha_api_key: str = None) -> bool:
         """
@@ -193,61 +337,31 @@ class PasswordResetBot:
             True if reCAPTCHA is solved or not present, False otherwise
         """
         try:
-            # Check if reCAPTCHA is present - wait up to 10 seconds for it to load
+            # The widget container is server-rendered, so once the document is
+            # ready its presence can be checked without polling.
             self.logger.info("Checking for reCAPTCHA on the page...")
             try:
-                recaptcha_elements = WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_all_elements_located((By.CLASS_NAME, "g-recaptcha"))
-                )
+                self._wait_until("handle_recaptcha", self._document_ready)
             except TimeoutException:
-                self.logger.info("No reCAPTCHA detected on page")
-                return True
-            
+                self.logger.warning("Page did not report ready, checking for reCAPTCHA anyway")
+
+            recaptcha_elements = self.driver.find_elements(By.CLASS_NAME, "g-recaptcha")
             if not recaptcha_elements:
                 self.logger.info("No reCAPTCHA detected on page")
                 return True
             
             self.logger.warning("reCAPTCHA v2 detected - Manual intervention required")
             self.logger.info("Please solve the 'I'm not a robot' challenge now.")
-            self.logger.info("The script will automatically continue once solved (max 60 seconds)...")
             
-            # Wait for user to solve reCAPTCHA - check every second if it's solved
+            # Wait for user to solve reCAPTCHA by watching for the response token
             max_wait_time = 60
-            check_interval = 1
-            elapsed_time = 0
-            
-            while elapsed_time < max_wait_time:
-                time.sleep(check_interval)
-                elapsed_time += check_interval
-                
-                # Check if reCAPTCHA is solved by looking for the response token
-                try:
-                    is_solved = self.driver.execute_script(
-                        "return document.getElementById('g-recaptcha-response') && "
-                        "document.getElementById('g-recaptcha-response').value.length > 0;"
-                    )
-                    
-                    if is_solved:
-                        self.logger.info(f"reCAPTCHA solved successfully in {elapsed_time} seconds!")
-                        return True
-                except Exception as e:
-                    # If we can't check, just continue waiting
-                    pass
-            
-            # Timeout - check one last time
+            self.logger.info(f"The script will automatically continue once solved (max {max_wait_time} seconds)...")
             try:
-                is_solved = self.driver.execute_script(
-                    "return document.getElementById('g-recaptcha-response') && "
-                    "document.getElementById('g-recaptcha-response').value.length > 0;"
-                )
-                if is_solved:
-                    self.logger.info("reCAPTCHA solved successfully")
-                    return True
-                else:
-                    self.logger.warning(f"reCAPTCHA not solved within {max_wait_time} seconds")
-                    return False
-            except Exception:
-                self.logger.warning(f"Could not verify reCAPTCHA status after {max_wait_time} seconds")
+                self._wait_until("handle_recaptcha", self._recaptcha_solved, timeout=max_wait_time, poll_frequency=0.5)
+                self.logger.info("reCAPTCHA solved successfully!")
+                return True
+            except TimeoutException:
+                self.logger.warning(f"reCAPTCHA not solved within {max_wait_time} seconds")
                 return False
                 
         except NoSuchElementException:
@@ -257,18 +371,19 @@ class PasswordResetBot:
             self.logger.error(f"Error handling reCAPTCHA: {str(e)}")
             return False
 
+    @timed_step("login")
     def login(self):
         """Logs into the website."""
         self.logger.info("Navigating to the login page...")
-        self.driver.get("https://unlocktool.net/post-in/")
+        self.driver.get(f"{self.base_url}/post-in/")
         
         # Handle reCAPTCHA before attempting to fill form
         self.handle_recaptcha()
 
         self.logger.info(f"Attempting to log in as user: {self.username}")
         try:
-            username_field = WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.NAME, 'username'))
+            username_field = self._wait_until(
+                "login", EC.presence_of_element_located((By.NAME, 'username')), timeout=20
             )
             self.logger.info("Found username field.")
             username_field.send_keys(self.username)
@@ -283,8 +398,8 @@ class PasswordResetBot:
             login_button.click()
 
             # Wait for login success by looking for a logout link
-            WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.XPATH, "//a[contains(@href, 'logout')]"))
+            self._wait_until(
+                "login", EC.presence_of_element_located((By.XPATH, "//a[contains(@href, 'logout')]")), timeout=20
             )
 
             self.logger.info("Login successful (logout link found).")
@@ -308,6 +423,7 @@ class PasswordResetBot:
             self.take_screenshot("login_error.png")
             raise Exception("Login failed: Could not verify successful login")
 
+    @timed_step("reset_password")
     def reset_password(self) -> bool:
         """
         Reset the password to a new value.
@@ -321,13 +437,15 @@ class PasswordResetBot:
         self.logger.info("Attempting to reset password...")
         try:
             # 1. Navigate to the change password page
-            change_password_url = "https://unlocktool.net/password-change/"
+            change_password_url = f"{self.base_url}/password-change/"
             self.logger.info(f"Navigating to {change_password_url}")
             self.driver.get(change_password_url)
 
             # Wait for the form to be present by locating a unique element within it
-            form = WebDriverWait(self.driver, 20).until(
-                EC.presence_of_element_located((By.XPATH, "//form[.//button[contains(text(), 'Change password')]]"))
+            form = self._wait_until(
+                "reset_password",
+                EC.presence_of_element_located((By.XPATH, "//form[.//button[contains(text(), 'Change password')]]")),
+                timeout=20
             )
             self.logger.info("Password change form loaded.")
 
@@ -351,13 +469,15 @@ class PasswordResetBot:
             self.logger.info("Waiting for confirmation...")
             try:
                 # Wait for either a success message or redirect
-                WebDriverWait(self.driver, 20).until(
+                self._wait_until(
+                    "reset_password",
                     EC.any_of(
                         EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'Password change successful')]")),
                         EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'password has been changed')]")),
                         EC.presence_of_element_located((By.XPATH, "//*[contains(text(), 'successfully')]")),
                         EC.url_contains("/post-in/")
-                    )
+                    ),
+                    timeout=20
                 )
                 
                 self.logger.info("Password reset successful!")
@@ -379,11 +499,50 @@ class PasswordResetBot:
             self.take_screenshot("password_reset_error.png")
             return False
 
+    def get_process_ids(self) -> List[int]:
+        """
+        Get the process IDs of the chromedriver and browser owned by this bot.
+        
+        Returns:
+            List of root process IDs (empty before the driver is started)
+        """
+        pids = []
+        if not self.driver:
+            return pids
+
+        # In a shared browser only the context's own chromedriver is ours
+        if self.context:
+            return self.context.get_process_ids()
+
+        service = getattr(self.driver, 'service', None)
+        process = getattr(service, 'process', None)
+        if process:
+            pids.append(process.pid)
+
+        # undetected-chromedriver launches the browser itself
+        browser_pid = getattr(self.driver, 'browser_pid', None)
+        if browser_pid:
+            pids.append(browser_pid)
+
+        return pids
+
+    @timed_step("close")
     def close(self):
         """Close the browser."""
-        if self.driver:
-            self.driver.quit()
+        if self.context:
+            self.context.close()
+            self.context = None
+            self.driver = None
+            self.logger.info("Browser context closed")
+            self.logger.info(f"Time spent waiting for page readiness: {self.get_wait_summary()}")
+        elif self.driver:
+            try:
+                self.driver.quit()
+            except (WebDriverException, OSError) as e:
+                # The watchdog may already have killed the browser
+                self.logger.warning(f"Browser did not quit cleanly: {e}")
             self.logger.info("Browser closed")
+            self.logger.info(f"Time spent waiting for page readiness: {self.get_wait_summary()}")
 
     def take_screenshot(self, filename: str = "screenshot.png"):
         """
@@ -0,0 +1,301 @@
+"""Retention, archival and compaction for the history tables.
+
+RETENTION_POLICIES names, per table, the expression that ages a row, the
+default retention in days and an optional filter (only closed rentals are
+archived). SQLiteArchiver moves expired rows in small id-ordered batches -
+one short write transaction per batch - either into an attached archive
+database or into gzip-compressed NDJSON files, then hands the freed pages
+back to the filesystem with PRAGMA incremental_vacuum, a few pages at a time.
+
+SupabaseArchiver calls the archive_old_rows() function from
+supabase_schema.sql, which moves rows into the archive schema in batches;
+PostgreSQL's autovacuum takes care of compaction there.
+"""
+
+import gzip
+import json
+import logging
+import os
+import re
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Optional
+
+from src import db_instrumentation
+from src.api_manager import APIManager, USAGE_RETENTION_DAYS
+
+
+RETENTION_POLICIES = {
+    'password_history': {'age': 'reset_date', 'days': 365},
+    'error_logs': {'age': 'timestamp', 'days': 90},
+    'api_usage': {'age': 'timestamp', 'days': USAGE_RETENTION_DAYS},
+    'rentals': {'age': 'COALESCE(returned_at, expires_at)', 'days': 180, 'where': "status != 'active'"},
+    'reset_timings': {'age': 'recorded_at', 'days': 90},
+}
+
+# Tables with an archive_old_rows() policy in supabase_schema.sql
+SUPABASE_TABLES = {'password_history': 'password_history', 'api_usage': 'api_usage_logs', 'rentals': 'rentals'}
+
+_CREATE_TABLE = re.compile(r'^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?["`]?(\w+)["`]?', re.I)
+
+
+def resolve_days(overrides: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Retention days per table: the defaults with overrides applied (0 or None = keep forever)."""
+    days = {table: policy['days'] for table, policy in RETENTION_POLICIES.items()}
+    for table, value in (overrides or {}).items():
+        if table not in RETENTION_POLICIES:
+            raise ValueError(f"No retention policy for table '{table}'")
+        days[table] = value
+    return days
+
+
+class SQLiteArchiver:
+    """Moves expired rows out of the SQLite database in batches and compacts it."""
+
+    def __init__(self, db_path: str = "database/rental_system.db", archive_db: str = None,
+                 archive_dir: str = None, batch_size: int = 5000, pause: float = 0.05):
+        """
+        Args:
+            db_path: Path to the SQLite database
+            archive_db: Archive database file (attached; rows keep their ids)
+            archive_dir: Directory for <table>-<timestamp>-<pid>.ndjson.gz files
+                (used when archive_db is not given)
+            batch_size: Rows moved per write transaction
+            pause: Seconds to sleep between batches so other writers get the lock
+        """
+        if not archive_db and not archive_dir:
+            raise ValueError("Either archive_db or archive_dir is required")
+        self.db_path = db_path
+        self.archive_db = archive_db
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+        self.pause = pause
+        self.logger = logging.getLogger(__name__)
+
+    def _connect(self):
+        conn = db_instrumentation.connect(self.db_path, timeout=30.0)
+        if self.archive_db:
+            os.makedirs(os.path.dirname(self.archive_db) or '.', exist_ok=True)
+            conn.execute("ATTACH DATABASE ? AS archive", (self.archive_db,))
+        return conn
+
+    @staticmethod
+    def _condition(table: str) -> str:
+        policy = RETENTION_POLICIES[table]
+        condition = f"{policy['age']} < datetime('now', ?)"
+        if policy.get('where'):
+            condition += f" AND {policy['where']}"
+        return condition
+
+    def count_expired(self, table: str, days: int) -> int:
+        """Rows of table older than days (what archive_table would move)."""
+        conn = db_instrumentation.connect(self.db_path, timeout=30.0)
+        try:
+            return conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {self._condition(table)}",
+                                (f"-{int(days)} days",)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _ensure_archive_table(self, conn, table: str):
+        """Create archive.<table> with the same columns and primary key as main.<table>."""
+        row = conn.execute("SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?",
+                           (table,)).fetchone()
+        sql = _CREATE_TABLE.sub(f"CREATE TABLE IF NOT EXISTS archive.{table}", row[0], count=1)
+        conn.execute(sql)
+
+    def archive_table(self, table: str, days: int) -> int:
+        """
+        Move rows of table older than days to the archive.
+
+        Each batch selects the oldest expired ids, copies those rows and
+        deletes them inside one BEGIN IMMEDIATE transaction. Archive inserts
+        are INSERT OR IGNORE on the original id, so a batch interrupted
+        between the archive write and the delete is simply repeated.
+
+        Args:
+            table: Table with a retention policy
+            days: Retention in days
+
+        Returns:
+            Number of rows moved
+        """
+        if table == 'api_usage':
+            # Usage rows have to be counted in the rollups before they go
+            APIManager(self.db_path).backfill_usage_rollups()
+
+        condition = self._condition(table)
+        age_param = f"-{int(days)} days"
+        moved = 0
+        archive_file = raw_file = None
+
+        conn = self._connect()
+        try:
+            if self.archive_db:
+                self._ensure_archive_table(conn, table)
+            else:
+                os.makedirs(self.archive_dir, exist_ok=True)
+
+            while True:
+                conn.execute("BEGIN IMMEDIATE")
+                first_id, last_id, count = conn.execute(f"""
+                    SELECT MIN(id), MAX(id), COUNT(*) FROM (
+                        SELECT id FROM {table} WHERE {condition} ORDER BY id LIMIT ?
+                    )
+                """, (age_param, self.batch_size)).fetchone()
+                if not count:
+                    conn.commit()
+                    break
+
+                # The batch is exactly the expired rows with ids in [first_id, last_id]
+                batch = f"id BETWEEN ? AND ? AND {condition}"
+                params = (first_id, last_id, age_param)
+
+                if self.archive_db:
+                    conn.execute(f"INSERT OR IGNORE INTO archive.{table} SELECT * FROM main.{table} WHERE {batch}",
+                                 params)
+                else:
+                    if archive_file is None:
+                        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+                        raw_file = open(os.path.join(self.archive_dir, f"{table}-{stamp}-{os.getpid()}.ndjson.gz"), 'ab')
+                        archive_file = gzip.GzipFile(fileobj=raw_file, mode='ab')
+                    cursor = conn.execute(f"SELECT * FROM main.{table} WHERE {batch}", params)
+                    columns = [c[0] for c in cursor.description]
+                    for values in cursor.fetchall():
+                        archive_file.write((json.dumps(dict(zip(columns, values))) + "\n").encode())
+                    # Rows must be on disk before they are deleted
+                    archive_file.flush(zlib.Z_SYNC_FLUSH)
+                    raw_file.flush()
+                    os.fsync(raw_file.fileno())
+
+                conn.execute(f"DELETE FROM main.{table} WHERE {batch}", params)
+                conn.commit()
+                moved += count
+
+                if count < self.batch_size:
+                    break
+                time.sleep(self.pause)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+            if archive_file is not None:
+                archive_file.close()
+                raw_file.close()
+
+        if moved:
+            self.logger.info(f"Archived {moved} {table} rows older than {days} days")
+        return moved
+
+    # ===================== COMPACTION =====================
+
+    def enable_incremental_vacuum(self):
+        """
+        Switch the database to auto_vacuum=INCREMENTAL.
+
+        Needs one full VACUUM, which rewrites the whole file and holds the
+        write lock meanwhile - run it in a maintenance window. New databases
+        created by PasswordResetDB already use incremental auto-vacuum.
+        """
+        conn = db_instrumentation.connect(self.db_path, timeout=30.0)
+        try:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+
+    def incremental_vacuum(self, pages_per_step: int = 1000) -> int:
+        """
+        Release free pages to the filesystem in small steps.
+
+        Args:
+            pages_per_step: Pages freed per write transaction
+
+        Returns:
+            Pages released (0 if the database is not in incremental mode)
+        """
+        conn = db_instrumentation.connect(self.db_path, timeout=30.0)
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                self.logger.warning(
+                    f"{self.db_path} does not use auto_vacuum=INCREMENTAL; freed pages are reused but "
+                    f"the file does not shrink (see enable_incremental_vacuum)"
+                )
+                return 0
+
+            start = free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            while free:
+                # The pragma frees one page per step; executescript runs it to completion
+                conn.executescript(f"PRAGMA incremental_vacuum({min(free, pages_per_step)});")
+                remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if remaining >= free:
+                    break
+                free = remaining
+                time.sleep(self.pause)
+            return start - free
+        finally:
+            conn.close()
+
+    def run(self, days: Dict[str, int] = None, vacuum: bool = True) -> Dict[str, int]:
+        """
+        Apply every retention policy, then compact.
+
+        Args:
+            days: Retention days per table (see resolve_days)
+            vacuum: Run the incremental vacuum afterwards
+
+        Returns:
+            Rows moved per table, plus 'vacuum_pages'
+        """
+        days = days or resolve_days()
+        conn = db_instrumentation.connect(self.db_path, timeout=30.0)
+        try:
+            existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        finally:
+            conn.close()
+
+        results = {}
+        for table, table_days in days.items():
+            if table_days and table in existing:
+                results[table] = self.archive_table(table, table_days)
+        if vacuum:
+            results['vacuum_pages'] = self.incremental_vacuum()
+        return results
+
+
+class SupabaseArchiver:
+    """Runs archive_old_rows() in Supabase until each table is within its retention."""
+
+    def __init__(self, client, batch_size: int = 5000):
+        """
+        Args:
+            client: Supabase client (e.g. SupabaseDB().client)
+            batch_size: Rows moved per function call (each call is one transaction)
+        """
+        self.client = client
+        self.batch_size = batch_size
+        self.logger = logging.getLogger(__name__)
+
+    def archive_table(self, table: str, days: int) -> int:
+        """Move rows of table older than days into the archive schema; returns rows moved."""
+        target = SUPABASE_TABLES[table]
+        moved = 0
+        while True:
+            count = self.client.rpc('archive_old_rows', {
+                'p_table': target, 'p_days': int(days), 'p_batch': self.batch_size
+            }).execute().data or 0
+            moved += count
+            if count < self.batch_size:
+                break
+        if moved:
+            self.logger.info(f"Archived {moved} {target} rows older than {days} days")
+        return moved
+
+    def run(self, days: Dict[str, int] = None) -> Dict[str, int]:
+        days = days or resolve_days()
+        return {
+            table: self.archive_table(table, table_days)
+            for table, table_days in days.items()
+            if table_days and table in SUPABASE_TABLES
+        }
@@ -2,6 +2,9 @@
 
 import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -9,33 +12,53 @@ from dotenv import load_dotenv
 import json
 from typing import List, Dict, Optional
 
+from src.browser_contexts import SharedBrowser
+from src.browser_watchdog import BrowserWatchdog
 from src.password_reset_bot import PasswordResetBot
 from src.database import PasswordResetDB
 from src.email_notifier import EmailNotifier
+from src.logger import bind_log_context, log_context
+from src import metrics
+from src.retention import SQLiteArchiver, resolve_days
+from src import wal_checkpoint
+from src import write_actor
 from src.supabase_db import SupabaseDB
 
 
 class ResetScheduler:
     """Manages scheduled password reset jobs."""
 
-    def __init__(self, config_path: str = "config/accounts.json"):
+    def __init__(self, config_path: str = "config/accounts.json",
+                 db_path: str = "database/rental_system.db"):
         """
         Initialize the scheduler.
         
         Args:
             config_path: Path to accounts configuration file
+            db_path: Path to the local SQLite database
         """
         load_dotenv()
         self.logger = logging.getLogger(__name__)
         self.config_path = config_path
-        self.db = PasswordResetDB()  # Local SQLite backup
+        # Reset workers share one writer thread when SQLITE_WRITE_ACTOR is on
+        self.sqlite_writer = write_actor.from_env(db_path)
+        self.db = PasswordResetDB(  # Local SQLite backup
+            db_path, write_actor=self.sqlite_writer,
+            cache_websites=os.getenv('WEBSITE_CACHE', '1').lower() in ('1', 'true', 'yes', 'on')
+        )
         self.emailer = EmailNotifier()
         self.scheduler = BackgroundScheduler()
-        
-        # Initialize Supabase for cloud sync
-        self.cloud_db = self._init_supabase()
+        self.watchdog = BrowserWatchdog()
+        self.shared_browser = None  # Started on demand by the 'contexts' engine
+        self._browser_lock = threading.Lock()
+        # The API server exports the WAL metrics of the shared database
+        self.checkpoint_manager = wal_checkpoint.from_env(db_path, record_metrics=False)
+        self._config_lock = threading.Lock()
         
         self._load_config()
+        
+        # Initialize Supabase for cloud sync
+        self.cloud_db = self._init_supabase() if self.settings.get('cloud_sync', True) else None
 
     def _init_supabase(self):
         """Initialize Supabase connection for cloud sync."""
@@ -193,10 +216,38 @@ class ResetScheduler:
 
     def _save_config(self):
         """Save accounts and settings to config file."""
-        with open(self.config_path, 'w') as f:
-            json.dump(self.config, f, indent=2)
+        with self._config_lock:
+            with open(self.config_path, 'w') as f:
+                json.dump(self.config, f, indent=2)
         self.logger.info("Configuration file updated successfully")
 
+    def _get_shared_browser(self) -> SharedBrowser:
+        """Get the shared browser for the 'contexts' engine, (re)starting it if needed."""
+        with self._browser_lock:
+            if self.shared_browser and not self.shared_browser.is_running():
+                self.logger.warning("Shared browser is gone, restarting it")
+                self.watchdog.unprotect(self.shared_browser.get_process_ids())
+                self.shared_browser = None
+
+            if not self.shared_browser:
+                browser = SharedBrowser(
+                    headless=self.settings.get('headless', False),
+                    lean_profile=self.settings.get('lean_browser', False)
+                )
+                browser.start()
+                self.watchdog.protect(browser.get_process_ids())
+                self.shared_browser = browser
+
+            return self.shared_browser
+
+    def _close_shared_browser(self):
+        """Shut down the shared browser if one is running."""
+        with self._browser_lock:
+            if self.shared_browser:
+                self.watchdog.unprotect(self.shared_browser.get_process_ids())
+                self.shared_browser.close()
+                self.shared_browser = None
+
     def reset_single_account(self, account: dict) -> bool:
         """
         Reset password for a single account.
@@ -207,6 +258,11 @@ class ResetScheduler:
         Returns:
             True if successful, False otherwise
         """
+        with log_context(account=account.get('username')):
+            return self._reset_single_account(account)
+
+    def _reset_single_account(self, account: dict) -> bool:
+        """Reset one account; see reset_single_account."""
         try:
             self.logger.info(f"Starting password reset for {account['username']}")
             
@@ -223,16 +279,29 @@ class ResetScheduler:
                 password=account['current_password'],
                 email=account.get('email')
             )
+            bind_log_context(account_id=account_id)
+            
+            # Initialize bot; the 'contexts' engine runs it inside the shared browser
+            shared_browser = None
+            if self.settings.get('reset_engine', 'browser') == 'contexts':
+                shared_browser = self._get_shared_browser()
             
-            # Initialize bot
             bot = PasswordResetBot(
                 username=account['username'],
                 password=account['current_password'],
-                headless=self.settings.get('headless', False)
+                headless=self.settings.get('headless', False),
+                lean_profile=self.settings.get('lean_browser', False),
+                shared_browser=shared_browser,
+                base_url=self.settings.get('site_url', 'https://unlocktool.net')
             )
             
-            # Perform reset
+            # Perform reset under a hard deadline enforced by the watchdog
             success = False
+            deadline = self.settings.get('reset_deadline_seconds', 300)
+            guard = self.watchdog.start_deadline(bot, deadline, label=account['username'])
+            engine = 'contexts' if shared_browser else 'browser'
+            metrics.ACTIVE_BROWSERS.inc(engine=engine)
+            started = time.monotonic()
             
             try:
                 # Open website
@@ -283,11 +352,20 @@ class ResetScheduler:
                 
             except Exception as e:
                 error_msg = str(e)
+                if guard.expired:
+                    # Failures after a kill are side effects of the dead browser
+                    error_msg = f"Hard deadline of {deadline}s exceeded ({error_msg})"
                 self.db.log_reset(account_id, 'failed', error_msg)
-                self.db.log_error(account_id, 'PasswordResetError', error_msg)
+                self.db.log_error(
+                    account_id,
+                    'ResetDeadlineExceeded' if guard.expired else 'PasswordResetError',
+                    error_msg
+                )
                 
                 # Check if it's a wrong password error
-                if 'correct username and password' in error_msg.lower() or \
+                if guard.expired:
+                    self.logger.error(f"✗ Password reset aborted for {account['username']}: {error_msg}")
+                elif 'correct username and password' in error_msg.lower() or \
                    'invalid credentials' in error_msg.lower() or \
                    'login failed' in error_msg.lower():
                     self.logger.error(f"⚠ WRONG PASSWORD detected for {account['username']}!")
@@ -307,12 +385,18 @@ class ResetScheduler:
                     self.logger.error(f"✗ Password reset failed for {account['username']}: {error_msg}")
                 
             finally:
+                guard.cancel()
                 bot.close()
+                metrics.ACTIVE_BROWSERS.dec(engine=engine)
+                metrics.RESET_DURATION.observe(time.monotonic() - started,
+                                               website=website['name'], success=success)
+                self._record_timings(account_id, website['name'], bot, success)
+                self._export_metrics()
             
-            # Send notification email
-            if self.settings.get('email_notifications'):
+            # Queue the notification email; in digest mode the batch report covers it
+            if self.settings.get('email_notifications') and not self.settings.get('email_digest'):
                 stats = self.db.get_account_stats(account_id)
-                self.emailer.send_reset_notification(
+                self.emailer.queue_reset_notification(
                     account['username'],
                     success,
                     stats
@@ -324,6 +408,28 @@ class ResetScheduler:
             self.logger.error(f"Unexpected error in reset_single_account: {str(e)}")
             return False
 
+    def _record_timings(self, account_id: int, website: str, bot: PasswordResetBot, success: bool):
+        """Persist step and wait timings of a finished reset attempt."""
+        timings = dict(bot.step_timings)
+        timings.update({f"wait:{step}": seconds for step, seconds in bot.wait_times.items()})
+        try:
+            self.db.log_reset_timings(account_id, website, timings, success)
+        except Exception as e:
+            self.logger.warning(f"Could not record reset timings: {e}")
+
+        steps = ", ".join(f"{step}={seconds:.2f}s" for step, seconds in bot.step_timings.items())
+        self.logger.info(f"Step timings for {bot.username}: {steps}")
+
+    def _export_metrics(self):
+        """Write scheduler metrics to the textfile served by the API's /metrics."""
+        path = self.settings.get('metrics_textfile', os.path.join('logs', 'metrics', 'scheduler.prom'))
+        if not path:
+            return
+        try:
+            metrics.SCHEDULER_REGISTRY.write_textfile(path)
+        except OSError as e:
+            self.logger.debug(f"Could not write metrics textfile: {e}")
+
     def reset_all_accounts(self):
         """Reset passwords for all enabled accounts, prioritized by rental expiry."""
         # Display rental status dashboard first
@@ -346,24 +452,82 @@ class ResetScheduler:
             'total': 0,
             'successful': 0,
             'failed': 0,
-            'timestamp': datetime.now().isoformat()
+            'timestamp': datetime.now().isoformat(),
+            'accounts': []
         }
         
-        # Reset accounts in priority order
-        for item in prioritized_accounts:
-            account = item['account']
+        metrics.RESET_QUEUE_LENGTH.set(len(prioritized_accounts))
+        
+        def record(account, success):
+            metrics.RESET_QUEUE_LENGTH.dec()
             results['total'] += 1
-            
-            self.logger.info(f"Priority: {item['reason']}")
-            if self.reset_single_account(account):
-                results['successful'] += 1
-            else:
-                results['failed'] += 1
+            results['successful' if success else 'failed'] += 1
+            results['accounts'].append({
+                'username': account['username'],
+                'website': account.get('website'),
+                'success': success
+            })
+        
+        # Reset accounts in priority order
+        concurrency = max(1, int(self.settings.get('reset_concurrency', 1)))
+        if concurrency == 1:
+            for item in prioritized_accounts:
+                account = item['account']
+                
+                self.logger.info(f"Priority: {item['reason']}")
+                record(account, self.reset_single_account(account))
+        else:
+            # Work is submitted in priority order, so urgent accounts start first
+            self.logger.info(f"Running up to {concurrency} resets concurrently")
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='reset') as executor:
+                futures = {
+                    executor.submit(self.reset_single_account, item['account']): item['account']
+                    for item in prioritized_accounts
+                }
+                for future in as_completed(futures):
+                    record(futures[future], future.result())
+        
+        self._close_shared_browser()
         
         self.logger.info("=" * 60)
         self.logger.info(f"Batch reset completed: {results['successful']}/{results['total']} successful")
         self.logger.info("=" * 60)
         
+        if self.settings.get('email_notifications') and self.settings.get('email_digest') and results['total']:
+            self.emailer.queue_batch_report(results)
+        
+        # Clean up any browsers that survived the batch
+        self.reap_browsers()
+        
+        return results
+
+    def reap_browsers(self):
+        """Kill orphaned Chrome processes and log the watchdog counters."""
+        try:
+            self.watchdog.reap_orphans()
+        except Exception as e:
+            self.logger.warning(f"Browser reaper failed: {e}")
+        
+        counters = self.watchdog.get_metrics()
+        self.logger.info(
+            f"Watchdog: {counters['deadline_kills']} deadline kill(s), "
+            f"{counters['processes_killed'] + counters['reaped_processes']} process(es) killed, "
+            f"{counters['reclaimed_rss_bytes'] / 1024 / 1024:.1f} MB reclaimed"
+        )
+
+    def run_retention(self) -> dict:
+        """Archive history rows past their retention and compact the local database."""
+        try:
+            archiver = SQLiteArchiver(
+                self.db.db_path,
+                archive_db=self.settings.get('retention_archive_db', os.path.join('database', 'archive.db'))
+            )
+            results = archiver.run(resolve_days(self.settings.get('retention_days')))
+        except Exception as e:
+            self.logger.error(f"Retention run failed: {e}")
+            return {}
+        
+        self.logger.info("Retention: " + ", ".join(f"{name} {count}" for name, count in results.items()))
         return results
 
     def schedule_job(self, hour: int = 2, minute: int = 0, day_of_week: str = "0"):
@@ -387,6 +551,26 @@ class ResetScheduler:
             replace_existing=True
         )
         
+        # Periodically clean up browsers orphaned by crashed resets
+        self.scheduler.add_job(
+            self.reap_browsers,
+            'interval',
+            minutes=self.settings.get('reaper_interval_minutes', 10),
+            id='browser_reaper_job',
+            name='Orphaned Browser Reaper',
+            replace_existing=True
+        )
+        
+        # Archive old history rows once a day (settings: retention_days per table)
+        if self.settings.get('retention_enabled'):
+            self.scheduler.add_job(
+                self.run_retention,
+                CronTrigger(hour=self.settings.get('retention_hour', 4), minute=30),
+                id='retention_job',
+                name='History Retention',
+                replace_existing=True
+            )
+        
         self.logger.info(
             f"Job scheduled for {day_of_week} at {hour:02d}:{minute:02d}"
         )
@@ -396,12 +580,21 @@ class ResetScheduler:
         if not self.scheduler.running:
             self.scheduler.start()
             self.logger.info("Scheduler started")
+        if self.checkpoint_manager is not None:
+            self.checkpoint_manager.start()
 
     def stop(self):
         """Stop the scheduler."""
         if self.scheduler.running:
             self.scheduler.shutdown()
             self.logger.info("Scheduler stopped")
+        if self.checkpoint_manager is not None:
+            self.checkpoint_manager.stop()
+        if self.sqlite_writer is not None:
+            self.sqlite_writer.close()
+        self._close_shared_browser()
+        # Deliver notifications still waiting in the email queue
+        self.emailer.shutdown()
 
     def get_next_run_time(self):
         """Get the next scheduled run time."""
@@ -9,17 +9,27 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 from supabase import create_client, Client
 
+from src import db_instrumentation
+
 
 class SupabaseDB:
     """Supabase cloud database for tool rental management."""
     
-    def __init__(self, config_path: str = "config/supabase_config.json"):
+    def __init__(self, config_path: str = "config/supabase_config.json", client=None):
         """
         Initialize Supabase connection.
         
         Args:
             config_path: Path to Supabase configuration file
+            client: Pre-built client to use instead (e.g. a FakeSupabaseClient);
+                the configuration file is not read
         """
+        if client is not None:
+            self.url = getattr(client, 'url', None)
+            self.key = None
+            self.client = db_instrumentation.instrument_supabase(client)
+            return
+        
         # Load configuration
         with open(config_path, 'r') as f:
             config = json.load(f)
@@ -28,7 +38,8 @@ class SupabaseDB:
         self.key = config['service_key']  # Use service_role key for full access
         
         # Create Supabase client
-        self.client: Client = create_client(self.url, self.key)
+        # (wrapped for statement timing when DB_INSTRUMENTATION is on)
+        self.client: Client = db_instrumentation.instrument_supabase(create_client(self.url, self.key))
         
         print(f"✓ Connected to Supabase: {self.url}")
     
@@ -79,6 +90,73 @@ class SupabaseDB:
             result = self.client.table('accounts').select('id').eq('username', username).eq('website_id', website['id']).execute()
             return result.data[0]['id'] if result.data else None
     
+    def bulk_add_accounts(self, accounts: List[Dict], chunk_size: int = 500,
+                          update_existing: bool = False) -> List[Dict]:
+        """
+        Add many accounts with one batched upsert per chunk.
+        
+        Same arguments and per-account results as PasswordResetDB.bulk_add_accounts.
+        Round trips: one for the websites, then per chunk one lookup per
+        website in it plus the upsert.
+        """
+        website_ids = {w['name']: w['id'] for w in self.client.table('websites').select('id, name').execute().data}
+        
+        results = []
+        seen = set()  # (website_id, username) written by earlier chunks
+        for offset in range(0, len(accounts), chunk_size):
+            chunk = accounts[offset:offset + chunk_size]
+            chunk_results = [{'website': account['website'], 'username': account['username'], 'status': 'error',
+                              'account_id': None, 'error': None} for account in chunk]
+            results.extend(chunk_results)
+            keyed = {}  # (website_id, username) -> (result, account) of its first occurrence
+            for result, account in zip(chunk_results, chunk):
+                website_id = website_ids.get(account['website'])
+                key = (website_id, account['username'])
+                if website_id is None:
+                    result['error'] = f"Website '{account['website']}' not found"
+                elif key in keyed or key in seen:
+                    result['status'] = 'duplicate'
+                    result['error'] = "Same website and username as an earlier account in this import"
+                else:
+                    keyed[key] = (result, account)
+            seen.update(keyed)
+            if not keyed:
+                continue
+            
+            usernames = {}
+            for website_id, username in keyed:
+                usernames.setdefault(website_id, []).append(username)
+            existing = {}
+            for website_id, names in usernames.items():
+                rows = self.client.table('accounts').select('id, username, email').eq(
+                    'website_id', website_id).in_('username', names).execute().data
+                existing.update(((website_id, row['username']), row) for row in rows)
+            
+            rows = [{
+                'website_id': website_id,
+                'username': username,
+                'current_password': account['password'],
+                # Keep the stored email when the import has none
+                'email': account.get('email') or existing.get((website_id, username), {}).get('email'),
+            } for (website_id, username), (_, account) in keyed.items()
+                if update_existing or (website_id, username) not in existing]
+            ids = {key: row['id'] for key, row in existing.items()}
+            if rows:
+                written = self.client.table('accounts').upsert(
+                    rows, on_conflict='website_id,username', ignore_duplicates=not update_existing
+                ).execute().data or []
+                ids.update(((row['website_id'], row['username']), row['id']) for row in written)
+            
+            for key, (result, _) in keyed.items():
+                result['account_id'] = ids.get(key)
+                if key in existing:
+                    result['status'] = 'updated' if update_existing else 'exists'
+                else:
+                    # Missing from the upsert response: added by someone else since the lookup
+                    result['status'] = 'created' if key in ids else 'exists'
+        
+        return results
+    
     def update_password(self, account_id: int, old_password: str, new_password: str, status: str = 'success'):
         """Update account password and log to history."""
         # Update current password
@@ -165,6 +243,22 @@ class SupabaseDB:
             'status': 'completed'
         }).eq('account_id', account_id).eq('status', 'active').execute()
     
+    def get_overdue_rentals_summary(self) -> Dict:
+        """Active rentals past expires_at; same shape as PasswordResetDB.get_overdue_rentals_summary."""
+        # Computed in the database against the same CURRENT_TIMESTAMP cutoff as
+        # auto_expire_rentals(), over all rows rather than one response page
+        rows = self.client.rpc('overdue_rentals_summary', {}).execute().data or []
+        
+        return {
+            'overdue': sum(row['overdue'] for row in rows),
+            'oldest_expires_at': min((row['oldest_expires_at'] for row in rows), default=None),
+            'by_website': {row['website']: row['overdue'] for row in rows},
+        }
+    
+    def expire_overdue_rentals(self) -> int:
+        """Expire every active rental past expires_at with auto_expire_rentals(); returns rentals expired."""
+        return self.client.rpc('auto_expire_rentals', {}).execute().data or 0
+    
     # ===================== EXCEPTION HANDLING =====================
     
     def mark_account_exception(self, account_id: int, reason: str):
@@ -0,0 +1,472 @@
+"""Synthetic datasets for load testing.
+
+SyntheticDataGenerator produces rows for every table (websites, accounts,
+rentals, password_history, api_keys, api_usage, error_logs) with skewed,
+production-like distributions:
+
+- popular tools get most accounts and traffic (Zipf-like weights)
+- ~70% of accounts available, ~25% rented, ~5% in exception
+- rental start times follow a daily cycle; past rentals end as completed
+  (returned early) or expired
+- API usage is dominated by a few keys and mostly rent/check calls
+
+Loaders write those rows in bulk: SQLiteLoader with executemany inside one
+transaction per table, SupabaseLoader with batched multi-row inserts.
+"""
+
+import hashlib
+import itertools
+import logging
+import operator
+import random
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.api_manager import APIManager
+from src.database import PasswordResetDB
+
+
+TOOL_NAMES = [
+    'unlocktool', 'androidmultitool', 'chimeratool', 'unlockunit', 'tfmtool', 'drfonetool',
+    'griffinunlocker', 'hydratool', 'evdtool', 'pandoratool', 'miracletool', 'easyjtag'
+]
+VALIDITY_HOURS = [2, 4, 6, 6, 12, 24, 48]
+EXCEPTION_REASONS = ['Wrong password', 'Account locked', 'Cloudflare blocked', 'Suspended by provider']
+ERROR_TYPES = ['LoginFailed', 'Timeout', 'CloudflareBlocked', 'WrongPassword', 'WebDriverException']
+USER_AGENTS = ['python-requests/2.31.0', 'curl/8.4.0', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
+               'okhttp/4.12.0', 'PostmanRuntime/7.36.0']
+
+# Relative traffic per hour of day (busiest in the evening)
+HOURLY_WEIGHTS = [2, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 8, 9, 9, 9, 10, 10, 11, 12, 13, 13, 11, 7, 4]
+
+# Preset dataset sizes
+PRESETS = {
+    'small': {'websites': 3, 'accounts': 1_000, 'rentals': 10_000, 'password_history': 5_000,
+              'api_keys': 5, 'api_usage': 20_000, 'error_logs': 1_000},
+    'medium': {'websites': 6, 'accounts': 50_000, 'rentals': 500_000, 'password_history': 100_000,
+               'api_keys': 20, 'api_usage': 500_000, 'error_logs': 20_000},
+    'production': {'websites': 10, 'accounts': 300_000, 'rentals': 3_000_000, 'password_history': 600_000,
+                   'api_keys': 60, 'api_usage': 2_000_000, 'error_logs': 100_000},
+}
+
+_SECONDS = [f"{second:02d}" for second in range(60)]
+
+
+def _zipf_weights(count: int, exponent: float = 1.1) -> List[float]:
+    return [1.0 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class SyntheticDataGenerator:
+    """Produces row dictionaries with realistic distributions.
+
+    Times are handled as integer seconds since the start of the history
+    window and formatted from precomputed day strings, which is several
+    times faster than datetime arithmetic plus strftime for millions of rows
+    (formatted minutes are cached).
+    """
+
+    def __init__(self, seed: int = 42, days: int = 90, now: datetime = None):
+        """
+        Args:
+            seed: Random seed (same seed, same dataset)
+            days: History window for rentals, resets, usage and errors
+            now: Reference time (default: current time)
+        """
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.days = days
+        now = now or datetime.now().replace(microsecond=0)
+        start = now - timedelta(days=days)
+        midnight = start.replace(hour=0, minute=0, second=0)
+        # Seconds from midnight of the first day to now
+        self.now = int((now - midnight).total_seconds())
+        # Enough days for rentals that started at the end of the window
+        self._day_strings = [(midnight + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(days + 4)]
+        self._minutes: Dict[int, str] = {}
+
+    # ----- helpers -----
+
+    def _below(self, n: int) -> int:
+        return int(self.rng.random() * n)
+
+    def _offsets(self, count: int) -> List[int]:
+        """Times on the days before today (seconds), weighted by hour of day."""
+        below = self._below
+        hours = self.rng.choices(range(24), weights=HOURLY_WEIGHTS, k=count)
+        return [below(self.days) * 86400 + hour * 3600 + below(3600) for hour in hours]
+
+    def _fmt(self, offset: Optional[int]) -> Optional[str]:
+        if offset is None:
+            return None
+        minute, second = divmod(offset, 60)
+        prefix = self._minutes.get(minute)
+        if prefix is None:
+            day, minute_of_day = divmod(minute, 1440)
+            prefix = self._minutes[minute] = (
+                f"{self._day_strings[day]} {minute_of_day // 60:02d}:{minute_of_day % 60:02d}:"
+            )
+        return prefix + _SECONDS[second]
+
+    def _password(self) -> str:
+        return f"{self.rng.getrandbits(64):016x}"
+
+    # ----- tables -----
+
+    def websites(self, count: int) -> List[Dict]:
+        """Tool websites; the first ones are the most popular."""
+        rows = []
+        for i in range(count):
+            name = TOOL_NAMES[i] if i < len(TOOL_NAMES) else f"tool{i + 1:03d}"
+            hours = self.rng.choice(VALIDITY_HOURS)
+            rows.append({
+                'name': name,
+                'url': f"https://{name}.example",
+                'validity_hours': hours,
+                'description': f"Synthetic {name} - {hours} hours validity"
+            })
+        return rows
+
+    def accounts(self, count: int, websites: List[Dict]) -> Iterator[Dict]:
+        """
+        Accounts spread over websites (Zipf-weighted).
+
+        Args:
+            count: Number of accounts
+            websites: Inserted website rows (with 'id' and 'validity_hours')
+        """
+        below, fmt, now = self._below, self._fmt, self.now
+        website_choices = self.rng.choices(websites, weights=_zipf_weights(len(websites)), k=count)
+        for i, website in enumerate(website_choices):
+            roll = self.rng.random()
+            row = {
+                'website_id': website['id'],
+                'username': f"{website['name']}_s{self.seed}_{i:07d}",
+                'email': f"user{self.seed}_{i:07d}@example.com",
+                'current_password': self._password(),
+                'status': 'available',
+                'rented_at': None,
+                'available_at': None,
+                'last_reset': fmt(now - below(30 * 86400)),
+                'failed_login_attempts': 0,
+                'last_failed_login': None,
+                'exception_reason': None,
+            }
+            if roll < 0.25:
+                validity = website['validity_hours'] * 3600
+                rented_at = now - below(validity)
+                row.update(status='rented', rented_at=fmt(rented_at), available_at=fmt(rented_at + validity))
+            elif roll < 0.30:
+                row.update(status='exception',
+                           exception_reason=self.rng.choice(EXCEPTION_REASONS),
+                           failed_login_attempts=1 + below(5),
+                           last_failed_login=fmt(now - below(7 * 86400)))
+            yield row
+
+    def rentals(self, count: int, accounts: List[Dict], validity: Dict[int, int]) -> Iterator[Dict]:
+        """
+        Rental history plus one active rental per currently rented account.
+
+        Args:
+            count: Number of historical rentals
+            accounts: Inserted account rows (with 'id', 'website_id', 'status')
+            validity: website_id -> validity_hours
+        """
+        below, fmt, now = self._below, self._fmt, self.now
+        for account in accounts:
+            if account['status'] == 'rented':
+                yield {
+                    'account_id': account['id'],
+                    'customer_name': f"Customer {below(100000):05d}",
+                    'customer_email': None,
+                    'customer_phone': None,
+                    'rented_at': account['rented_at'],
+                    'expires_at': account['available_at'],
+                    'returned_at': None,
+                    'status': 'active',
+                }
+
+        seconds = {website_id: hours * 3600 for website_id, hours in validity.items()}
+        weights = list(itertools.accumulate(_zipf_weights(len(accounts), exponent=0.6)))
+        chunk = 50_000
+        for offset in range(0, count, chunk):
+            size = min(chunk, count - offset)
+            picked = self.rng.choices(accounts, cum_weights=weights, k=size)
+            for account, rented_at in zip(picked, self._offsets(size)):
+                duration = seconds[account['website_id']]
+                # Rentals that would still be running count as returned early
+                returned_early = self.rng.random() < 0.6 or rented_at + duration > now
+                yield {
+                    'account_id': account['id'],
+                    'customer_name': f"Customer {below(100000):05d}",
+                    'customer_email': None,
+                    'customer_phone': None,
+                    'rented_at': fmt(rented_at),
+                    'expires_at': fmt(rented_at + duration),
+                    'returned_at': fmt(rented_at + below(duration)) if returned_early else None,
+                    'status': 'completed' if returned_early else 'expired',
+                }
+
+    def password_history(self, count: int, account_ids: List[int]) -> Iterator[Dict]:
+        """Password resets; about 8% failed."""
+        for account_id, reset_date in zip(self.rng.choices(account_ids, k=count), self._offsets(count)):
+            success = self.rng.random() < 0.92
+            yield {
+                'account_id': account_id,
+                'old_password': self._password(),
+                'new_password': self._password(),
+                'reset_date': self._fmt(reset_date),
+                'status': 'success' if success else 'failed',
+                'message': 'Password reset completed successfully' if success else 'Login failed',
+            }
+
+    def api_keys(self, count: int) -> List[Dict]:
+        """API keys; a few are revoked."""
+        rows = []
+        for i in range(count):
+            api_key = f"urt_{self.rng.getrandbits(192):048x}"
+            rows.append({
+                'api_key': api_key,
+                'api_key_hash': hashlib.sha256(api_key.encode()).hexdigest(),
+                'name': f"Reseller {i + 1:03d}",
+                'email': f"reseller{i + 1:03d}@example.com",
+                'status': 'revoked' if self.rng.random() < 0.05 else 'active',
+                'rate_limit': self.rng.choice([100, 500, 1000, 5000]),
+                'notes': 'synthetic',
+            })
+        return rows
+
+    def api_usage(self, count: int, api_key_ids: List[int], accounts: List[Dict],
+                  website_names: Dict[int, str]) -> Iterator[Dict]:
+        """API calls dominated by a few keys; ~3% errors."""
+        below, fmt = self._below, self._fmt
+        key_weights = _zipf_weights(len(api_key_ids))
+        chunk = 50_000
+        for offset in range(0, count, chunk):
+            size = min(chunk, count - offset)
+            keys = self.rng.choices(api_key_ids, weights=key_weights, k=size)
+            picked = self.rng.choices(accounts, k=size)
+            actions = self.rng.choices(['rent', 'check', 'return'], weights=[55, 30, 15], k=size)
+            agents = self.rng.choices(USER_AGENTS, k=size)
+            for key_id, account, action, agent, timestamp in zip(keys, picked, actions, agents,
+                                                                 self._offsets(size)):
+                yield {
+                    'api_key_id': key_id,
+                    'account_id': account['id'],
+                    'website': website_names[account['website_id']],
+                    'action': action,
+                    'ip_address': f"10.{below(256)}.{below(256)}.{1 + below(254)}",
+                    'user_agent': agent,
+                    'timestamp': fmt(timestamp),
+                    'response_status': 'success' if self.rng.random() < 0.97 else 'error',
+                }
+
+    def error_logs(self, count: int, account_ids: List[int]) -> Iterator[Dict]:
+        """Reset errors."""
+        for account_id, timestamp in zip(self.rng.choices(account_ids, k=count), self._offsets(count)):
+            error_type = self.rng.choice(ERROR_TYPES)
+            yield {
+                'account_id': account_id,
+                'error_type': error_type,
+                'error_message': f"Synthetic {error_type}",
+                'timestamp': self._fmt(timestamp),
+                'traceback': None,
+            }
+
+
+# ===================== LOADERS =====================
+
+class SQLiteLoader:
+    """Bulk-inserts generated rows into a PasswordResetDB file."""
+
+    def __init__(self, db_path: str, chunk_size: int = 50_000):
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+        # Create every table the application expects
+        PasswordResetDB(db_path)
+        self.api_manager = APIManager(db_path)
+
+    def existing_websites(self) -> List[Dict]:
+        """Websites already in the database (e.g. the defaults)."""
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in conn.execute("SELECT id, name, validity_hours FROM websites")]
+        finally:
+            conn.close()
+
+    def insert(self, table: str, rows: Iterable[Dict], return_rows: bool = False) -> List[Dict]:
+        """
+        Insert rows in one transaction.
+
+        Args:
+            table: Table name
+            rows: Row dictionaries (all with the same keys)
+            return_rows: Return the rows with their assigned 'id'
+
+        Returns:
+            Inserted rows with ids if return_rows, else an empty list
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return []
+
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        conn.execute("PRAGMA synchronous = OFF")
+        try:
+            # Ids are only assigned here when the caller needs them back
+            columns = (['id'] if return_rows else []) + list(first)
+            last_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+            next_id = last_id + 1
+            values = operator.itemgetter(*columns)
+            sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+
+            # Building secondary indexes once afterwards is much faster than
+            # updating them row by row
+            indexes = conn.execute(
+                "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+                (table,)
+            ).fetchall()
+            for name, _ in indexes:
+                conn.execute(f"DROP INDEX {name}")
+
+            inserted = []
+            rows = itertools.chain([first], rows)
+            while True:
+                batch = list(itertools.islice(rows, self.chunk_size))
+                if not batch:
+                    break
+                if return_rows:
+                    for row in batch:
+                        row['id'] = next_id
+                        next_id += 1
+                    inserted.extend(batch)
+                conn.executemany(sql, map(values, batch))
+            for _, index_sql in indexes:
+                conn.execute(index_sql)
+            if table == 'api_usage':
+                # These rows bypassed log_api_request; roll up only this load's ids
+                through_id = conn.execute("SELECT MAX(id) FROM api_usage").fetchone()[0]
+                self.api_manager.rollup_usage_range(conn.cursor(), last_id, through_id)
+            conn.commit()
+        finally:
+            conn.close()
+        return inserted
+
+
+class SupabaseLoader:
+    """Inserts generated rows through a Supabase client in multi-row batches."""
+
+    # SQLite column -> Supabase column, per table (see supabase_schema.sql)
+    COLUMN_MAP = {
+        'api_keys': {'api_key': 'key', 'api_key_hash': 'key_hash'},
+        'api_usage': {'timestamp': 'created_at'},
+    }
+    TABLE_MAP = {'api_usage': 'api_usage_logs'}
+    # Tables that do not exist in the Supabase schema
+    UNSUPPORTED = {'error_logs'}
+
+    def __init__(self, client, batch_size: int = 1000):
+        self.client = client
+        self.batch_size = batch_size
+        self.logger = logging.getLogger(__name__)
+
+    def _convert(self, table: str, row: Dict) -> Dict:
+        mapping = self.COLUMN_MAP.get(table, {})
+        converted = {}
+        for column, value in row.items():
+            if table == 'api_keys' and column in ('status', 'notes'):
+                if column == 'status':
+                    converted['is_active'] = value == 'active'
+                continue
+            if isinstance(value, str) and len(value) == 19 and value[10] == ' ' and value[4] == '-':
+                value = value.replace(' ', 'T', 1)
+            converted[mapping.get(column, column)] = value
+        return converted
+
+    def existing_websites(self) -> List[Dict]:
+        """Websites already in the database (e.g. the defaults from supabase_schema.sql)."""
+        return self.client.table('websites').select('id, name, validity_hours').execute().data
+
+    def insert(self, table: str, rows: Iterable[Dict], return_rows: bool = False) -> List[Dict]:
+        """Insert rows in batches; see SQLiteLoader.insert."""
+        if table in self.UNSUPPORTED:
+            self.logger.info(f"Skipping {table}: not part of the Supabase schema")
+            return []
+
+        target = self.TABLE_MAP.get(table, table)
+        inserted = []
+        rows = iter(rows)
+        while True:
+            batch = list(itertools.islice(rows, self.batch_size))
+            if not batch:
+                break
+            result = self.client.table(target).insert([self._convert(table, row) for row in batch]).execute()
+            if return_rows:
+                # Keep the generator's column names, with the ids Supabase assigned
+                for row, stored in zip(batch, result.data):
+                    row['id'] = stored['id']
+                inserted.extend(batch)
+        return inserted
+
+
+def generate_dataset(loader, counts: Dict[str, int], seed: int = 42, days: int = 90,
+                     progress=None) -> Dict[str, int]:
+    """
+    Fill a backend with a synthetic dataset.
+
+    Args:
+        loader: SQLiteLoader or SupabaseLoader
+        counts: Rows per table (keys as in PRESETS)
+        seed: Random seed
+        days: History window in days
+        progress: Optional callback(table, rows) called after each table
+
+    Returns:
+        Rows inserted per table
+    """
+    gen = SyntheticDataGenerator(seed=seed, days=days)
+    inserted = {}
+
+    def done(table, rows):
+        inserted[table] = rows
+        if progress:
+            progress(table, rows)
+
+    # Reuse websites that already exist under the same name (names are unique)
+    existing = {w['name']: w for w in loader.existing_websites()}
+    generated = gen.websites(counts['websites'])
+    new_websites = loader.insert('websites', [w for w in generated if w['name'] not in existing],
+                                 return_rows=True)
+    websites = [existing[w['name']] for w in generated if w['name'] in existing] + new_websites
+    done('websites', len(new_websites))
+
+    accounts = loader.insert('accounts', gen.accounts(counts['accounts'], websites), return_rows=True)
+    done('accounts', len(accounts))
+
+    validity = {w['id']: w['validity_hours'] for w in websites}
+    names = {w['id']: w['name'] for w in websites}
+    refs = [{'id': a['id'], 'website_id': a['website_id'], 'status': a['status'],
+             'rented_at': a['rented_at'], 'available_at': a['available_at']} for a in accounts]
+    account_ids = [a['id'] for a in refs]
+    del accounts
+
+    active = sum(1 for a in refs if a['status'] == 'rented')
+    loader.insert('rentals', gen.rentals(counts['rentals'], refs, validity))
+    done('rentals', counts['rentals'] + active)
+
+    loader.insert('password_history', gen.password_history(counts['password_history'], account_ids))
+    done('password_history', counts['password_history'])
+
+    keys = loader.insert('api_keys', gen.api_keys(counts['api_keys']), return_rows=True)
+    done('api_keys', len(keys))
+
+    loader.insert('api_usage', gen.api_usage(counts['api_usage'], [k['id'] for k in keys], refs, names))
+    done('api_usage', counts['api_usage'])
+
+    if not isinstance(loader, SupabaseLoader):
+        loader.insert('error_logs', gen.error_logs(counts['error_logs'], account_ids))
+        done('error_logs', counts['error_logs'])
+
+    return inserted
@@ -283,3 +283,27 @@ class SecurityHelper:
         details['total_score'] = f"{max(0, score)}/{max_score}"
         
         return details
+
+
+class StatsHelper:
+    """Small statistics helpers for timing reports."""
+
+    @staticmethod
+    def percentile(values: List[float], pct: float) -> float:
+        """
+        Calculate a percentile using linear interpolation.
+        
+        Args:
+            values: Sample values (need not be sorted)
+            pct: Percentile between 0 and 100
+            
+        Returns:
+            The interpolated percentile, or 0.0 for an empty sample
+        """
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        rank = (len(ordered) - 1) * pct / 100.0
+        lower = int(rank)
+        upper = min(lower + 1, len(ordered) - 1)
+        return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
@@ -0,0 +1,260 @@
+"""Background WAL checkpointing for the SQLite database.
+
+SQLite's auto-checkpoint runs on the committing connection and only copies
+frames no reader still needs; a reader that keeps an old snapshot open (the
+rental monitor, a stats query, a long scheduler transaction) stops it from
+ever catching up, and the -wal file keeps growing. CheckpointManager polls
+the WAL size from a daemon thread and runs a PASSIVE checkpoint when the WAL
+passes a size threshold or the last checkpoint is too old, and a TRUNCATE
+checkpoint (which waits briefly for readers and resets the file to zero
+bytes) once it is large. A checkpoint that keeps leaving frames behind
+means a reader is pinning the WAL; that is logged as a warning.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from src import db_instrumentation
+from src import metrics
+
+
+# Frame = 24-byte header + one page; the file starts with a 32-byte header
+_WAL_HEADER_BYTES = 32
+_FRAME_HEADER_BYTES = 24
+
+
+class CheckpointManager:
+    """Runs PASSIVE/TRUNCATE checkpoints on size or time thresholds."""
+
+    def __init__(self, db_path: str = "database/rental_system.db", interval: float = 60.0,
+                 passive_bytes: int = 4 * 1024 * 1024, truncate_bytes: int = 64 * 1024 * 1024,
+                 poll_interval: float = 5.0, truncate_timeout: float = 1.0,
+                 warn_after: float = 120.0, record_metrics: bool = True):
+        """
+        Args:
+            db_path: Path to the SQLite database (in WAL mode)
+            interval: Checkpoint at least this often (seconds) while the WAL is not empty
+            passive_bytes: Run a PASSIVE checkpoint once the WAL reaches this size
+            truncate_bytes: Run a TRUNCATE checkpoint once the WAL reaches this size
+            poll_interval: Seconds between WAL size checks
+            truncate_timeout: Seconds a TRUNCATE checkpoint waits for readers
+                (new writers wait too, so keep it short)
+            warn_after: Warn when checkpoints have been incomplete for this many seconds
+            record_metrics: Export WAL size and lag to metrics.REGISTRY
+        """
+        self.db_path = db_path
+        self.wal_path = f"{db_path}-wal"
+        self.interval = interval
+        self.passive_bytes = passive_bytes
+        self.truncate_bytes = truncate_bytes
+        self.poll_interval = poll_interval
+        self.truncate_timeout = truncate_timeout
+        self.warn_after = warn_after
+        self.record_metrics = record_metrics
+        self.logger = logging.getLogger(__name__)
+
+        self._database = os.path.basename(db_path)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._page_size = None
+        self._status = {
+            'wal_bytes': 0,
+            'log_frames': 0,
+            'checkpointed_frames': 0,
+            'lag_frames': 0,
+            'lag_bytes': 0,
+            'last_checkpoint_at': None,
+            'last_checkpoint_mode': None,
+            'last_complete_at': None,
+            'blocked_since': None,
+            'checkpoints': 0,
+            'truncations': 0,
+        }
+        self._last_attempt = time.monotonic()
+        self._last_warning = None
+
+    # ===================== MEASUREMENT =====================
+
+    def wal_size(self) -> int:
+        """Current size of the -wal file in bytes (0 if there is none)."""
+        try:
+            return os.path.getsize(self.wal_path)
+        except OSError:
+            return 0
+
+    def _frame_bytes(self, conn) -> int:
+        if self._page_size is None:
+            self._page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        return self._page_size + _FRAME_HEADER_BYTES
+
+    # ===================== CHECKPOINTS =====================
+
+    def checkpoint(self, mode: str = 'PASSIVE') -> Dict:
+        """
+        Run one checkpoint and update the status.
+
+        Args:
+            mode: 'PASSIVE' (never waits) or 'TRUNCATE' (waits up to
+                truncate_timeout for readers, then resets the WAL file)
+
+        Returns:
+            {'busy', 'log_frames', 'checkpointed_frames'} from PRAGMA wal_checkpoint
+        """
+        mode = mode.upper()
+        if mode not in ('PASSIVE', 'TRUNCATE'):
+            raise ValueError(f"Unsupported checkpoint mode '{mode}'")
+
+        timeout = self.truncate_timeout if mode == 'TRUNCATE' else 0
+        conn = db_instrumentation.connect(self.db_path, timeout=timeout)
+        try:
+            busy, log_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+            frame_bytes = self._frame_bytes(conn)
+        finally:
+            conn.close()
+
+        # -1/-1 when the database is not in WAL mode
+        log_frames, checkpointed = max(log_frames, 0), max(checkpointed, 0)
+        complete = not busy and checkpointed >= log_frames
+        wal_bytes = self.wal_size()
+        now = time.time()
+
+        with self._lock:
+            status = self._status
+            status.update({
+                'wal_bytes': wal_bytes,
+                'log_frames': log_frames,
+                'checkpointed_frames': checkpointed,
+                'lag_frames': log_frames - checkpointed,
+                'lag_bytes': (log_frames - checkpointed) * frame_bytes,
+                'last_checkpoint_at': now,
+                'last_checkpoint_mode': mode,
+            })
+            status['checkpoints'] += 1
+            if complete:
+                status['last_complete_at'] = now
+                status['blocked_since'] = None
+                if mode == 'TRUNCATE':
+                    status['truncations'] += 1
+            elif status['blocked_since'] is None:
+                status['blocked_since'] = now
+        self._last_attempt = time.monotonic()
+
+        if self.record_metrics:
+            result = 'complete' if complete else 'busy' if busy else 'partial'
+            metrics.WAL_CHECKPOINTS.inc(database=self._database, mode=mode.lower(), result=result)
+            metrics.WAL_CHECKPOINT_LAG.set(log_frames - checkpointed, database=self._database)
+            metrics.WAL_BYTES.set(wal_bytes, database=self._database)
+
+        self._check_blocked()
+        return {'busy': busy, 'log_frames': log_frames, 'checkpointed_frames': checkpointed}
+
+    def _check_blocked(self):
+        """Warn (at most once per warn_after) while checkpoints keep falling short."""
+        blocked = self.blocked_seconds()
+        if self.record_metrics:
+            metrics.WAL_CHECKPOINT_BLOCKED.set(blocked, database=self._database)
+        if blocked < self.warn_after:
+            self._last_warning = None
+            return
+        now = time.monotonic()
+        if self._last_warning is not None and now - self._last_warning < self.warn_after:
+            return
+        self._last_warning = now
+        status = self.get_status()
+        self.logger.warning(
+            f"WAL checkpoint of {self._database} blocked for {blocked:.0f}s: "
+            f"{status['lag_frames']} frame(s) not checkpointed, WAL is "
+            f"{status['wal_bytes'] / 1024 / 1024:.1f} MB. A long-lived read transaction "
+            f"is keeping an old snapshot open"
+        )
+
+    def blocked_seconds(self) -> float:
+        """Seconds since checkpoints stopped completing (0 when the last one caught up)."""
+        with self._lock:
+            since = self._status['blocked_since']
+        return time.time() - since if since is not None else 0.0
+
+    def run_once(self) -> Optional[Dict]:
+        """
+        Checkpoint if a threshold has been reached.
+
+        Returns:
+            The checkpoint result, or None if no checkpoint was due
+        """
+        wal_bytes = self.wal_size()
+        if self.record_metrics:
+            metrics.WAL_BYTES.set(wal_bytes, database=self._database)
+
+        if wal_bytes >= self.truncate_bytes:
+            result = self.checkpoint('TRUNCATE')
+            if result['busy']:
+                # Readers outlasted the timeout; still copy what can be copied
+                result = self.checkpoint('PASSIVE')
+            return result
+        if wal_bytes >= self.passive_bytes:
+            return self.checkpoint('PASSIVE')
+        if wal_bytes > _WAL_HEADER_BYTES and time.monotonic() - self._last_attempt >= self.interval:
+            return self.checkpoint('PASSIVE')
+
+        self._check_blocked()
+        return None
+
+    # ===================== BACKGROUND THREAD =====================
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                self.logger.warning(f"WAL checkpoint of {self._database} failed: {e}")
+
+    def start(self):
+        """Start the background checkpoint thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='wal-checkpoint', daemon=True)
+        self._thread.start()
+        self.logger.info(
+            f"WAL checkpoints for {self._database}: PASSIVE at {self.passive_bytes // 1024} KB "
+            f"or every {self.interval:.0f}s, TRUNCATE at {self.truncate_bytes // 1024 // 1024} MB"
+        )
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the background thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def get_status(self) -> Dict:
+        """WAL size, checkpoint lag and timing of the last checkpoints."""
+        with self._lock:
+            status = dict(self._status)
+        status['wal_bytes'] = self.wal_size()
+        status['blocked_seconds'] = time.time() - status['blocked_since'] if status['blocked_since'] else 0.0
+        return status
+
+
+def from_env(db_path: str, record_metrics: bool = True) -> Optional[CheckpointManager]:
+    """
+    CheckpointManager configured from WAL_* environment variables.
+
+    Returns:
+        None when WAL_CHECKPOINT_INTERVAL is 0 (checkpoint management off)
+    """
+    interval = float(os.getenv('WAL_CHECKPOINT_INTERVAL', '60'))
+    if interval <= 0:
+        return None
+    return CheckpointManager(
+        db_path,
+        interval=interval,
+        passive_bytes=int(os.getenv('WAL_PASSIVE_BYTES', str(4 * 1024 * 1024))),
+        truncate_bytes=int(os.getenv('WAL_TRUNCATE_BYTES', str(64 * 1024 * 1024))),
+        warn_after=float(os.getenv('WAL_BLOCKED_WARNING_SECONDS', '120')),
+        record_metrics=record_metrics,
+    )
@@ -0,0 +1,190 @@
+"""Single-writer actor for SQLite mutations.
+
+Every thread that writes through its own connection competes for SQLite's
+one write lock; under a burst most of them sleep in the busy handler and
+retry, and a request can wait seconds for "database is locked". With a
+SQLiteWriteActor, PasswordResetDB and APIManager hand each mutation - a
+function of a cursor - to one thread that owns one connection. The thread
+takes whatever has queued up, runs each operation inside its own SAVEPOINT
+of a single transaction and commits the group once: one lock acquisition
+and one fsync for the whole batch, and a failing operation only rolls back
+its own savepoint. Callers get a Future that resolves after the commit.
+
+Other processes (CLI scripts, the scheduler) still take the lock the usual
+way; the actor only removes contention inside its own process.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from src import db_instrumentation
+from src import metrics
+
+
+class SQLiteWriteActor:
+    """Serializes write operations through one queue, one thread and one connection."""
+
+    def __init__(self, db_path: str = "database/rental_system.db", max_batch: int = 64,
+                 timeout: float = 30.0):
+        """
+        Args:
+            db_path: Path to the SQLite database
+            max_batch: Most operations committed in one transaction
+            timeout: Busy timeout of the actor's connection (other processes may hold the lock)
+        """
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        self._queue = queue.Queue()
+        # Guards _closed against submit() racing the writer thread's exit
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Open the connection here so a bad path fails the constructor instead
+        # of killing the thread; only the writer thread uses it afterwards
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = db_instrumentation.connect(db_path, timeout=timeout, isolation_level=None,
+                                                check_same_thread=False)
+        self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, operation: Callable[[Any], Any]) -> Future:
+        """
+        Queue operation(cursor) to run in the next group transaction.
+
+        The operation must not commit or roll back; an exception it raises
+        undoes only its own changes and is set on the Future.
+
+        Returns:
+            Future with the operation's return value, resolved after the commit
+        """
+        if threading.current_thread() is self._thread:
+            # Waiting on the writer thread from the writer thread would deadlock
+            raise RuntimeError("Write operations cannot submit further write operations")
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write actor is closed")
+            self._queue.put((operation, future))
+        return future
+
+    def run(self, operation: Callable[[Any], Any]) -> Any:
+        """Submit operation and wait for its result."""
+        return self.submit(operation).result()
+
+    def close(self, timeout: float = 30.0):
+        """Run the operations already queued, then stop the thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+    # ===================== WRITER THREAD =====================
+
+    def _next_batch(self):
+        """Block for one operation, then take whatever else is already queued."""
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch; stop on the next call
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        conn = self._conn
+        running = []
+        error = RuntimeError("Write actor stopped before running the operation")
+        try:
+            while True:
+                batch = self._next_batch()
+                if batch is None:
+                    return
+                running = [(op, f) for op, f in batch if f.set_running_or_notify_cancel()]
+                self._commit_batch(conn, running)
+        except Exception as e:
+            self.logger.exception(f"Write actor stopped: {e}")
+            error = e
+        finally:
+            # Whether closed or crashed, nobody may be left waiting on a Future
+            with self._lock:
+                self._closed = True
+            for _, future in running:
+                if not future.done():
+                    future.set_exception(error)
+            self._fail_pending(RuntimeError("Write actor stopped before running the operation"))
+            conn.close()
+
+    def _fail_pending(self, error: Exception):
+        """Set error on every operation still in the queue."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None and item[1].set_running_or_notify_cancel():
+                item[1].set_exception(error)
+
+    def _commit_batch(self, conn, batch):
+        """Run batch in one transaction, one savepoint per operation, and resolve the futures."""
+        if not batch:
+            return
+        started = time.perf_counter()
+        outcomes = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            for operation, future in batch:
+                conn.execute("SAVEPOINT operation")
+                try:
+                    outcomes.append((future, operation(cursor), None))
+                    conn.execute("RELEASE operation")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO operation")
+                    conn.execute("RELEASE operation")
+                    outcomes.append((future, None, e))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # Lock timeout or failed commit: nothing in the batch was written.
+            # Resolve the futures even if the rollback itself raises (which
+            # stops the thread)
+            try:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+            finally:
+                self.logger.error(f"Write batch of {len(batch)} operation(s) failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+            return
+
+        metrics.WRITE_BATCH_SIZE.observe(len(batch))
+        metrics.WRITE_BATCH_LATENCY.observe(time.perf_counter() - started)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def from_env(db_path: str) -> Optional[SQLiteWriteActor]:
+    """SQLiteWriteActor for db_path when SQLITE_WRITE_ACTOR is on, else None."""
+    if os.getenv('SQLITE_WRITE_ACTOR', '').lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    return SQLiteWriteActor(db_path, max_batch=int(os.getenv('SQLITE_WRITE_BATCH', '64')))
@@ -99,9 +99,13 @@ INSERT INTO websites (name, url, validity_hours, description) VALUES
     ('androidmultitool', 'https://androidmultitool.com', 2, 'Android Multi Tool - 2 hours validity')
 ON CONFLICT (name) DO NOTHING;
 
--- Function to Auto-Expire Rentals
+-- Function to Auto-Expire Rentals (returns the number of rentals expired)
+-- The return type changed from void, which CREATE OR REPLACE cannot do
+DROP FUNCTION IF EXISTS auto_expire_rentals();
 CREATE OR REPLACE FUNCTION auto_expire_rentals()
-RETURNS void AS $$
+RETURNS INTEGER AS $$
+DECLARE
+    expired_count INTEGER;
 BEGIN
     -- Mark accounts as available if rental expired
     UPDATE accounts 
@@ -118,9 +122,34 @@ BEGIN
     SET status = 'expired'
     WHERE status = 'active' 
     AND expires_at < CURRENT_TIMESTAMP;
+    GET DIAGNOSTICS expired_count = ROW_COUNT;
+    
+    RETURN expired_count;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Overdue active rentals per website: what auto_expire_rentals() would expire now
+CREATE OR REPLACE FUNCTION overdue_rentals_summary()
+RETURNS TABLE (
+    website TEXT,
+    overdue BIGINT,
+    oldest_expires_at TIMESTAMP WITH TIME ZONE
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT w.name, COUNT(*), MIN(r.expires_at)
+    FROM rentals r
+    JOIN accounts a ON r.account_id = a.id
+    JOIN websites w ON a.website_id = w.id
+    WHERE r.status = 'active'
+    AND r.expires_at < CURRENT_TIMESTAMP
+    GROUP BY w.name;
 END;
 $$ LANGUAGE plpgsql;
 
+REVOKE EXECUTE ON FUNCTION overdue_rentals_summary() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION overdue_rentals_summary() TO service_role;
+
 -- Function to Get Available Accounts (with auto-expiry)
 CREATE OR REPLACE FUNCTION get_available_accounts(website_name TEXT)
 RETURNS TABLE (
@@ -152,6 +181,57 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Archive schema for history rows past their retention (see src/retention.py)
+CREATE SCHEMA IF NOT EXISTS archive;
+CREATE TABLE IF NOT EXISTS archive.password_history (LIKE public.password_history INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS archive.rentals (LIKE public.rentals INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS archive.api_usage_logs (LIKE public.api_usage_logs INCLUDING DEFAULTS);
+-- Supabase's default grants cover public only; archive_old_rows runs as the
+-- service role and needs to write here
+GRANT USAGE ON SCHEMA archive TO service_role;
+GRANT SELECT, INSERT ON ALL TABLES IN SCHEMA archive TO service_role;
+ALTER DEFAULT PRIVILEGES IN SCHEMA archive GRANT SELECT, INSERT ON TABLES TO service_role;
+
+-- Function to move up to p_batch rows older than p_days days into the archive schema.
+-- Each call is one short transaction; call it until it returns less than p_batch.
+-- Runs with the caller's rights (SupabaseArchiver uses the service key) and is
+-- not callable by anon/authenticated clients.
+CREATE OR REPLACE FUNCTION archive_old_rows(p_table TEXT, p_days INTEGER, p_batch INTEGER DEFAULT 5000)
+RETURNS INTEGER AS $$
+DECLARE
+    age_column TEXT;
+    extra_filter TEXT := '';
+    moved INTEGER;
+BEGIN
+    CASE p_table
+        WHEN 'password_history' THEN age_column := 'reset_date';
+        WHEN 'api_usage_logs' THEN age_column := 'created_at';
+        WHEN 'rentals' THEN
+            age_column := 'COALESCE(returned_at, expires_at)';
+            extra_filter := ' AND status <> ''active''';
+        ELSE RAISE EXCEPTION 'No retention policy for table %', p_table;
+    END CASE;
+
+    EXECUTE format(
+        'WITH moved AS (
+            DELETE FROM public.%1$I WHERE id IN (
+                SELECT id FROM public.%1$I
+                WHERE %2$s < CURRENT_TIMESTAMP - make_interval(days => %3$s)%4$s
+                ORDER BY id LIMIT %5$s
+            )
+            RETURNING *
+        )
+        INSERT INTO archive.%1$I SELECT * FROM moved',
+        p_table, age_column, p_days, extra_filter, p_batch
+    );
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql SECURITY INVOKER;
+
+REVOKE EXECUTE ON FUNCTION archive_old_rows(TEXT, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION archive_old_rows(TEXT, INTEGER, INTEGER) TO service_role;
+
 -- Enable Row Level Security (RLS)
 ALTER TABLE websites ENABLE ROW LEVEL SECURITY;
 ALTER TABLE accounts ENABLE ROW LEVEL SECURITY;
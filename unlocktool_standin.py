@@ -0,0 +1,219 @@
+"""
+Offline stand-in for the unlocktool.net login and change-password flow.
+
+Serves the same form fields and button texts PasswordResetBot looks for, so
+the reset pipeline can be benchmarked and regression-tested without touching
+the live site. Latency and failures can be injected per request.
+
+Usage:
+    python unlocktool_standin.py --port 8080 --latency-ms 50 --error-rate 0.02
+    # then set "site_url": "http://127.0.0.1:8080" in the accounts config
+"""
+
+import argparse
+import random
+import secrets
+import threading
+import time
+
+from flask import Flask, request, session, redirect, jsonify
+
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head><title>{title} | UnlockTool</title></head>
+<body>
+<nav>{nav}</nav>
+<main>{body}</main>
+</body>
+</html>"""
+
+LOGIN_FORM = """
+<h1>Login</h1>
+{error}
+<form method="post" action="/post-in/">
+    <input type="text" name="username" autocomplete="username">
+    <input type="password" name="password" autocomplete="current-password">
+    <button type="submit">Login</button>
+</form>"""
+
+CHANGE_FORM = """
+<h1>Password change</h1>
+{error}
+<form method="post" action="/password-change/">
+    <input type="password" name="old_password">
+    <input type="password" name="new_password1">
+    <input type="password" name="new_password2">
+    <button type="submit">Change password</button>
+</form>"""
+
+
+class StandinConfig:
+    """Latency and error injection settings for the stand-in."""
+
+    def __init__(self, latency_ms: float = 0, slow_rate: float = 0, slow_ms: float = 5000,
+                 error_rate: float = 0, wrong_password_rate: float = 0, seed: int = None):
+        """
+        Args:
+            latency_ms: Delay added to every request
+            slow_rate: Fraction of requests delayed by an extra slow_ms
+            slow_ms: Extra delay for slow requests
+            error_rate: Fraction of requests answered with HTTP 500
+            wrong_password_rate: Fraction of logins rejected as wrong password
+            seed: Random seed for reproducible runs
+        """
+        self.latency_ms = latency_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.error_rate = error_rate
+        self.wrong_password_rate = wrong_password_rate
+        self.random = random.Random(seed)
+
+
+def create_app(config: StandinConfig = None, passwords: dict = None) -> Flask:
+    """
+    Build the stand-in Flask app.
+
+    Args:
+        config: Injection settings (defaults to no injection)
+        passwords: Known username -> password map; unknown users are
+            registered with whatever password they first log in with
+
+    Returns:
+        Flask application
+    """
+    config = config or StandinConfig()
+    passwords = dict(passwords or {})
+    lock = threading.Lock()
+    stats = {'requests': 0, 'logins': 0, 'failed_logins': 0, 'password_changes': 0,
+             'injected_errors': 0, 'injected_slow': 0}
+
+    app = Flask(__name__)
+    app.secret_key = secrets.token_hex(16)
+
+    def render(title, body):
+        if session.get('user'):
+            nav = f'<span>{session["user"]}</span> <a href="/logout/">Logout</a>'
+        else:
+            nav = '<a href="/post-in/">Login</a>'
+        return PAGE.format(title=title, nav=nav, body=body)
+
+    def chance(rate):
+        with lock:
+            return rate > 0 and config.random.random() < rate
+
+    @app.before_request
+    def inject_faults():
+        if request.path.startswith('/__standin__'):
+            return None
+        with lock:
+            stats['requests'] += 1
+
+        delay = config.latency_ms
+        if chance(config.slow_rate):
+            delay += config.slow_ms
+            with lock:
+                stats['injected_slow'] += 1
+        if delay:
+            time.sleep(delay / 1000.0)
+
+        if chance(config.error_rate):
+            with lock:
+                stats['injected_errors'] += 1
+            return "<h1>Server Error (500)</h1>", 500
+        return None
+
+    @app.route('/')
+    def home():
+        if session.get('user'):
+            return render("Dashboard", "<h1>Dashboard</h1><p>Welcome back.</p>")
+        return render("Home", '<h1>UnlockTool</h1><a href="/post-in/">Sign in</a>')
+
+    @app.route('/post-in/', methods=['GET', 'POST'])
+    def login():
+        if request.method == 'GET':
+            return render("Login", LOGIN_FORM.format(error=''))
+
+        username = request.form.get('username', '')
+        password = request.form.get('password', '')
+        with lock:
+            expected = passwords.setdefault(username, password)
+
+        if not username or password != expected or chance(config.wrong_password_rate):
+            with lock:
+                stats['failed_logins'] += 1
+            error = '<p class="error">Please enter a correct username and password.</p>'
+            return render("Login", LOGIN_FORM.format(error=error))
+
+        session['user'] = username
+        with lock:
+            stats['logins'] += 1
+        return redirect('/')
+
+    @app.route('/password-change/', methods=['GET', 'POST'])
+    def password_change():
+        user = session.get('user')
+        if not user:
+            return redirect('/post-in/')
+        if request.method == 'GET':
+            return render("Password change", CHANGE_FORM.format(error=''))
+
+        old = request.form.get('old_password', '')
+        new1 = request.form.get('new_password1', '')
+        new2 = request.form.get('new_password2', '')
+        with lock:
+            if old != passwords.get(user) or not new1 or new1 != new2:
+                error = '<p class="error">Your old password was entered incorrectly.</p>'
+                return render("Password change", CHANGE_FORM.format(error=error))
+            passwords[user] = new1
+            stats['password_changes'] += 1
+
+        return render("Password change", "<h1>Password change successful</h1>"
+                                         "<p>Your password was changed.</p>")
+
+    @app.route('/logout/')
+    def logout():
+        session.clear()
+        return redirect('/post-in/')
+
+    @app.route('/__standin__/stats')
+    def standin_stats():
+        with lock:
+            return jsonify(dict(stats))
+
+    @app.route('/__standin__/passwords')
+    def standin_passwords():
+        with lock:
+            return jsonify(dict(passwords))
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline unlocktool.net stand-in')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every request')
+    parser.add_argument('--slow-rate', type=float, default=0, help='Fraction of slow requests')
+    parser.add_argument('--slow-ms', type=float, default=5000, help='Extra delay for slow requests')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of HTTP 500 responses')
+    parser.add_argument('--wrong-password-rate', type=float, default=0,
+                        help='Fraction of logins rejected as wrong password')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed')
+    args = parser.parse_args()
+
+    config = StandinConfig(
+        latency_ms=args.latency_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        error_rate=args.error_rate,
+        wrong_password_rate=args.wrong_password_rate,
+        seed=args.seed
+    )
+
+    print(f"Stand-in running on http://{args.host}:{args.port}")
+    create_app(config).run(host=args.host, port=args.port, threaded=True, use_reloader=False)
+
+
+if __name__ == '__main__':
+    main()